@@ -1,17 +1,27 @@
+import os
 import sys
 
 sys.tracebacklimit = 1
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from configs.db import Base, engine
 import models.modelo
+from auth.roles import AuthError
 from routes.usuario import Usuario
 from routes.cliente import Cliente
 from routes.pago import Pago
 from routes.config import Config as ConfigRouter
+from routes.dashboard import Dashboard
+from routes.archivos import Archivos
+from routes.jobs import Jobs
+from services.compresion import CompressionMiddleware
+from services import metricas
+from services.metricas import MetricsMiddleware
+from services.ratelimit import RateLimitMiddleware
+from services.serializers import JSONResponse
 
 
-api_upcore = FastAPI()
+api_upcore = FastAPI(default_response_class=JSONResponse)
 
 
 @api_upcore.get("/")
@@ -19,23 +29,57 @@ def helloworld():
     return "hello world"
 
 
-@api_upcore.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
+@api_upcore.get("/metrics", include_in_schema=False)
+def metrics(req: Request):
+    if not metricas.autorizado(req.headers):  # tráfico y latencias no son públicos
+        return Response(status_code=404 if not metricas.TOKEN else 401)
+    return Response(
+        metricas.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@api_upcore.exception_handler(AuthError)
+def auth_error_handler(request, exc: AuthError):
+    return JSONResponse(status_code=exc.status_code, content=exc.content)
+
+
+# El esquema ya no se sincroniza en cada arranque (cada worker y cada reinicio de
+# --reload abría una conexión y reflejaba todas las tablas). Crearlo con
+# `python -m scripts.crear_esquema` o arrancar una vez con DB_CREATE_ALL=1.
+if os.getenv("DB_CREATE_ALL", "0") == "1":
+
+    @api_upcore.on_event("startup")
+    def on_startup():
+        Base.metadata.create_all(bind=engine)
 
 
 api_upcore.include_router(Usuario)
 api_upcore.include_router(Cliente)
 api_upcore.include_router(Pago)
 api_upcore.include_router(ConfigRouter)
+api_upcore.include_router(Dashboard)
+api_upcore.include_router(Archivos)
+api_upcore.include_router(Jobs)
 
+# Rate limit antes del ruteo (429 sin abrir sesión de DB); CORS queda por fuera
+api_upcore.add_middleware(RateLimitMiddleware)
+api_upcore.add_middleware(CompressionMiddleware)
 api_upcore.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Server-Timing",
+        "ETag",
+        "Idempotent-Replayed",
+        "X-Recibos-Cantidad",
+        "X-Recibos-Omitidos",
+    ],
 )
+# Métricas por fuera de todo: mide también 429 y errores de CORS
+api_upcore.add_middleware(MetricsMiddleware)
 
 # conda activate api_core
 
@@ -0,0 +1,79 @@
+# backend/auth/passwords.py
+"""
+Hash de contraseñas con Argon2id (argon2-cffi).
+
+- Costos configurables por .env: PASSWORD_TIME_COST, PASSWORD_MEMORY_KIB,
+  PASSWORD_PARALLELISM.
+- Hash/verificación corren en un executor dedicado y acotado (PASSWORD_WORKERS
+  hilos, PASSWORD_QUEUE pendientes como máximo) para no ocupar el threadpool
+  de FastAPI; argon2 libera el GIL mientras calcula.
+- Filas heredadas en texto plano se aceptan y se re-hashean en el login.
+"""
+
+import asyncio
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+TIME_COST = int(os.getenv("PASSWORD_TIME_COST", "2"))
+MEMORY_KIB = int(os.getenv("PASSWORD_MEMORY_KIB", "19456"))
+PARALLELISM = int(os.getenv("PASSWORD_PARALLELISM", "1"))
+WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+QUEUE = int(os.getenv("PASSWORD_QUEUE", "64"))
+
+_hasher = PasswordHasher(
+    time_cost=TIME_COST, memory_cost=MEMORY_KIB, parallelism=PARALLELISM
+)
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="pwhash")
+_cupos = threading.BoundedSemaphore(WORKERS + QUEUE)
+
+
+class PoolSaturado(Exception):
+    """Hay más de WORKERS + QUEUE operaciones de hash en curso."""
+
+
+def es_hash(stored: Optional[str]) -> bool:
+    return bool(stored) and stored.startswith("$argon2")
+
+
+def hash_password(plain: str) -> str:
+    return _hasher.hash(plain)
+
+
+def verify_password(stored: str, plain: str) -> Tuple[bool, Optional[str]]:
+    """
+    Devuelve (ok, nuevo_hash). `nuevo_hash` viene cuando hay que reemplazar el
+    valor guardado: fila en texto plano o parámetros de costo desactualizados.
+    """
+    if not es_hash(stored):
+        ok = hmac.compare_digest((stored or "").encode(), plain.encode())
+        return ok, (hash_password(plain) if ok else None)
+    try:
+        _hasher.verify(stored, plain)
+    except (VerificationError, InvalidHashError):
+        return False, None
+    if _hasher.check_needs_rehash(stored):
+        return True, hash_password(plain)
+    return True, None
+
+
+async def _en_pool(fn, *args):
+    if not _cupos.acquire(blocking=False):
+        raise PoolSaturado()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _cupos.release()
+
+
+async def hash_password_async(plain: str) -> str:
+    return await _en_pool(hash_password, plain)
+
+
+async def verify_password_async(stored: str, plain: str) -> Tuple[bool, Optional[str]]:
+    return await _en_pool(verify_password, stored, plain)
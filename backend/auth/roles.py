@@ -1,87 +1,85 @@
-from typing import Optional, Set, Tuple
-from fastapi.responses import JSONResponse
+from dataclasses import dataclass
+from typing import Optional, Set
+from fastapi import Depends, Request
 from sqlalchemy.orm import Session
 
 from .security import Security
+from configs.db import get_db
 from models.modelo import Cliente as ClienteModel
 
 
-def require_roles(headers, allowed: set[str] | None = None):
+class AuthError(Exception):
+    """Error de autenticación/autorización; `app.py` lo responde como JSON."""
+
+    def __init__(self, status_code: int, content: dict):
+        self.status_code = status_code
+        self.content = content
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Identidad del request: token decodificado una vez, rol y cliente_id resueltos."""
+
+    user_id: Optional[int]
+    username: Optional[str]
+    role: str
+    cliente_id: Optional[int]
+
+    def tiene_rol(self, *roles: str) -> bool:
+        return self.role in {r.lower() for r in roles}
+
+    def puede_ver_cliente(self, cliente_id: int) -> bool:
+        """Staff ve todo; un cliente sólo lo propio."""
+        return self.role != "cliente" or self.cliente_id == cliente_id
+
+
+def get_principal(req: Request, db: Session = Depends(get_db)) -> Principal:
     """
-    Valida JWT y (opcional) restringe por rol.
-    Uso:
-        guard = require_roles(req.headers, {"gerente","operador"})
-        if guard: return guard
+    Dependencia FastAPI. Se resuelve una sola vez por request (cache de
+    dependencias + `request.state`), aunque varios guards la pidan.
     """
-    payload = Security.verify_token(headers)
+    cached = getattr(req.state, "principal", None)
+    if cached is not None:
+        return cached
+
+    payload = Security.verify_token(req.headers)
     if not isinstance(payload, dict) or "iat" not in payload:
-        return JSONResponse(status_code=401, content=payload)
-
-    if allowed:
-        role = str(payload.get("role") or "").lower()
-        if role not in {r.lower() for r in allowed}:
-            return JSONResponse(
-                status_code=403, content={"message": f"Prohibido para rol '{role}'"}
-            )
-    return None
-
-
-def require_owner_or_roles(
-    headers,
-    db: Session,
-    allowed_roles: Optional[Set[str]] = None,
-    not_found_on_forbidden: bool = True,
-) -> Tuple[Optional[JSONResponse], Optional[int]]:
+        raise AuthError(401, payload)
+
+    role = str(payload.get("role") or "").lower()
+    user_id = payload.get("user_id")
+    cliente_id = payload.get("cliente_id")
+    if role == "cliente" and not cliente_id and user_id:
+        # tokens emitidos antes de incluir cliente_id en los claims
+        cliente_id = (
+            db.query(ClienteModel.id)
+            .filter(ClienteModel.usuario_id == user_id)
+            .scalar()
+        )
+
+    principal = Principal(
+        user_id=user_id,
+        username=payload.get("username"),
+        role=role,
+        cliente_id=cliente_id,
+    )
+    req.state.principal = principal
+    return principal
+
+
+def require_principal(allowed: Optional[Set[str]] = None):
     """
-    Devuelve (guard, cliente_id). Si guard != None, devolvelo.
-    Si el rol está en allowed_roles => acceso total (cliente_id=None).
-    Si es 'cliente' => retorna su cliente_id para filtrar por pertenencia.
-    Si no cumple => 403/404 según política.
+    Guard declarativo sobre `get_principal`.
+    Uso:
+        def handler(..., principal: Principal = Depends(require_principal({"gerente"}))):
     """
-    payload = Security.verify_token(headers)
-    if not isinstance(payload, dict) or "iat" not in payload:
-        return JSONResponse(status_code=401, content=payload), None
+    allowed_l = {r.lower() for r in allowed} if allowed else None
 
-    role = str(payload.get("role") or "").lower()
+    def _guard(principal: Principal = Depends(get_principal)) -> Principal:
+        if allowed_l and principal.role not in allowed_l:
+            raise AuthError(403, {"message": f"Prohibido para rol '{principal.role}'"})
+        if principal.role == "cliente" and not principal.cliente_id:
+            raise AuthError(404, {"message": "Cliente no vinculado a este usuario"})
+        return principal
 
-    # Roles privilegiados (gerente/operador u otros que autorices)
-    if allowed_roles and role in {r.lower() for r in allowed_roles}:
-        return None, None
-
-    # Cliente dueño
-    if role == "cliente":
-        user_id = payload.get("user_id")
-        if not user_id:
-            return (
-                JSONResponse(status_code=401, content={"message": "Token sin user_id"}),
-                None,
-            )
-        cli = db.query(ClienteModel).filter(ClienteModel.usuario_id == user_id).first()
-        if not cli:
-            return (
-                JSONResponse(
-                    status_code=404,
-                    content={"message": "Cliente no vinculado a este usuario"},
-                ),
-                None,
-            )
-        return None, cli.id
-
-    # Otros roles no permitidos
-    if allowed_roles:
-        if not_found_on_forbidden:
-            return (
-                JSONResponse(
-                    status_code=404, content={"message": "Recurso no encontrado"}
-                ),
-                None,
-            )
-        else:
-            return (
-                JSONResponse(
-                    status_code=403, content={"message": f"Prohibido para rol '{role}'"}
-                ),
-                None,
-            )
-
-    return JSONResponse(status_code=403, content={"message": "Solo clientes"}), None
+    return _guard
@@ -1,15 +1,24 @@
 import datetime, pytz, jwt
+import hashlib, os, threading, time
+from collections import OrderedDict
 
 
 class Security:
     secret = "cualquier cosa"
 
+    # Cache LRU/TTL de tokens ya verificados (clave: sha256 del token)
+    cache_max = int(os.getenv("TOKEN_CACHE_MAX", "4096"))
+    cache_ttl = int(os.getenv("TOKEN_CACHE_TTL_SEG", "300"))
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    _cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
     @classmethod
     def hoy(cls):
         return datetime.datetime.now(pytz.timezone("America/Buenos_Aires"))
 
     @classmethod
-    def generate_token(cls, authUser):
+    def generate_token(cls, authUser, cliente_id=None):
         uname = (
             getattr(authUser, "username", None)
             or getattr(authUser, "email", None)
@@ -29,19 +38,68 @@ class Security:
             "user_id": getattr(
                 authUser, "id", None
             ),  # 👈 opcional, útil para ownership
+            "cliente_id": cliente_id,  # 👈 evita buscar el Cliente en cada request
         }
         try:
             return jwt.encode(payload, cls.secret, algorithm="HS256")
         except Exception:
             return None
 
+    @classmethod
+    def _cache_get(cls, key):
+        now = time.time()
+        with cls._cache_lock:
+            entry = cls._cache.get(key)
+            if entry is None:
+                cls._cache_stats["misses"] += 1
+                return None
+            payload, vence = entry
+            if now >= vence:
+                del cls._cache[key]
+                cls._cache_stats["misses"] += 1
+                return None
+            cls._cache.move_to_end(key)
+            cls._cache_stats["hits"] += 1
+            return payload
+
+    @classmethod
+    def _cache_put(cls, key, payload):
+        if cls.cache_max <= 0:
+            return
+        # nunca más allá del `exp` del token
+        vence = min(float(payload.get("exp") or 0), time.time() + cls.cache_ttl)
+        with cls._cache_lock:
+            cls._cache[key] = (payload, vence)
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.cache_max:
+                cls._cache.popitem(last=False)
+                cls._cache_stats["evictions"] += 1
+
+    @classmethod
+    def token_cache_stats(cls):
+        with cls._cache_lock:
+            hits = cls._cache_stats["hits"]
+            misses = cls._cache_stats["misses"]
+            return {
+                **cls._cache_stats,
+                "size": len(cls._cache),
+                "max": cls.cache_max,
+                "ttl_seg": cls.cache_ttl,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            }
+
     @classmethod
     def verify_token(cls, headers):
         auth = headers.get("authorization") if hasattr(headers, "get") else None
         if auth:
             try:
                 tkn = auth.split(" ")[1]
+                key = hashlib.sha256(tkn.encode()).digest()
+                payload = cls._cache_get(key)
+                if payload is not None:
+                    return payload
                 payload = jwt.decode(tkn, cls.secret, algorithms=["HS256"])
+                cls._cache_put(key, payload)
                 return payload
             except jwt.ExpiredSignatureError:
                 return {"message": "El token ha expirado!"}
@@ -11,8 +11,11 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Enum as SAEnum,
+    Index,
     Numeric,
+    Sequence,
     Text,
+    text,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import JSON
@@ -53,6 +56,10 @@ class Usuario(Base):
 # -----------------------------
 # Cliente - SIN CAMBIOS (mantiene usuario_id)
 # -----------------------------
+# Numeración de `nro_cliente` (independiente del id; ver sql/Secuencia_nro_cliente.sql)
+cliente_nro_seq = Sequence("cliente_nro_seq", metadata=Base.metadata)
+
+
 class Cliente(Base):
     __tablename__ = "cliente"
 
@@ -81,6 +88,10 @@ class Cliente(Base):
         default=EstadoClienteEnum.activo,  # default como Enum (no string)
     )
     creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # para ETags (ver sql/Actualizado_en_cliente_pago.sql)
+    actualizado_en = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
 
     # Relaciones
     usuario = relationship("Usuario", backref="cliente", uselist=False)
@@ -111,6 +122,26 @@ class EstadoPagoEnum(str, Enum):
 
 class Pago(Base):
     __tablename__ = "pago"
+    __table_args__ = (
+        # búsquedas por clave de archivo (igualdad y prefijo LIKE 'pack#%') del GC
+        Index(
+            "ix_pago_comprobante_path",
+            "comprobante_path",
+            postgresql_ops={"comprobante_path": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_pago_recibo_pdf_path",
+            "recibo_pdf_path",
+            postgresql_ops={"recibo_pdf_path": "text_pattern_ops"},
+        ),
+        # cola de revisión (services/revision.py): sólo filas en_revision
+        Index(
+            "ix_pago_en_revision",
+            "fecha",
+            "id",
+            postgresql_where=text("estado = 'en_revision'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -152,8 +183,19 @@ class Pago(Base):
     recibo_num = Column(String(32), unique=True, index=True, nullable=True)
     recibo_pdf_path = Column(String(300), nullable=True)
     recibo_snapshot_json = Column(JSON, nullable=True)
+    # hash de recibo.html + recibo.css con que se renderizó (services/recibos.py)
+    recibo_version = Column(String(16), nullable=True)
+
+    # reclamo de la cola de revisión (lease; ver services/revision.py)
+    revision_por = Column(
+        Integer, ForeignKey("usuario.id", ondelete="SET NULL"), nullable=True
+    )
+    revision_hasta = Column(DateTime, nullable=True)
 
     creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
 
 
 # Configuración de empresa (1 fila)
@@ -170,3 +212,78 @@ class ConfigEmpresa(Base):
     actualizado_en = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
+
+
+# Idempotency-Key de las altas de pagos (ver services/idempotencia.py)
+class Idempotencia(Base):
+    __tablename__ = "idempotencia"
+
+    # alcance = "<user_id>:<endpoint>": la misma clave de otro usuario/endpoint es otra
+    alcance = Column(String(80), primary_key=True)
+    clave = Column(String(100), primary_key=True)
+    huella = Column(String(64), nullable=False)  # sha256 del request
+    status_code = Column(Integer, nullable=True)
+    respuesta = Column(JSON, nullable=True)
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+# Contadores del dashboard (ver services/contadores.py)
+class ContadorDashboard(Base):
+    __tablename__ = "contador_dashboard"
+
+    # "pagos_en_revision", "clientes_activos", "efectivo_monto:2025-09-01", ...
+    clave = Column(String(40), primary_key=True)
+    valor = Column(Numeric(14, 2), nullable=False, default=0)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# -----------------------------
+# Cola de jobs (ver services/jobs.py y worker.py)
+# -----------------------------
+class EstadoJobEnum(str, Enum):
+    pendiente = "pendiente"
+    corriendo = "corriendo"
+    ok = "ok"
+    error = "error"
+
+
+class Job(Base):
+    __tablename__ = "job"
+    __table_args__ = (
+        # dequeue: sólo filas pendientes, por orden de disponibilidad
+        Index(
+            "ix_job_pendiente",
+            "disponible_en",
+            "id",
+            postgresql_where=text("estado = 'pendiente'"),
+        ),
+        Index("ix_job_tipo_estado", "tipo", "estado"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String(60), nullable=False)
+    estado = Column(
+        SAEnum(EstadoJobEnum, name="estado_job_enum"),
+        nullable=False,
+        default=EstadoJobEnum.pendiente,
+    )
+    payload = Column(JSON, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    intentos = Column(Integer, nullable=False, default=0)
+    max_intentos = Column(Integer, nullable=False, default=5)
+    disponible_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # worker que lo corre + latido (si deja de latir, el job vuelve a la cola)
+    tomado_por = Column(String(120), nullable=True)
+    latido_en = Column(DateTime, nullable=True)
+
+    creado_por = Column(
+        Integer, ForeignKey("usuario.id", ondelete="SET NULL"), nullable=True
+    )
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    terminado_en = Column(DateTime, nullable=True)
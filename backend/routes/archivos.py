@@ -0,0 +1,21 @@
+# backend/routes/archivos.py
+from fastapi import APIRouter, Request, Response
+
+from services import entrega
+
+Archivos = APIRouter(prefix="/archivos", tags=["Archivos"])
+
+
+@Archivos.get(
+    "/verificar",
+    summary="Validar URL firmada (auth_request de nginx)",
+    description=(
+        "Uso interno del proxy: valida firma y vencimiento de la URL indicada en "
+        "`X-Original-URI` (modo FILE_DELIVERY=signed). 204 si es válida, 403 si no. "
+        "No consulta la base."
+    ),
+    include_in_schema=False,
+)
+def verificar_url(req: Request):
+    uri = req.headers.get("x-original-uri", "")
+    return Response(status_code=204 if entrega.verificar(uri) else 403)
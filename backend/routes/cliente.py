@@ -3,19 +3,28 @@ from datetime import datetime, date, time
 from math import ceil
 from typing import Optional, List, Literal
 
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from pydantic import BaseModel, Field, EmailStr, validator  # <- validator
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc, or_, case, func
+from sqlalchemy import asc, desc, or_, case, func, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import Integer
 
 from configs.db import get_db
-from models.modelo import Cliente as ClienteModel, EstadoClienteEnum
-from auth.roles import require_roles
+from models.modelo import Cliente as ClienteModel, EstadoClienteEnum, Pago as PagoModel
+from auth.roles import Principal, require_principal
+from services import contadores, etag
+from services.serializers import JSONResponse, cliente_out
+from services.numeracion import siguiente_nro_cliente
 
 Cliente = APIRouter(prefix="/clientes", tags=["Clientes"])
 
+solo_staff = require_principal({"gerente", "operador"})
+staff_o_cliente = require_principal({"gerente", "operador", "cliente"})
+
 USE_UNACCENT = False
+BATCH_MAX_IDS = 500
+PAGOS_RECIENTES_MAX = 20
 _TX_SRC = "ÁÀÄÂÉÈËÊÍÌÏÎÓÒÖÔÚÙÜÛáàäâéèëêíìïîóòöôúùüûÑñÇç"
 _TX_DST = "AAAAEEEEIIIIOOOOUUUUaaaaeeeeiiiioooouuuuNnCc"
 
@@ -81,15 +90,76 @@ class ClienteSearchRequest(BaseModel):
     activos_primero: bool = False
 
 
+class ClienteBatchRequest(BaseModel):
+    """Entrada para traer varios clientes por id en una sola consulta."""
+
+    ids: List[int] = Field(min_length=1, max_length=BATCH_MAX_IDS)
+
+
 def _norm_doc(doc: Optional[str]) -> Optional[str]:
     """Normaliza documento dejando solo dígitos."""
     return "".join(c for c in doc or "" if c.isdigit()) or None
 
 
-def _next_nro_cliente(db: Session) -> str:
-    """Genera el próximo número de cliente con padding."""
-    next_id = (db.query(func.coalesce(func.max(ClienteModel.id), 0)).scalar() or 0) + 1
-    return f"{next_id:06d}"
+def _ids_param(ids):
+    """Lista de ids como un único parámetro ARRAY, para `col = ANY(:ids)`."""
+    return bindparam("ids", list(ids), type_=ARRAY(Integer))
+
+
+def _pagos_recientes(db: Session, cliente_ids: List[int], n: int) -> dict:
+    """
+    Últimos `n` pagos de cada cliente en UNA consulta, con
+    ROW_NUMBER() OVER (PARTITION BY cliente_id ORDER BY fecha DESC, id DESC).
+    Devuelve {cliente_id: [pago, ...]} (todos los ids presentes, aunque vacíos).
+    """
+    salida = {cid: [] for cid in cliente_ids}
+    if not cliente_ids:
+        return salida
+    rn = (
+        func.row_number()
+        .over(
+            partition_by=PagoModel.cliente_id,
+            order_by=(desc(PagoModel.fecha), desc(PagoModel.id)),
+        )
+        .label("rn")
+    )
+    sub = (
+        select(
+            PagoModel.id,
+            PagoModel.cliente_id,
+            PagoModel.fecha,
+            PagoModel.monto,
+            PagoModel.moneda,
+            PagoModel.metodo,
+            PagoModel.estado,
+            PagoModel.periodo_year,
+            PagoModel.periodo_month,
+            PagoModel.concepto,
+            PagoModel.recibo_num,
+            rn,
+        )
+        .where(PagoModel.cliente_id == any_(_ids_param(cliente_ids)))
+        .subquery()
+    )
+    rows = db.execute(
+        select(sub).where(sub.c.rn <= n).order_by(sub.c.cliente_id, sub.c.rn)
+    ).all()
+    for r in rows:
+        salida[r.cliente_id].append(
+            {
+                "id": r.id,
+                "fecha": r.fecha.isoformat(),
+                "monto": float(r.monto),
+                "moneda": r.moneda,
+                "metodo": r.metodo.value,
+                "estado": r.estado.value,
+                "periodo_year": r.periodo_year,
+                "periodo_month": r.periodo_month,
+                "concepto": r.concepto,
+                "recibo_num": r.recibo_num,
+            }
+        )
+    return salida
 
 
 def _ci_norm(col):
@@ -106,11 +176,12 @@ def hello_cliente():
 
 
 @Cliente.post("/", summary="Crear cliente")
-def crear_cliente(req: Request, body: ClienteCreate, db: Session = Depends(get_db)):
+def crear_cliente(
+    body: ClienteCreate,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
     """Crea un cliente. Requiere rol gerente u operador."""
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
     try:
         doc = _norm_doc(body.documento)
         if db.query(ClienteModel).filter(ClienteModel.documento == doc).first():
@@ -127,7 +198,7 @@ def crear_cliente(req: Request, body: ClienteCreate, db: Session = Depends(get_d
                 status_code=409, content={"message": "Email ya registrado"}
             )
 
-        nro = _next_nro_cliente(db)
+        nro = siguiente_nro_cliente(db)
         nuevo = ClienteModel(
             nro_cliente=nro,
             nombre=body.nombre,
@@ -139,26 +210,10 @@ def crear_cliente(req: Request, body: ClienteCreate, db: Session = Depends(get_d
             estado=EstadoClienteEnum.activo,
         )
         db.add(nuevo)
+        contadores.cliente_actualizado(db, None, nuevo.estado)
         db.commit()
         db.refresh(nuevo)
-        return JSONResponse(
-            status_code=201,
-            content={
-                "id": nuevo.id,
-                "nro_cliente": nuevo.nro_cliente,
-                "nombre": nuevo.nombre,
-                "apellido": nuevo.apellido,
-                "documento": nuevo.documento,
-                "telefono": nuevo.telefono,
-                "email": nuevo.email,
-                "direccion": nuevo.direccion,
-                "estado": (
-                    nuevo.estado.value
-                    if hasattr(nuevo.estado, "value")
-                    else nuevo.estado
-                ),
-            },
-        )
+        return JSONResponse(status_code=201, content=cliente_out(nuevo))
     except Exception:
         db.rollback()
         return JSONResponse(
@@ -168,11 +223,12 @@ def crear_cliente(req: Request, body: ClienteCreate, db: Session = Depends(get_d
 
 @Cliente.post("/search", summary="Listar clientes (POST, paginación + filtros)")
 def listar_clientes(
-    req: Request, body: ClienteSearchRequest, db: Session = Depends(get_db)
+    body: ClienteSearchRequest,
+    include: Optional[Literal["pagos_recientes"]] = None,
+    pagos_n: int = Query(default=5, ge=1, le=PAGOS_RECIENTES_MAX),
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
     try:
         q = db.query(ClienteModel)
 
@@ -224,32 +280,25 @@ def listar_clientes(
         offset = (body.page - 1) * body.limit
         filas = q.offset(offset).limit(body.limit).all()
 
-        items = [
-            {
-                "id": c.id,
-                "nro_cliente": c.nro_cliente,
-                "nombre": c.nombre,
-                "apellido": c.apellido,
-                "documento": c.documento,
-                "telefono": c.telefono,
-                "email": c.email,
-                "direccion": c.direccion,
-                "estado": c.estado.value if hasattr(c.estado, "value") else c.estado,
-                "creado_en": c.creado_en.isoformat() if c.creado_en else None,
-            }
-            for c in filas
-        ]
+        items = [cliente_out(c) for c in filas]
+        if include == "pagos_recientes":
+            recientes = _pagos_recientes(db, [c.id for c in filas], pagos_n)
+            for it in items:
+                it["pagos_recientes"] = recientes[it["id"]]
 
         total_pages = ceil(total_count / body.limit) if body.limit else 1
-        return {
-            "items": items,
-            "page": body.page,
-            "limit": body.limit,
-            "total_count": total_count,
-            "total_pages": total_pages,
-            "has_prev": body.page > 1,
-            "has_next": body.page < total_pages,
-        }
+        return JSONResponse(
+            status_code=200,
+            content={
+                "items": items,
+                "page": body.page,
+                "limit": body.limit,
+                "total_count": total_count,
+                "total_pages": total_pages,
+                "has_prev": body.page > 1,
+                "has_next": body.page < total_pages,
+            },
+        )
     except HTTPException:
         raise
     except Exception:
@@ -257,29 +306,15 @@ def listar_clientes(
 
 
 @Cliente.get("/all", summary="Listar clientes (admin)")
-def listar_clientes_admin(req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
+def listar_clientes_admin(
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
     try:
         rows: List[ClienteModel] = (
             db.query(ClienteModel).order_by(asc(ClienteModel.id)).all()
         )
-        salida = [
-            {
-                "id": c.id,
-                "nro_cliente": c.nro_cliente,
-                "nombre": c.nombre,
-                "apellido": c.apellido,
-                "documento": c.documento,
-                "telefono": c.telefono,
-                "email": c.email,
-                "direccion": c.direccion,
-                "estado": c.estado.value if hasattr(c.estado, "value") else c.estado,
-                "creado_en": c.creado_en.isoformat() if c.creado_en else None,
-            }
-            for c in rows
-        ]
+        salida = [cliente_out(c) for c in rows]
         return JSONResponse(status_code=200, content=salida)
     except Exception:
         return JSONResponse(
@@ -289,31 +324,16 @@ def listar_clientes_admin(req: Request, db: Session = Depends(get_db)):
 
 @Cliente.post("/paginated", summary="Listar clientes por cursor (admin)")
 def clientes_paginados(
-    req: Request, body: ClienteCursorRequest, db: Session = Depends(get_db)
+    body: ClienteCursorRequest,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
     try:
         q = db.query(ClienteModel).order_by(asc(ClienteModel.id))
         if body.last_seen_id is not None:
             q = q.filter(ClienteModel.id > body.last_seen_id)
         rows = q.limit(body.limit).all()
-        salida = [
-            {
-                "id": c.id,
-                "nro_cliente": c.nro_cliente,
-                "nombre": c.nombre,
-                "apellido": c.apellido,
-                "documento": c.documento,
-                "telefono": c.telefono,
-                "email": c.email,
-                "direccion": c.direccion,
-                "estado": c.estado.value if hasattr(c.estado, "value") else c.estado,
-                "creado_en": c.creado_en.isoformat() if c.creado_en else None,
-            }
-            for c in rows
-        ]
+        salida = [cliente_out(c) for c in rows]
         next_cursor = salida[-1]["id"] if len(salida) == body.limit else None
         return JSONResponse(
             status_code=200, content={"clientes": salida, "next_cursor": next_cursor}
@@ -324,31 +344,72 @@ def clientes_paginados(
         )
 
 
+@Cliente.post("/batch", summary="Traer varios clientes por id")
+def clientes_batch(
+    body: ClienteBatchRequest,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(staff_o_cliente),
+):
+    """Devuelve {id: cliente} en una sola consulta `id = ANY(:ids)`.
+    Un usuario con rol cliente sólo recibe su propio registro."""
+    try:
+        ids = {i for i in body.ids if principal.puede_ver_cliente(i)}
+        rows = (
+            db.query(ClienteModel)
+            .filter(ClienteModel.id == any_(_ids_param(ids)))
+            .all()
+            if ids
+            else []
+        )
+        items = {str(c.id): cliente_out(c) for c in rows}
+        missing = [i for i in dict.fromkeys(body.ids) if str(i) not in items]
+        return JSONResponse(
+            status_code=200, content={"items": items, "missing": missing}
+        )
+    except Exception:
+        return JSONResponse(
+            status_code=500, content={"message": "Error al obtener clientes"}
+        )
+
+
 @Cliente.get("/{cliente_id}", summary="Detalle de cliente")
-def obtener_cliente(cliente_id: int, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
+def obtener_cliente(
+    cliente_id: int,
+    req: Request,
+    include: Optional[Literal["pagos_recientes"]] = None,
+    pagos_n: int = Query(default=5, ge=1, le=PAGOS_RECIENTES_MAX),
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
     try:
-        c = db.get(ClienteModel, cliente_id)
-        if not c:
+        if include == "pagos_recientes":
+            # la representación depende también de los pagos: sin ETag
+            c = db.get(ClienteModel, cliente_id)
+            if not c:
+                return JSONResponse(
+                    status_code=404, content={"message": "Cliente no encontrado"}
+                )
+            out = cliente_out(c)
+            out["pagos_recientes"] = _pagos_recientes(db, [c.id], pagos_n)[c.id]
+            return JSONResponse(status_code=200, content=out)
+
+        # GET condicional: sólo `actualizado_en` antes de cargar la fila
+        version = (
+            db.query(ClienteModel.actualizado_en)
+            .filter(ClienteModel.id == cliente_id)
+            .first()
+        )
+        if not version:
             return JSONResponse(
                 status_code=404, content={"message": "Cliente no encontrado"}
             )
+        tag = etag.etag_fila("c", cliente_id, version.actualizado_en)
+        if etag.coincide(req.headers, tag):
+            return etag.no_modificado(tag)
+
+        c = db.get(ClienteModel, cliente_id)
         return JSONResponse(
-            status_code=200,
-            content={
-                "id": c.id,
-                "nro_cliente": c.nro_cliente,
-                "nombre": c.nombre,
-                "apellido": c.apellido,
-                "documento": c.documento,
-                "telefono": c.telefono,
-                "email": c.email,
-                "direccion": c.direccion,
-                "estado": c.estado.value if hasattr(c.estado, "value") else c.estado,
-                "creado_en": c.creado_en.isoformat() if c.creado_en else None,
-            },
+            status_code=200, content=cliente_out(c), headers=etag.cabeceras(tag)
         )
     except Exception:
         return JSONResponse(
@@ -358,14 +419,14 @@ def obtener_cliente(cliente_id: int, req: Request, db: Session = Depends(get_db)
 
 @Cliente.put("/{cliente_id}", summary="Actualizar cliente")
 def actualizar_cliente(
-    cliente_id: int, body: ClienteUpdate, req: Request, db: Session = Depends(get_db)
+    cliente_id: int,
+    body: ClienteUpdate,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
     """Actualiza datos del cliente y valida duplicados. Requiere rol gerente u operador.
     - Si un campo viene como `null`, se interpreta como limpiar (email/telefono).
     - Campos no presentes: se dejan sin cambios."""
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
     try:
         c = db.get(ClienteModel, cliente_id)
         if not c:
@@ -432,9 +493,11 @@ def actualizar_cliente(
             c.apellido = body.apellido
 
         # Estado
+        estado_antes = c.estado
         if "estado" in fields_set and body.estado is not None:
             c.estado = body.estado
 
+        contadores.cliente_actualizado(db, estado_antes, c.estado)
         db.commit()
         db.refresh(c)
         return JSONResponse(status_code=200, content={"message": "Cliente actualizado"})
@@ -446,17 +509,20 @@ def actualizar_cliente(
 
 
 @Cliente.delete("/{cliente_id}", summary="Inactivar cliente (baja lógica)")
-def eliminar_cliente(cliente_id: int, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
+def eliminar_cliente(
+    cliente_id: int,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
     try:
         c = db.get(ClienteModel, cliente_id)
         if not c:
             return JSONResponse(
                 status_code=404, content={"message": "Cliente no encontrado"}
             )
+        estado_antes = c.estado
         c.estado = EstadoClienteEnum.inactivo
+        contadores.cliente_actualizado(db, estado_antes, c.estado)
         db.commit()
         return JSONResponse(status_code=200, content={"message": "Cliente inactivado"})
     except Exception:
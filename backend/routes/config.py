@@ -3,20 +3,20 @@ import os, re
 from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from configs.db import get_db
 from models.modelo import ConfigEmpresa
-from auth.roles import require_roles
+from auth.roles import Principal, require_principal
+from services.serializers import JSONResponse
+from services import etag, metricas, storage
 
 Config = APIRouter(prefix="/config", tags=["Configuración"])
-UPLOAD_ROOT = os.getenv("UPLOADS_DIR", os.path.join("backend", "uploads"))
 
-
-def _ensure_dir(p: str):
-    os.makedirs(p, exist_ok=True)
+solo_staff = require_principal({"gerente", "operador"})
+solo_gerente = require_principal({"gerente"})
 
 
 def _safe(s: str) -> str:
@@ -43,26 +43,41 @@ def _get_singleton(db: Session) -> ConfigEmpresa:
 
 
 @Config.get("/empresa", summary="Obtener configuración de empresa")
-def get_empresa(req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
+def get_empresa(
+    req: Request,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    # GET condicional: sólo `actualizado_en` antes de cargar la fila
+    version = (
+        db.query(ConfigEmpresa.actualizado_en).filter(ConfigEmpresa.id == 1).scalar()
+    )
+    if version is not None:
+        tag = etag.etag_fila("e", 1, version)
+        if etag.coincide(req.headers, tag):
+            return etag.no_modificado(tag)
     c = _get_singleton(db)
-    return {
-        "nombre": c.nombre,
-        "cuit": c.cuit,
-        "direccion": c.direccion,
-        "ciudad": c.ciudad,
-        "contacto": c.contacto,
-        "logo_path": c.logo_path,
-    }
+    tag = etag.etag_fila("e", 1, c.actualizado_en)
+    return JSONResponse(
+        status_code=200,
+        content={
+            "nombre": c.nombre,
+            "cuit": c.cuit,
+            "direccion": c.direccion,
+            "ciudad": c.ciudad,
+            "contacto": c.contacto,
+            "logo_path": c.logo_path,
+        },
+        headers=etag.cabeceras(tag),
+    )
 
 
 @Config.put("/empresa", summary="Actualizar configuración (solo gerente)")
-def put_empresa(req: Request, body: EmpresaDTO, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente"})
-    if guard:
-        return guard
+def put_empresa(
+    body: EmpresaDTO,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_gerente),
+):
     c = _get_singleton(db)
     c.nombre = body.nombre
     c.cuit = body.cuit
@@ -76,27 +91,23 @@ def put_empresa(req: Request, body: EmpresaDTO, db: Session = Depends(get_db)):
 
 @Config.post("/empresa/logo", summary="Subir nuevo logo (solo gerente)")
 async def upload_logo(
-    req: Request, archivo: UploadFile = File(...), db: Session = Depends(get_db)
+    archivo: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_gerente),
 ):
-    guard = require_roles(req.headers, {"gerente"})
-    if guard:
-        return guard
-
-    data = await archivo.read()
-    if not data:
+    size = archivo.size or 0
+    metricas.observar_upload("logo", size)
+    if not size:
         raise HTTPException(status_code=422, detail="Archivo vacío")
     ext = os.path.splitext(archivo.filename or "")[1].lower()
     if ext not in (".png", ".jpg", ".jpeg", ".svg"):
         raise HTTPException(status_code=422, detail="Solo PNG/JPG/SVG")
 
-    folder = os.path.join(UPLOAD_ROOT, "assets")
-    _ensure_dir(folder)
     name = f"company-logo-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{ext}"
-    path = os.path.join(folder, _safe(name))
-    with open(path, "wb") as f:
-        f.write(data)
+    clave = storage.unir("assets", _safe(name))
+    await run_in_threadpool(storage.get_storage().guardar, clave, archivo.file)
 
     c = _get_singleton(db)
-    c.logo_path = path
+    c.logo_path = clave
     db.commit()
-    return {"message": "Logo actualizado", "logo_path": path}
+    return {"message": "Logo actualizado", "logo_path": clave}
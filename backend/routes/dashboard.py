@@ -0,0 +1,37 @@
+# backend/routes/dashboard.py
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from configs.db import get_db
+from auth.roles import Principal, require_principal
+from services.serializers import JSONResponse
+from services import contadores
+
+Dashboard = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+solo_staff = require_principal({"gerente", "operador"})
+
+
+@Dashboard.get(
+    "/counters",
+    summary="Contadores del dashboard",
+    description=(
+        "Transferencias en revisión, efectivo confirmado hoy y clientes "
+        "activos/inactivos. Se leen de la tabla contador_dashboard, que cada "
+        "alta o cambio de estado actualiza en su misma transacción: todos los "
+        "workers ven lo mismo y no hay deriva por proceso. Sólo un cambio hecho "
+        "por fuera de la API (SQL a mano, scripts) queda sin contar hasta la "
+        "próxima reconciliación, a lo sumo DASHBOARD_RECONCILE_SEG segundos "
+        "(default 300). Requiere rol gerente u operador."
+    ),
+)
+def get_counters(
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    try:
+        return JSONResponse(status_code=200, content=contadores.leer(db))
+    except Exception:
+        return JSONResponse(
+            status_code=500, content={"message": "Error al leer contadores"}
+        )
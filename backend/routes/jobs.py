@@ -0,0 +1,74 @@
+# backend/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from auth.roles import Principal, require_principal
+from configs.db import get_db
+from models.modelo import EstadoJobEnum, Job
+from services import entrega, storage
+
+Jobs = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+solo_staff = require_principal({"gerente", "operador"})
+
+
+def _job_visible(db: Session, job_id: int, principal: Principal) -> Job:
+    """Un operador ve sus jobs; el gerente, todos."""
+    job = db.get(Job, job_id)
+    if not job or (
+        not principal.tiene_rol("gerente") and job.creado_por != principal.user_id
+    ):
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+
+@Jobs.get("/{job_id}", summary="Estado de un job en segundo plano")
+def estado_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    job = _job_visible(db, job_id, principal)
+    resultado = job.resultado
+    if job.estado == EstadoJobEnum.ok and (resultado or {}).get("clave"):
+        resultado = {
+            k: v for k, v in resultado.items() if k not in ("clave", "media_type")
+        }
+        resultado["archivo_url"] = f"/jobs/{job.id}/archivo"
+    return {
+        "id": job.id,
+        "tipo": job.tipo,
+        "estado": job.estado.value,
+        "intentos": job.intentos,
+        "max_intentos": job.max_intentos,
+        "proximo_intento": (
+            job.disponible_en.isoformat()
+            if job.estado == EstadoJobEnum.pendiente
+            else None
+        ),
+        "resultado": resultado,
+        "error": job.error,
+        "creado_en": job.creado_en.isoformat(),
+        "terminado_en": job.terminado_en.isoformat() if job.terminado_en else None,
+    }
+
+
+@Jobs.get("/{job_id}/archivo", summary="Descargar el archivo generado por un job")
+def archivo_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    job = _job_visible(db, job_id, principal)
+    res = job.resultado or {}
+    if job.estado != EstadoJobEnum.ok or not res.get("clave"):
+        raise HTTPException(status_code=404, detail="El job no generó un archivo")
+    info = storage.get_storage().info(res["clave"])
+    if info is None:  # retención de scripts.gc_archivos (--exports-dias)
+        raise HTTPException(status_code=404, detail="Archivo vencido o no encontrado")
+    return entrega.respuesta_archivo(
+        res["clave"],
+        media_type=res.get("media_type") or "application/octet-stream",
+        filename=res.get("filename") or res["clave"].rsplit("/", 1)[-1],
+        info=info,
+    )
@@ -9,65 +9,90 @@ Pagos - FastAPI (HTML -> PDF)
 
 from __future__ import annotations
 
+import csv
+import hashlib
+import io
 import os
 import re
+import tempfile
 from datetime import datetime, date, time
 from math import ceil
+from decimal import Decimal
+from enum import Enum
 from typing import Optional, Literal
 
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Request,
     Depends,
     UploadFile,
     File,
     Form,
     HTTPException,
+    Response,
 )
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from sqlalchemy import asc, desc, any_, bindparam, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import Integer
+from starlette.background import BackgroundTask
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-
-from configs.db import get_db
+from configs.db import get_db, SessionLocal
 from models.modelo import (
     Pago as PagoModel,
     MetodoPagoEnum,
     EstadoPagoEnum,
     Cliente as ClienteModel,
 )
-from auth.roles import require_roles
+from auth.roles import Principal, require_principal
+from services import (
+    contadores,
+    entrega,
+    etag,
+    idempotencia,
+    jobs,
+    metricas,
+    miniaturas,
+    paquetes,
+    recibos,
+    revision,
+    storage,
+)
+from services.serializers import JSONResponse, pago_detalle, pago_item
 
 # --------------------------------------------------------------------
 # Router y configuración base
 # --------------------------------------------------------------------
 Pago = APIRouter(prefix="/pagos", tags=["Pagos"])
 
-UPLOAD_ROOT = os.getenv("UPLOADS_DIR", os.path.join("backend", "uploads"))
 MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "10"))
 RECIBO_SERIE = os.getenv("RECIBO_SERIE", "REC")
 RECIBO_ANUAL = os.getenv("RECIBO_ANUAL", "1") == "1"  # reservado para lógicas futuras
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+BATCH_MAX_IDS = 500
+IMPRIMIR_MAX = int(os.getenv("RECIBOS_IMPRIMIR_MAX", "500"))  # hojas por PDF
+PREVIEW_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# 1: el PDF del recibo lo renderiza el worker (job "recibos.emitir") y el link
+# responde 404 + Retry-After hasta que esté; 0: se renderiza en el request
+# (instalaciones sin worker.py)
+RECIBOS_EN_SEGUNDO_PLANO = os.getenv("RECIBOS_EN_SEGUNDO_PLANO", "1") == "1"
+RECIBO_RETRY_AFTER = "2"
+
+# Guards declarativos (ver auth/roles.py: Principal)
+solo_staff = require_principal({"gerente", "operador"})
+solo_gerente = require_principal({"gerente"})
+staff_o_cliente = require_principal({"gerente", "operador", "cliente"})
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
-RECIBO_TEMPLATE = "recibo.html"
-RECIBO_CSS = os.path.join(TEMPLATE_DIR, "recibo.css")
-
-jinja_env = Environment(
-    loader=FileSystemLoader(TEMPLATE_DIR),
-    autoescape=select_autoescape(["html", "xml"]),
-)
 
 
 # --------------------------------------------------------------------
 # Helpers
 # --------------------------------------------------------------------
-def _ensure_dir(path: str):
-    os.makedirs(path, exist_ok=True)
-
-
 def _safe_name(s: str) -> str:
     return re.sub(r"[^a-zA-Z0-9._-]+", "-", (s or "").strip()).strip("-") or "archivo"
 
@@ -103,9 +128,17 @@ def _gen_recibo_num(db: Session, when: datetime) -> str:
     return f"{prefix}{str(next_n).zfill(6)}"
 
 
-def _save_comprobante_bytes(
-    cliente_id: int, filename: str, content_type: str, data: bytes
+def _tamano(f) -> int:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+
+def _guardar_comprobante(
+    cliente_id: int, filename: str, content_type: str, archivo
 ) -> str:
+    """Valida y sube el comprobante por bloques; devuelve la clave de storage."""
     if not content_type:
         raise HTTPException(status_code=422, detail="Comprobante sin content-type")
 
@@ -114,23 +147,25 @@ def _save_comprobante_bytes(
         raise HTTPException(
             status_code=422, detail="Formato de comprobante no permitido (PDF/JPG/PNG)"
         )
-    if not data or len(data) == 0:
+    size = _tamano(archivo)
+    metricas.observar_upload("comprobante", size)
+    if size == 0:
         raise HTTPException(status_code=422, detail="Comprobante vacío")
-    if len(data) > MAX_UPLOAD_MB * 1024 * 1024:
+    if size > MAX_UPLOAD_MB * 1024 * 1024:
         raise HTTPException(
             status_code=413, detail="Comprobante supera el tamaño máximo"
         )
 
-    folder = os.path.join(
-        UPLOAD_ROOT, "comprobantes", str(cliente_id), str(datetime.utcnow().year)
-    )
-    _ensure_dir(folder)
     fname = _safe_name(os.path.splitext(filename or "comprobante")[0])
     stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    path = os.path.join(folder, f"{fname}-{stamp}{ext}")
-    with open(path, "wb") as f:
-        f.write(data)
-    return path
+    clave = storage.unir(
+        "comprobantes",
+        cliente_id,
+        datetime.utcnow().year,
+        f"{fname}-{stamp}{ext}",
+    )
+    storage.get_storage().guardar(clave, archivo)
+    return clave
 
 
 # -------------------- configuración de empresa ----------------------
@@ -171,52 +206,39 @@ def _company_ctx_db(db: Session) -> dict:
     }
 
 
-def _render_pdf_from_html(path_pdf: str, html_str: str):
-    """
-    Intenta generar PDF con wkhtmltopdf (pdfkit). Si falla, usa WeasyPrint.
-    Si nada está disponible, levanta 500 con mensaje claro.
-    """
-    _ensure_dir(os.path.dirname(path_pdf))
-
-    # 1) pdfkit (wkhtmltopdf)
-    try:
-        import pdfkit  # pip install pdfkit
-
-        wkhtml_bin = os.getenv("WKHTMLTOPDF_BIN")  # opcional: ruta absoluta
-        config = pdfkit.configuration(wkhtmltopdf=wkhtml_bin) if wkhtml_bin else None
-        options = {
-            "encoding": "UTF-8",
-            "enable-local-file-access": None,  # permitir CSS/IMG locales
-            "print-media-type": None,
-            "margin-top": "10mm",
-            "margin-right": "10mm",
-            "margin-bottom": "10mm",
-            "margin-left": "10mm",
-        }
-        pdfkit.from_string(
-            html_str, path_pdf, css=RECIBO_CSS, options=options, configuration=config
-        )
-        return
-    except Exception:
-        pass  # intentar fallback
+def _clave_recibo(pago: PagoModel, cli: ClienteModel, now: datetime) -> str:
+    fname = (
+        f"{pago.recibo_num}__{_safe_name(cli.apellido)}-{_safe_name(cli.nombre)}"
+        f"__{pago.periodo_year}-{str(pago.periodo_month).zfill(2)}.pdf"
+    )
+    return storage.unir("recibos", now.year, f"{now.month:02d}", fname)
 
-    # 2) WeasyPrint
-    try:
-        from weasyprint import HTML, CSS  # pip install WeasyPrint
 
-        HTML(string=html_str, base_url=TEMPLATE_DIR).write_pdf(
-            path_pdf, stylesheets=[CSS(filename=RECIBO_CSS)]
-        )
-        return
-    except Exception:
-        raise HTTPException(
-            status_code=500,
-            detail=(
-                "No se pudo generar el PDF. Instalar uno de: "
-                "`pip install pdfkit` + wkhtmltopdf (binario del sistema), "
-                "o `pip install WeasyPrint`."
-            ),
-        )
+def _generar_recibo(
+    db: Session,
+    cli: ClienteModel,
+    pago: PagoModel,
+    now: datetime,
+    creado_por: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Guarda el snapshot del recibo y encola su render (job `recibos.emitir`, se
+    publica con el commit del llamador); devuelve el id del job. Con
+    RECIBOS_EN_SEGUNDO_PLANO=0 renderiza y publica el PDF en el momento.
+    """
+    ctx = _build_receipt_context(db, cli, pago, now)
+    clave = _clave_recibo(pago, cli, now)
+    pago.recibo_snapshot_json = ctx
+    if not RECIBOS_EN_SEGUNDO_PLANO:
+        recibos.escribir_pdf(clave, ctx)
+        pago.recibo_pdf_path = clave
+        pago.recibo_version = recibos.version_plantilla()
+        return None
+    db.flush()  # id del pago para el payload
+    job = jobs.encolar(
+        db, "recibos.emitir", {"pago_id": pago.id, "clave": clave}, creado_por
+    )
+    return job.id
 
 
 def _build_receipt_context(
@@ -285,9 +307,7 @@ class PagoUpdate(BaseModel):
     descripcion: Optional[str] = None
 
 
-class PagoSearch(BaseModel):
-    page: int = Field(default=1, ge=1)
-    limit: int = Field(default=20, ge=1, le=200)
+class PagoFiltros(BaseModel):
     cliente_id: Optional[int] = None
     metodo: Optional[Literal["efectivo", "transferencia"]] = None
     estado: Optional[Literal["pendiente", "en_revision", "confirmado", "anulado"]] = (
@@ -301,20 +321,307 @@ class PagoSearch(BaseModel):
     orden: Literal["asc", "desc"] = "desc"
 
 
+class PagoSearch(PagoFiltros):
+    page: int = Field(default=1, ge=1)
+    limit: int = Field(default=20, ge=1, le=200)
+
+
+class PagoExport(PagoFiltros):
+    formato: Literal["csv", "xlsx"] = "csv"
+    # True: 202 + job (GET /jobs/{id}); el archivo lo arma `worker.py`
+    en_segundo_plano: bool = False
+
+
+class PagoBatch(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+
 class MotivoAnulacion(BaseModel):
     motivo: str = Field(min_length=3, max_length=300)
 
 
+class RegenerarRecibos(BaseModel):
+    """Filtro de `POST /pagos/recibos/regenerar` (todos opcionales, se combinan)."""
+
+    periodo_year: Optional[int] = Field(None, ge=2000, le=2100)
+    periodo_month: Optional[int] = Field(None, ge=1, le=12)
+    id_desde: Optional[int] = Field(None, ge=1)
+    id_hasta: Optional[int] = Field(None, ge=1)
+    version: Optional[str] = Field(None, max_length=16)  # recibo_version exacta
+    solo_desactualizados: bool = False  # distinta de la plantilla actual
+    procesos: Optional[int] = Field(None, ge=1, le=32)
+
+
+class ImprimirRecibos(PagoFiltros):
+    """`ids` (en ese orden) o, si no vienen, los filtros de `search`."""
+
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=IMPRIMIR_MAX)
+
+
+class RevisionClaim(BaseModel):
+    cantidad: int = Field(5, ge=1, le=revision.MAX_RECLAMO)
+
+
+# --------------------------------------------------------------------
+# Búsqueda / exportación
+# --------------------------------------------------------------------
+def _filtrar_pagos(q, body: PagoFiltros):
+    """
+    Aplica filtros y orden de `PagoFiltros` a una query sobre `pago`.
+    Compartido por la búsqueda paginada y la exportación.
+    """
+    if body.cliente_id:
+        q = q.filter(PagoModel.cliente_id == body.cliente_id)
+    if body.metodo:
+        q = q.filter(PagoModel.metodo == MetodoPagoEnum(body.metodo))
+    if body.estado:
+        q = q.filter(PagoModel.estado == EstadoPagoEnum(body.estado))
+    if body.fecha_desde:
+        q = q.filter(PagoModel.fecha >= datetime.combine(body.fecha_desde, time.min))
+    if body.fecha_hasta:
+        q = q.filter(PagoModel.fecha <= datetime.combine(body.fecha_hasta, time.max))
+    if body.monto_min is not None:
+        q = q.filter(PagoModel.monto >= body.monto_min)
+    if body.monto_max is not None:
+        q = q.filter(PagoModel.monto <= body.monto_max)
+
+    if body.ordenar_por == "fecha":
+        sort_col = PagoModel.fecha
+    elif body.ordenar_por == "monto":
+        sort_col = PagoModel.monto
+    else:  # periodo
+        sort_col = (PagoModel.periodo_year, PagoModel.periodo_month)
+
+    direction = asc if body.orden == "asc" else desc
+    if isinstance(sort_col, tuple):
+        q = q.order_by(*[direction(c) for c in sort_col])
+    else:
+        q = q.order_by(direction(sort_col), desc(PagoModel.id))
+
+    return q
+
+
+# columnas exportadas (cabecera, expresión); sólo se proyectan estas
+_EXPORT_COLS = [
+    ("id", PagoModel.id),
+    ("fecha", PagoModel.fecha),
+    ("cliente_id", PagoModel.cliente_id),
+    ("nro_cliente", ClienteModel.nro_cliente),
+    ("apellido", ClienteModel.apellido),
+    ("nombre", ClienteModel.nombre),
+    ("documento", ClienteModel.documento),
+    ("monto", PagoModel.monto),
+    ("moneda", PagoModel.moneda),
+    ("metodo", PagoModel.metodo),
+    ("estado", PagoModel.estado),
+    ("periodo_year", PagoModel.periodo_year),
+    ("periodo_month", PagoModel.periodo_month),
+    ("es_adelantado", PagoModel.es_adelantado),
+    ("concepto", PagoModel.concepto),
+    ("recibo_num", PagoModel.recibo_num),
+]
+
+
+def _export_cell(v):
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, datetime):
+        return v.isoformat(sep=" ", timespec="seconds")
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+
+def _iter_export_rows(db: Session, body: PagoFiltros):
+    """
+    Itera filas proyectadas con cursor del lado del servidor (psycopg2 named
+    cursor vía `stream_results`), trayendo `EXPORT_CHUNK_ROWS` por vuelta.
+    """
+    q = db.query(*[col for _, col in _EXPORT_COLS]).join(
+        ClienteModel, ClienteModel.id == PagoModel.cliente_id
+    )
+    q = _filtrar_pagos(q, body).execution_options(
+        stream_results=True, yield_per=EXPORT_CHUNK_ROWS
+    )
+    for row in q:
+        yield [_export_cell(v) for v in row]
+
+
+def _stream_csv(body: PagoFiltros):
+    """
+    Generador CSV por bloques. Abre su propia sesión: la de `get_db` se cierra
+    antes de que empiece a enviarse el cuerpo de la respuesta.
+    """
+    db = SessionLocal()
+    try:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        buf.write("\ufeff")  # BOM para que Excel detecte UTF-8
+        writer.writerow([name for name, _ in _EXPORT_COLS])
+        for n, row in enumerate(_iter_export_rows(db, body), start=1):
+            writer.writerow(row)
+            if n % EXPORT_CHUNK_ROWS == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate(0)
+        yield buf.getvalue()
+    finally:
+        db.close()
+
+
+def _write_xlsx(db: Session, body: PagoFiltros) -> str:
+    """
+    Escribe el XLSX en un archivo temporal con XlsxWriter en modo
+    `constant_memory` (cada fila se vuelca a disco al pasar a la siguiente).
+    """
+    try:
+        import xlsxwriter  # pip install XlsxWriter
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="Exportación XLSX no disponible. Instalar `pip install XlsxWriter`.",
+        )
+
+    fd, path = tempfile.mkstemp(prefix="pagos-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+        try:
+            ws = wb.add_worksheet("Pagos")
+            ws.write_row(0, 0, [name for name, _ in _EXPORT_COLS])
+            for n, row in enumerate(_iter_export_rows(db, body), start=1):
+                ws.write_row(n, 0, row)
+        finally:
+            wb.close()
+    except Exception:
+        # sólo el camino feliz lo borra (BackgroundTask / _job_exportar)
+        os.remove(path)
+        raise
+    return path
+
+
+_EXPORT_MEDIA = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@jobs.tarea("pagos.export", concurrencia=2, max_intentos=3)
+def _job_exportar(db: Session, payload: dict, job_id: int) -> dict:
+    """Exportación en el worker: deja el archivo en `exports/` del storage."""
+    body = PagoExport(**payload)
+    clave = storage.unir("exports", f"pagos-job{job_id}.{body.formato}")
+    st = storage.get_storage()
+    if body.formato == "xlsx":
+        path = _write_xlsx(db, body)
+        try:
+            with open(path, "rb") as f:
+                st.guardar(clave, f)
+        finally:
+            os.remove(path)
+    else:
+        with st.escribir(clave) as tmp, open(
+            tmp, "w", encoding="utf-8", newline=""
+        ) as f:
+            for bloque in _stream_csv(body):
+                f.write(bloque)
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    return {
+        "clave": clave,
+        "filename": f"pagos-{stamp}.{body.formato}",
+        "media_type": _EXPORT_MEDIA[body.formato],
+    }
+
+
+@jobs.tarea("recibos.emitir", concurrencia=2, max_intentos=5)
+def _job_emitir_recibo(db: Session, payload: dict, job_id: int) -> dict:
+    """Render del recibo de un pago recién confirmado, desde su snapshot."""
+    pago_id, clave = payload["pago_id"], payload["clave"]
+    pago = db.get(PagoModel, pago_id)
+    if pago is None or pago.recibo_pdf_path or not pago.recibo_snapshot_json:
+        return {"pago_id": pago_id, "omitido": True}  # reintento de uno ya hecho
+    recibos.escribir_pdf(clave, pago.recibo_snapshot_json)
+    db.execute(
+        update(PagoModel.__table__)
+        .where(PagoModel.id == pago_id, PagoModel.recibo_pdf_path.is_(None))
+        .values(recibo_pdf_path=clave, recibo_version=recibos.version_plantilla())
+    )
+    return {"pago_id": pago_id, "recibo_pdf_url": f"/pagos/{pago_id}/recibo.pdf"}
+
+
+@jobs.tarea("recibos.regenerar", concurrencia=1, max_intentos=3)
+def _job_regenerar(db: Session, payload: dict, job_id: int) -> dict:
+    """Regeneración masiva en el worker; un reintento sigue desde su progreso."""
+    filtros = dict(payload)
+    procesos = filtros.pop("procesos", None)
+    return recibos.regenerar(
+        db,
+        filtros,
+        procesos=procesos,
+        previo=jobs.previo(db, job_id),
+        progreso=lambda stats: jobs.progreso(db, job_id, stats),
+    )
+
+
+# --------------------------------------------------------------------
+# Idempotency-Key (services/idempotencia.py)
+# --------------------------------------------------------------------
+def _idem(req: Request, principal: Principal, endpoint: str):
+    """(alcance, clave) si el request trae Idempotency-Key; si no, None."""
+    clave = req.headers.get(idempotencia.HEADER)
+    if clave is None:
+        return None
+    if not (1 <= len(clave) <= idempotencia.MAX_CLAVE):
+        raise HTTPException(status_code=422, detail="Idempotency-Key inválida")
+    if principal.user_id is None:  # todos compartirían el alcance "None:..."
+        raise HTTPException(status_code=403, detail="Token sin user_id")
+    return f"{principal.user_id}:{endpoint}", clave
+
+
+def _idem_previa(db: Session, idem, huella: str) -> Optional[JSONResponse]:
+    """Respuesta original si es un reintento; None si hay que ejecutar."""
+    try:
+        previa = idempotencia.iniciar(db, *idem, huella)
+    except idempotencia.ClaveEnUso:
+        raise HTTPException(
+            status_code=409, detail="Hay una solicitud en curso con esa Idempotency-Key"
+        )
+    except idempotencia.ClaveReusada:
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key ya usada con otros datos"
+        )
+    if previa is None:
+        return None
+    return JSONResponse(
+        status_code=previa.status_code,
+        content=previa.respuesta,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _huella_archivo(f) -> str:
+    h = hashlib.sha256()
+    for bloque in iter(lambda: f.read(64 * 1024), b""):
+        h.update(bloque)
+    f.seek(0)
+    return h.hexdigest()
+
+
 # --------------------------------------------------------------------
 # Rutas
 # --------------------------------------------------------------------
 @Pago.post("/efectivo", summary="Registrar pago en efectivo (confirma + PDF)")
 def registrar_efectivo(
-    req: Request, body: PagoCreateEfectivo, db: Session = Depends(get_db)
+    body: PagoCreateEfectivo,
+    req: Request,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
+    idem = _idem(req, principal, "efectivo")
+    if idem:
+        previa = _idem_previa(db, idem, idempotencia.huella(body.model_dump_json()))
+        if previa is not None:
+            return previa
 
     cli = db.get(ClienteModel, body.cliente_id)
     if not cli:
@@ -335,31 +642,23 @@ def registrar_efectivo(
         descripcion=body.descripcion,
     )
     pago.recibo_num = _gen_recibo_num(db, now)
-
-    out_dir = os.path.join(UPLOAD_ROOT, "recibos", str(now.year), f"{now.month:02d}")
-    _ensure_dir(out_dir)
-    fname = f"{pago.recibo_num}__{_safe_name(cli.apellido)}-{_safe_name(cli.nombre)}__{body.periodo_year}-{str(body.periodo_month).zfill(2)}.pdf"
-    path_pdf = os.path.join(out_dir, fname)
-
-    # Render HTML -> PDF
-    tpl = jinja_env.get_template(RECIBO_TEMPLATE)
-    ctx = _build_receipt_context(db, cli, pago, now)
-    html = tpl.render(**ctx)
-    _render_pdf_from_html(path_pdf, html)
-
-    pago.recibo_pdf_path = os.path.abspath(path_pdf)
-    pago.recibo_snapshot_json = ctx
-
     db.add(pago)
-    db.commit()
-    db.refresh(pago)
+    job_id = _generar_recibo(db, cli, pago, now, principal.user_id)
 
-    return {
+    db.flush()
+    resp = {
         "id": pago.id,
         "estado": pago.estado.value,
         "recibo_num": pago.recibo_num,
         "recibo_pdf_url": f"/pagos/{pago.id}/recibo.pdf",
+        "recibo_job_id": job_id,
     }
+    if idem:
+        idempotencia.guardar(db, *idem, 200, resp)
+    contadores.pago_actualizado(db, None, pago)
+    db.commit()
+    db.refresh(pago)
+    return resp
 
 
 @Pago.post(
@@ -367,6 +666,7 @@ def registrar_efectivo(
     summary="Registrar pago por transferencia (en revisión; requiere comprobante)",
 )
 async def registrar_transferencia(
+    background_tasks: BackgroundTasks,
     req: Request,
     cliente_id: int = Form(...),
     monto: float = Form(...),
@@ -378,11 +678,8 @@ async def registrar_transferencia(
     descripcion: Optional[str] = Form(None),
     comprobante: UploadFile = File(...),
     db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
-
     if monto <= 0:
         raise HTTPException(status_code=422, detail="Monto debe ser > 0")
     if not (1 <= periodo_month <= 12):
@@ -390,16 +687,36 @@ async def registrar_transferencia(
     if moneda != "ARS":
         raise HTTPException(status_code=422, detail="Moneda inválida")
 
+    idem = _idem(req, principal, "transferencia")
+    if idem:
+        huella = idempotencia.huella(
+            cliente_id,
+            monto,
+            moneda,
+            periodo_year,
+            periodo_month,
+            es_adelantado,
+            concepto,
+            descripcion,
+            comprobante.filename,
+            await run_in_threadpool(_huella_archivo, comprobante.file),
+        )
+        # puede esperar a un duplicado concurrente: fuera del event loop
+        previa = await run_in_threadpool(_idem_previa, db, idem, huella)
+        if previa is not None:
+            return previa
+
     cli = db.get(ClienteModel, cliente_id)
     if not cli:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    data = await comprobante.read()
-    path_comp = _save_comprobante_bytes(
+    # el archivo ya está en un SpooledTemporaryFile: se sube por bloques
+    clave_comp = await run_in_threadpool(
+        _guardar_comprobante,
         cli.id,
         comprobante.filename or "comprobante",
         comprobante.content_type or "",
-        data,
+        comprobante.file,
     )
 
     pago = PagoModel(
@@ -414,23 +731,23 @@ async def registrar_transferencia(
         es_adelantado=es_adelantado,
         concepto=concepto,
         descripcion=descripcion,
-        comprobante_path=os.path.abspath(path_comp),
+        comprobante_path=clave_comp,
     )
     db.add(pago)
+    db.flush()
+    resp = {"id": pago.id, "estado": pago.estado.value}
+    if idem:
+        idempotencia.guardar(db, *idem, 200, resp)
+    contadores.pago_actualizado(db, None, pago)
     db.commit()
     db.refresh(pago)
-    return {"id": pago.id, "estado": pago.estado.value}
-
+    # vista previa liviana para la cola de revisión (después de responder)
+    background_tasks.add_task(miniaturas.generar_seguro, clave_comp)
+    return resp
 
-@Pago.put("/{pago_id}/confirmar", summary="Confirmar pago (genera PDF)")
-def confirmar_pago(pago_id: int, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
 
-    pago = db.get(PagoModel, pago_id)
-    if not pago:
-        raise HTTPException(status_code=404, detail="Pago no encontrado")
+def _confirmar(db: Session, pago: PagoModel, principal: Principal) -> dict:
+    """Confirma `pago` (ya tomado con lock) y genera el recibo."""
     if pago.estado == EstadoPagoEnum.confirmado:
         raise HTTPException(status_code=409, detail="El pago ya está confirmado")
     if pago.estado == EstadoPagoEnum.anulado:
@@ -443,23 +760,14 @@ def confirmar_pago(pago_id: int, req: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
     now = datetime.utcnow()
+    antes = contadores.snapshot_pago(pago)
     pago.estado = EstadoPagoEnum.confirmado
+    revision.soltar(pago)
     if not pago.recibo_num:
         pago.recibo_num = _gen_recibo_num(db, now)
+    job_id = _generar_recibo(db, cli, pago, now, principal.user_id)
 
-    out_dir = os.path.join(UPLOAD_ROOT, "recibos", str(now.year), f"{now.month:02d}")
-    _ensure_dir(out_dir)
-    fname = f"{pago.recibo_num}__{_safe_name(cli.apellido)}-{_safe_name(cli.nombre)}__{pago.periodo_year}-{str(pago.periodo_month).zfill(2)}.pdf"
-    path_pdf = os.path.join(out_dir, fname)
-
-    tpl = jinja_env.get_template(RECIBO_TEMPLATE)
-    ctx = _build_receipt_context(db, cli, pago, now)
-    html = tpl.render(**ctx)
-    _render_pdf_from_html(path_pdf, html)
-
-    pago.recibo_pdf_path = os.path.abspath(path_pdf)
-    pago.recibo_snapshot_json = ctx
-
+    contadores.pago_actualizado(db, antes, pago)
     db.commit()
     db.refresh(pago)
 
@@ -467,17 +775,47 @@ def confirmar_pago(pago_id: int, req: Request, db: Session = Depends(get_db)):
         "message": "Pago confirmado",
         "recibo_num": pago.recibo_num,
         "recibo_pdf_url": f"/pagos/{pago.id}/recibo.pdf",
+        "recibo_job_id": job_id,
     }
 
 
+def _anular(db: Session, pago: PagoModel, motivo: str) -> dict:
+    antes = contadores.snapshot_pago(pago)
+    pago.estado = EstadoPagoEnum.anulado
+    revision.soltar(pago)
+    contadores.pago_actualizado(db, antes, pago)
+    db.commit()
+    return {"message": f"Pago anulado. Motivo: {motivo}"}
+
+
+def _tomar_pago(db: Session, pago_id: int, principal: Principal) -> PagoModel:
+    """Pago con lock de fila; 409 si otro revisor lo tiene reclamado."""
+    pago = revision.tomar(db, pago_id)
+    if not pago:
+        raise HTTPException(status_code=404, detail="Pago no encontrado")
+    if revision.ocupado_por_otro(pago, principal.user_id):
+        raise HTTPException(
+            status_code=409, detail="El pago está reclamado por otro revisor"
+        )
+    return pago
+
+
+@Pago.put("/{pago_id}/confirmar", summary="Confirmar pago (genera PDF)")
+def confirmar_pago(
+    pago_id: int,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    return _confirmar(db, _tomar_pago(db, pago_id, principal), principal)
+
+
 @Pago.put("/{pago_id}", summary="Actualizar pago (ver reglas por estado)")
 def actualizar_pago(
-    pago_id: int, req: Request, body: PagoUpdate, db: Session = Depends(get_db)
+    pago_id: int,
+    body: PagoUpdate,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
-
     pago = db.get(PagoModel, pago_id)
     if not pago:
         raise HTTPException(status_code=404, detail="Pago no encontrado")
@@ -517,18 +855,15 @@ def actualizar_pago(
 
 @Pago.delete("/{pago_id}", summary="Anular pago (requiere motivo)")
 def anular_pago(
-    pago_id: int, req: Request, body: MotivoAnulacion, db: Session = Depends(get_db)
+    pago_id: int,
+    body: MotivoAnulacion,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    # Regla: si está confirmado, sólo gerente puede anular
-    from auth.roles import parse_roles_from_headers
-
-    roles = parse_roles_from_headers(req.headers)
+    pago = _tomar_pago(db, pago_id, principal)
 
-    pago = db.get(PagoModel, pago_id)
-    if not pago:
-        raise HTTPException(status_code=404, detail="Pago no encontrado")
-
-    if pago.estado == EstadoPagoEnum.confirmado and "gerente" not in roles:
+    # Regla: si está confirmado, sólo gerente puede anular
+    if pago.estado == EstadoPagoEnum.confirmado and not principal.tiene_rol("gerente"):
         return JSONResponse(
             status_code=403,
             content={"message": "Solo gerente puede anular pagos confirmados"},
@@ -536,158 +871,351 @@ def anular_pago(
     if pago.estado == EstadoPagoEnum.anulado:
         raise HTTPException(status_code=409, detail="El pago ya está anulado")
 
-    pago.estado = EstadoPagoEnum.anulado
-    db.commit()
-    return {"message": f"Pago anulado. Motivo: {body.motivo}"}
+    return _anular(db, pago, body.motivo)
 
 
-@Pago.get("/{pago_id}", summary="Detalle de pago")
-def obtener_pago(pago_id: int, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador", "cliente"})
-    if guard:
-        return guard
+# --------------------------------------------------------------------
+# Cola de revisión de transferencias (services/revision.py)
+# --------------------------------------------------------------------
+def _revisor(principal: Principal) -> int:
+    if principal.user_id is None:
+        raise HTTPException(status_code=403, detail="Token sin user_id")
+    return principal.user_id
+
+
+def _pago_reclamado(db: Session, pago_id: int, principal: Principal) -> PagoModel:
+    """Pago en revisión reclamado por quien resuelve (lease vencido vale si nadie lo tomó)."""
+    pago = _tomar_pago(db, pago_id, principal)
+    if pago.estado != EstadoPagoEnum.en_revision:
+        raise HTTPException(status_code=409, detail="El pago no está en revisión")
+    if pago.revision_por != _revisor(principal):
+        raise HTTPException(
+            status_code=409, detail="Reclamá el pago antes de resolverlo"
+        )
+    return pago
 
-    pago = db.get(PagoModel, pago_id)
-    if not pago:
-        raise HTTPException(status_code=404, detail="Pago no encontrado")
 
-    from auth.roles import parse_roles_from_headers, parse_user_from_headers
+@Pago.post("/revision/claim", summary="Reclamar próximos pagos en revisión")
+def reclamar_revision(
+    body: RevisionClaim,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    pagos, hasta = revision.reclamar(db, _revisor(principal), body.cantidad)
+    items = [
+        {
+            **pago_item(p),
+            "comprobante_preview": f"/pagos/{p.id}/comprobante/preview",
+        }
+        for p in pagos
+    ]
+    return JSONResponse(
+        status_code=200,
+        content={
+            "items": items,
+            "lease_hasta": hasta.isoformat(),
+            "lease_seg": revision.LEASE_SEG,
+        },
+    )
 
-    roles = parse_roles_from_headers(req.headers)
-    user = parse_user_from_headers(req.headers)
-    if "cliente" in roles and user and getattr(user, "cliente_id", None):
-        if user.cliente_id != pago.cliente_id:
-            return JSONResponse(status_code=403, content={"message": "No autorizado"})
 
-    return {
-        "id": pago.id,
-        "cliente_id": pago.cliente_id,
-        "fecha": pago.fecha.isoformat(),
-        "monto": float(pago.monto),
-        "moneda": pago.moneda,
-        "metodo": pago.metodo.value,
-        "estado": pago.estado.value,
-        "periodo_year": pago.periodo_year,
-        "periodo_month": pago.periodo_month,
-        "es_adelantado": pago.es_adelantado,
-        "concepto": pago.concepto,
-        "descripcion": pago.descripcion,
-        "comprobante": (
-            f"/pagos/{pago.id}/comprobante" if pago.comprobante_path else None
-        ),
-        "recibo_num": pago.recibo_num,
-        "recibo_pdf": f"/pagos/{pago.id}/recibo.pdf" if pago.recibo_pdf_path else None,
-    }
+@Pago.post("/revision/release", summary="Devolver pagos reclamados a la cola")
+def liberar_revision(
+    body: PagoBatch,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    n = revision.liberar(db, _revisor(principal), list(set(body.ids)))
+    return {"liberados": n}
 
 
-@Pago.post("/search", summary="Buscar pagos (paginación + filtros)")
-def buscar_pagos(req: Request, body: PagoSearch, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
+@Pago.post(
+    "/revision/{pago_id}/confirmar", summary="Confirmar un pago reclamado (genera PDF)"
+)
+def confirmar_revision(
+    pago_id: int,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    return _confirmar(db, _pago_reclamado(db, pago_id, principal), principal)
 
-    q = db.query(PagoModel)
 
-    if body.cliente_id:
-        q = q.filter(PagoModel.cliente_id == body.cliente_id)
-    if body.metodo:
-        q = q.filter(PagoModel.metodo == MetodoPagoEnum(body.metodo))
-    if body.estado:
-        q = q.filter(PagoModel.estado == EstadoPagoEnum(body.estado))
-    if body.fecha_desde:
-        q = q.filter(PagoModel.fecha >= datetime.combine(body.fecha_desde, time.min))
-    if body.fecha_hasta:
-        q = q.filter(PagoModel.fecha <= datetime.combine(body.fecha_hasta, time.max))
-    if body.monto_min is not None:
-        q = q.filter(PagoModel.monto >= body.monto_min)
-    if body.monto_max is not None:
-        q = q.filter(PagoModel.monto <= body.monto_max)
+@Pago.post("/revision/{pago_id}/rechazar", summary="Rechazar un pago reclamado")
+def rechazar_revision(
+    pago_id: int,
+    body: MotivoAnulacion,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    return _anular(db, _pago_reclamado(db, pago_id, principal), body.motivo)
 
-    if body.ordenar_por == "fecha":
-        sort_col = PagoModel.fecha
-    elif body.ordenar_por == "monto":
-        sort_col = PagoModel.monto
-    else:  # periodo
-        sort_col = (PagoModel.periodo_year, PagoModel.periodo_month)
 
-    direction = asc if body.orden == "asc" else desc
-    if isinstance(sort_col, tuple):
-        q = q.order_by(*[direction(c) for c in sort_col])
-    else:
-        q = q.order_by(direction(sort_col), desc(PagoModel.id))
+@Pago.get("/{pago_id}", summary="Detalle de pago")
+def obtener_pago(
+    pago_id: int,
+    req: Request,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(staff_o_cliente),
+):
+    # GET condicional: ownership + versión con una consulta de dos columnas
+    fila = (
+        db.query(PagoModel.cliente_id, PagoModel.actualizado_en)
+        .filter(PagoModel.id == pago_id)
+        .first()
+    )
+    if not fila:
+        raise HTTPException(status_code=404, detail="Pago no encontrado")
+
+    if not principal.puede_ver_cliente(fila.cliente_id):
+        return JSONResponse(status_code=403, content={"message": "No autorizado"})
+
+    tag = etag.etag_fila("p", pago_id, fila.actualizado_en)
+    if etag.coincide(req.headers, tag):
+        return etag.no_modificado(tag)
+
+    pago = db.get(PagoModel, pago_id)
+    return JSONResponse(
+        status_code=200, content=pago_detalle(pago), headers=etag.cabeceras(tag)
+    )
+
+
+@Pago.post("/search", summary="Buscar pagos (paginación + filtros)")
+def buscar_pagos(
+    body: PagoSearch,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    q = _filtrar_pagos(db.query(PagoModel), body)
 
     total_count = q.count()
     offset = (body.page - 1) * body.limit
     filas = q.offset(offset).limit(body.limit).all()
 
-    items = [
-        {
-            "id": p.id,
-            "cliente_id": p.cliente_id,
-            "fecha": p.fecha.isoformat(),
-            "monto": float(p.monto),
-            "moneda": p.moneda,
-            "metodo": p.metodo.value,
-            "estado": p.estado.value,
-            "periodo_year": p.periodo_year,
-            "periodo_month": p.periodo_month,
-            "es_adelantado": p.es_adelantado,
-            "concepto": p.concepto,
-        }
-        for p in filas
-    ]
+    items = [pago_item(p) for p in filas]
 
     total_pages = ceil(total_count / body.limit) if body.limit else 1
-    return {
-        "items": items,
-        "page": body.page,
-        "limit": body.limit,
-        "total_count": total_count,
-        "total_pages": total_pages,
-        "has_prev": body.page > 1,
-        "has_next": body.page < total_pages,
-    }
+    return JSONResponse(
+        status_code=200,
+        content={
+            "items": items,
+            "page": body.page,
+            "limit": body.limit,
+            "total_count": total_count,
+            "total_pages": total_pages,
+            "has_prev": body.page > 1,
+            "has_next": body.page < total_pages,
+        },
+    )
 
 
-@Pago.get("/{pago_id}/recibo.pdf", summary="Descargar recibo PDF")
-def descargar_recibo(pago_id: int, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador", "cliente"})
-    if guard:
-        return guard
+@Pago.post("/batch", summary="Traer varios pagos por id")
+def pagos_batch(
+    body: PagoBatch,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(staff_o_cliente),
+):
+    """
+    Devuelve {id: pago} en una sola consulta `id = ANY(:ids)`.
+    Un usuario con rol cliente sólo recibe sus propios pagos.
+    """
+    q = db.query(PagoModel).filter(
+        PagoModel.id
+        == any_(bindparam("ids", list(set(body.ids)), type_=ARRAY(Integer)))
+    )
+    if principal.tiene_rol("cliente"):
+        q = q.filter(PagoModel.cliente_id == principal.cliente_id)
 
-    pago = db.get(PagoModel, pago_id)
-    if not pago or not pago.recibo_pdf_path:
-        raise HTTPException(status_code=404, detail="Recibo no disponible")
+    items = {str(p.id): pago_detalle(p) for p in q.all()}
+    missing = [i for i in dict.fromkeys(body.ids) if str(i) not in items]
+    return JSONResponse(status_code=200, content={"items": items, "missing": missing})
 
-    from auth.roles import parse_roles_from_headers, parse_user_from_headers
 
-    roles = parse_roles_from_headers(req.headers)
-    user = parse_user_from_headers(req.headers)
-    if "cliente" in roles and user and getattr(user, "cliente_id", None):
-        if user.cliente_id != pago.cliente_id:
-            return JSONResponse(status_code=403, content={"message": "No autorizado"})
+@Pago.post("/export", summary="Exportar pagos filtrados (CSV/XLSX en streaming)")
+def exportar_pagos(
+    body: PagoExport,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    if body.en_segundo_plano:
+        job = jobs.encolar(
+            db,
+            "pagos.export",
+            body.model_dump(mode="json", exclude={"en_segundo_plano"}),
+            creado_por=principal.user_id,
+        )
+        db.commit()
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "estado_url": f"/jobs/{job.id}"},
+        )
 
-    if not os.path.isfile(pago.recibo_pdf_path):
-        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+
+    if body.formato == "xlsx":
+        path = _write_xlsx(db, body)
+        return FileResponse(
+            path,
+            media_type=_EXPORT_MEDIA["xlsx"],
+            filename=f"pagos-{stamp}.xlsx",
+            background=BackgroundTask(os.remove, path),
+        )
+
+    return StreamingResponse(
+        _stream_csv(body),
+        media_type=_EXPORT_MEDIA["csv"],
+        headers={"Content-Disposition": f'attachment; filename="pagos-{stamp}.csv"'},
+    )
+
+
+@Pago.post(
+    "/recibos/regenerar",
+    summary="Regenerar recibos desde su snapshot (en segundo plano)",
+    description=(
+        "Vuelve a renderizar los PDFs con la plantilla actual usando los datos "
+        "guardados al emitir (`recibo_snapshot_json`). Filtros combinables por "
+        "período, rango de ids y versión de plantilla. Responde 202 con un job: "
+        "progreso, velocidad y fallas en `GET /jobs/{id}`."
+    ),
+)
+def regenerar_recibos(
+    body: RegenerarRecibos,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_gerente),
+):
+    job = jobs.encolar(
+        db,
+        "recibos.regenerar",
+        body.model_dump(exclude_none=True),
+        creado_por=principal.user_id,
+    )
+    db.commit()
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "estado_url": f"/jobs/{job.id}",
+            "version_plantilla": recibos.version_plantilla(),
+        },
+    )
+
+
+@Pago.post(
+    "/recibos/imprimir",
+    summary="Imprimir varios recibos en un solo PDF",
+    description=(
+        "Renderiza los recibos elegidos (por `ids` o por los filtros de "
+        "`search`) en un único PDF de varias hojas, en una sola pasada del "
+        "motor: hoja de estilo, fuentes y logo van una vez en el archivo. Usa "
+        "los datos de emisión (`recibo_snapshot_json`). Los ids sin recibo van "
+        "en el header `X-Recibos-Omitidos`."
+    ),
+)
+def imprimir_recibos(
+    body: ImprimirRecibos,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    # sin snapshot (emitidos antes de guardarlos) no hay datos para el recibo
+    q = db.query(PagoModel.id, PagoModel.recibo_snapshot_json).filter(
+        PagoModel.recibo_snapshot_json.isnot(None)
+    )
+    if body.ids:
+        ids = list(dict.fromkeys(body.ids))
+        snaps = {i: s for i, s in q.filter(PagoModel.id.in_(ids)) if s}
+        filas = [(i, snaps[i]) for i in ids if i in snaps]
+        omitidos = [i for i in ids if i not in snaps]
+    else:
+        filas = _filtrar_pagos(q, body).limit(IMPRIMIR_MAX + 1).all()
+        if len(filas) > IMPRIMIR_MAX:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Más de {IMPRIMIR_MAX} recibos: acotar el filtro",
+            )
+        filas = [f for f in filas if f[1]]
+        omitidos = []
+    if not filas:
+        raise HTTPException(status_code=404, detail="No hay recibos para imprimir")
+
+    html = recibos.render_html_lote([snap for _, snap in filas])
+    fd, path = tempfile.mkstemp(prefix="recibos-", suffix=".pdf")
+    os.close(fd)
+    try:
+        recibos.render_pdf(path, html)
+    except Exception:
+        os.remove(path)
+        raise
+
+    headers = {"X-Recibos-Cantidad": str(len(filas))}
+    if omitidos:
+        headers["X-Recibos-Omitidos"] = ",".join(map(str, omitidos))
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"recibos-{stamp}.pdf",
+        headers=headers,
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@Pago.get("/{pago_id}/recibo.pdf", summary="Descargar recibo PDF")
+def descargar_recibo(
+    pago_id: int,
+    req: Request,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(staff_o_cliente),
+):
+    pago = (
+        db.query(
+            PagoModel.cliente_id, PagoModel.recibo_pdf_path, PagoModel.recibo_num
+        )
+        .filter(PagoModel.id == pago_id)
+        .first()
+    )
+    if not pago or not (pago.recibo_pdf_path or pago.recibo_num):
+        raise HTTPException(status_code=404, detail="Recibo no disponible")
+
+    if not principal.puede_ver_cliente(pago.cliente_id):
+        return JSONResponse(status_code=403, content={"message": "No autorizado"})
+    if not pago.recibo_pdf_path:  # emitido; el worker todavía no lo renderizó
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "Recibo en preparación"},
+            headers={"Retry-After": RECIBO_RETRY_AFTER},
+        )
+
+    info = paquetes.info(pago.recibo_pdf_path)  # suelto o tramo de un paquete
+    tag = etag.etag_archivo(info)
+    if not tag:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    if etag.coincide(req.headers, tag):
+        return etag.no_modificado(tag)
+    return entrega.respuesta_archivo(
         pago.recibo_pdf_path,
         media_type="application/pdf",
-        filename=os.path.basename(pago.recibo_pdf_path),
+        filename=paquetes.nombre(pago.recibo_pdf_path),
+        headers=etag.cabeceras(tag),
+        info=info,
     )
 
 
 @Pago.get("/{pago_id}/comprobante", summary="Descargar comprobante")
-def descargar_comprobante(pago_id: int, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
-
-    pago = db.get(PagoModel, pago_id)
+def descargar_comprobante(
+    pago_id: int,
+    req: Request,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    pago = db.query(PagoModel.comprobante_path).filter(PagoModel.id == pago_id).first()
     if not pago or not pago.comprobante_path:
         raise HTTPException(status_code=404, detail="Comprobante no disponible")
 
-    if not os.path.isfile(pago.comprobante_path):
+    info = storage.get_storage().info(pago.comprobante_path)
+    tag = etag.etag_archivo(info)
+    if not tag:
         raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    if etag.coincide(req.headers, tag):
+        return etag.no_modificado(tag)
 
     mt = "application/pdf"
     lp = pago.comprobante_path.lower()
@@ -696,8 +1224,59 @@ def descargar_comprobante(pago_id: int, req: Request, db: Session = Depends(get_
     elif lp.endswith(".png"):
         mt = "image/png"
 
-    return FileResponse(
+    return entrega.respuesta_archivo(
         pago.comprobante_path,
         media_type=mt,
         filename=os.path.basename(pago.comprobante_path),
+        headers=etag.cabeceras(tag),
+        info=info,
+    )
+
+
+@Pago.get(
+    "/{pago_id}/comprobante/preview",
+    summary="Vista previa del comprobante (WebP/JPEG liviano)",
+    description=(
+        "Primera página (PDF) o imagen reducida, de pocos KB. Se genera al subir "
+        "el comprobante; si falta responde 404 con Retry-After y la genera en "
+        "segundo plano. Cache larga: el comprobante de un pago no cambia."
+    ),
+)
+def preview_comprobante(
+    pago_id: int,
+    req: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
+    pago = db.query(PagoModel.comprobante_path).filter(PagoModel.id == pago_id).first()
+    if not pago or not pago.comprobante_path:
+        raise HTTPException(status_code=404, detail="Comprobante no disponible")
+
+    st = storage.get_storage()
+    clave = miniaturas.clave_preview(pago.comprobante_path)
+    if clave is None:
+        raise HTTPException(status_code=404, detail="Vista previa no disponible")
+    info = st.info(clave)
+    if info is None:
+        if st.info(pago.comprobante_path) is None:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        # generarla lee el comprobante entero: después de responder, no acá
+        miniaturas.programar(background_tasks, pago.comprobante_path)
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "Vista previa en preparación"},
+            headers={"Retry-After": "5"},
+        )
+
+    tag = etag.etag_archivo(info)
+    headers = {"ETag": tag, "Cache-Control": PREVIEW_CACHE_CONTROL}
+    if etag.coincide(req.headers, tag):
+        return Response(status_code=304, headers=headers)
+    return entrega.respuesta_archivo(
+        clave,
+        media_type=miniaturas.MEDIA_TYPE,
+        filename=os.path.basename(clave),
+        headers=headers,
+        info=info,
     )
@@ -1,17 +1,22 @@
 # backend/routes/usuario.py
 from typing import Optional
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy.orm import Session
 
 from configs.db import get_db
 from models.modelo import Usuario as UsuarioModel, RoleEnum, Cliente as ClienteModel
 from auth.security import Security
-from auth.roles import require_roles
+from auth import passwords
+from auth.roles import Principal, get_principal, require_principal
+from services.serializers import JSONResponse, usuario_out
 
 Usuario = APIRouter(tags=["Usuarios"])
 
+solo_staff = require_principal({"gerente", "operador"})
+solo_gerente = require_principal({"gerente"})
+
 
 # --------- Schemas ---------
 class InputUsuarioCreate(BaseModel):
@@ -32,6 +37,38 @@ class InputPaginatedRequest(BaseModel):
     last_seen_id: Optional[int] = None
 
 
+# --------- Helpers ---------
+def _buscar_usuario_login(db: Session, us: InputLogin) -> Optional[UsuarioModel]:
+    if us.email:
+        return (
+            db.query(UsuarioModel)
+            .filter(UsuarioModel.email == us.email.lower())
+            .first()
+        )
+    doc_norm = "".join(c for c in (us.documento or "") if c.isdigit())
+    return db.query(UsuarioModel).filter(UsuarioModel.documento == doc_norm).first()
+
+
+def _emitir_sesion(db: Session, user: UsuarioModel, nuevo_hash: Optional[str]):
+    """
+    Persiste el re-hash (texto plano / costo viejo), resuelve cliente_id y
+    emite el token. Devuelve (token, datos del usuario).
+    """
+    cliente_id = None
+    if user.role == RoleEnum.cliente:
+        cliente_id = (
+            db.query(ClienteModel.id)
+            .filter(ClienteModel.usuario_id == user.id)
+            .scalar()
+        )
+    token = Security.generate_token(user, cliente_id=cliente_id)
+    user_out = usuario_out(user)
+    if nuevo_hash:
+        user.password_hash = nuevo_hash
+        db.commit()
+    return token, user_out
+
+
 # --------- Rutas ---------
 @Usuario.get(
     "/",
@@ -47,26 +84,14 @@ def hello_user():
     summary="Perfil del usuario autenticado",
     description="Devuelve información básica del usuario autenticado, incluyendo role y cliente_id si aplica.",
 )
-def me(req: Request, db: Session = Depends(get_db)):
-    payload = Security.verify_token(req.headers)
-    if not isinstance(payload, dict) or "iat" not in payload:
-        return JSONResponse(status_code=401, content=payload)
-
-    role = payload.get("role")
-    user_id = payload.get("user_id")
-    cliente_id = None
-
-    if role == "cliente" and user_id:
-        cli = db.query(ClienteModel).filter(ClienteModel.usuario_id == user_id).first()
-        cliente_id = cli.id if cli else None
-
+def me(principal: Principal = Depends(get_principal)):
     return JSONResponse(
         status_code=200,
         content={
-            "user_id": user_id,
-            "username": payload.get("username"),
-            "role": role,
-            "cliente_id": cliente_id,
+            "user_id": principal.user_id,
+            "username": principal.username,
+            "role": principal.role,
+            "cliente_id": principal.cliente_id,
         },
     )
 
@@ -76,25 +101,14 @@ def me(req: Request, db: Session = Depends(get_db)):
     summary="Listar usuarios (admin)",
     description="Devuelve todos los usuarios con datos básicos. Requiere rol gerente u operador.",
 )
-def get_all_users(req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
-
+def get_all_users(
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
+):
     rows = db.query(UsuarioModel).order_by(UsuarioModel.id.asc()).all()
     return JSONResponse(
         status_code=200,
-        content=[
-            {
-                "id": u.id,
-                "email": u.email,
-                "documento": u.documento,
-                "role": u.role.value if hasattr(u.role, "value") else u.role,
-                "activo": u.activo,
-                "creado_en": u.creado_en.isoformat() if u.creado_en else None,
-            }
-            for u in rows
-        ],
+        content=[usuario_out(u) for u in rows],
     )
 
 
@@ -104,70 +118,66 @@ def get_all_users(req: Request, db: Session = Depends(get_db)):
     description="Lista usuarios usando cursor por id. Requiere rol gerente u operador.",
 )
 def get_users_paginated(
-    req: Request, body: InputPaginatedRequest, db: Session = Depends(get_db)
+    body: InputPaginatedRequest,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_staff),
 ):
-    guard = require_roles(req.headers, {"gerente", "operador"})
-    if guard:
-        return guard
-
     q = db.query(UsuarioModel).order_by(UsuarioModel.id.asc())
     if body.last_seen_id is not None:
         q = q.filter(UsuarioModel.id > body.last_seen_id)
     rows = q.limit(body.limit).all()
-    salida = [
-        {
-            "id": u.id,
-            "email": u.email,
-            "documento": u.documento,
-            "role": u.role.value if hasattr(u.role, "value") else u.role,
-            "activo": u.activo,
-            "creado_en": u.creado_en.isoformat() if u.creado_en else None,
-        }
-        for u in rows
-    ]
+    salida = [usuario_out(u) for u in rows]
     next_cursor = salida[-1]["id"] if len(salida) == body.limit else None
     return JSONResponse(
         status_code=200, content={"users": salida, "next_cursor": next_cursor}
     )
 
 
+@Usuario.get(
+    "/users/token-cache",
+    summary="Estadísticas del cache de tokens (solo gerente)",
+    description="Hits, misses, evictions y hit rate del cache de tokens verificados.",
+)
+def token_cache_stats(principal: Principal = Depends(solo_gerente)):
+    return JSONResponse(status_code=200, content=Security.token_cache_stats())
+
+
 @Usuario.post(
     "/users/login",
     summary="Iniciar sesión y obtener JWT",
     description="Permite autenticarse con documento o email. Devuelve token JWT y rol.",
 )
-def login_user(us: InputLogin, db: Session = Depends(get_db)):
+async def login_user(us: InputLogin, db: Session = Depends(get_db)):
+    # Handler async: las consultas van al threadpool y la verificación del hash
+    # al executor acotado de auth/passwords.py.
     try:
         if not us.email and not us.documento:
             return JSONResponse(
                 status_code=422, content={"message": "Debe enviar email o documento"}
             )
 
-        if us.email:
-            user = (
-                db.query(UsuarioModel)
-                .filter(UsuarioModel.email == us.email.lower())
-                .first()
-            )
-        else:
-            doc_norm = "".join(c for c in (us.documento or "") if c.isdigit())
-            user = (
-                db.query(UsuarioModel)
-                .filter(UsuarioModel.documento == doc_norm)
-                .first()
-            )
-
+        user = await run_in_threadpool(_buscar_usuario_login, db, us)
         if not user:
             return JSONResponse(
                 status_code=404, content={"message": "Usuario no encontrado"}
             )
 
-        if user.password_hash != us.password:
+        try:
+            ok, nuevo_hash = await passwords.verify_password_async(
+                user.password_hash, us.password
+            )
+        except passwords.PoolSaturado:
+            return JSONResponse(
+                status_code=503,
+                content={"message": "Servidor ocupado, reintente en unos segundos"},
+                headers={"Retry-After": "1"},
+            )
+        if not ok:
             return JSONResponse(
                 status_code=401, content={"message": "Credenciales inválidas"}
             )
 
-        token = Security.generate_token(user)
+        token, user_out = await run_in_threadpool(_emitir_sesion, db, user, nuevo_hash)
         if not token:
             return JSONResponse(
                 status_code=500, content={"message": "Error al generar token"}
@@ -178,15 +188,7 @@ def login_user(us: InputLogin, db: Session = Depends(get_db)):
             content={
                 "status": "success",
                 "token": token,
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "documento": user.documento,
-                    "role": (
-                        user.role.value if hasattr(user.role, "value") else user.role
-                    ),
-                    "activo": user.activo,
-                },
+                "user": user_out,
                 "message": "User logged in successfully!",
             },
         )
@@ -195,67 +197,68 @@ def login_user(us: InputLogin, db: Session = Depends(get_db)):
         return JSONResponse(status_code=500, content={"message": "Error en login"})
 
 
+def _usuario_duplicado(db: Session, email: Optional[str], doc_norm: Optional[str]):
+    if email and db.query(UsuarioModel).filter(UsuarioModel.email == email).first():
+        return "Email ya registrado"
+    if (
+        doc_norm
+        and db.query(UsuarioModel).filter(UsuarioModel.documento == doc_norm).first()
+    ):
+        return "Documento ya registrado"
+    return None
+
+
+def _insertar_usuario(db: Session, nuevo: UsuarioModel) -> dict:
+    db.add(nuevo)
+    db.commit()
+    db.refresh(nuevo)
+    return usuario_out(nuevo)
+
+
 @Usuario.post(
     "/users/add",
     summary="Crear usuario (solo gerente)",
     description="Crea un usuario administrativo o cliente. Requiere rol gerente.",
 )
-def create_user(us: InputUsuarioCreate, req: Request, db: Session = Depends(get_db)):
-    guard = require_roles(req.headers, {"gerente"})
-    if guard:
-        return guard
+async def create_user(
+    us: InputUsuarioCreate,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(solo_gerente),
+):
+    # Como login_user: consultas al threadpool y el hash al executor acotado.
     try:
         if not us.email and not us.documento:
             return JSONResponse(
                 status_code=422, content={"message": "Debe enviar email o documento"}
             )
 
+        email = us.email.lower() if us.email else None
         doc_norm = "".join(c for c in (us.documento or "") if c.isdigit()) or None
 
-        if (
-            us.email
-            and db.query(UsuarioModel)
-            .filter(UsuarioModel.email == us.email.lower())
-            .first()
-        ):
-            return JSONResponse(
-                status_code=409, content={"message": "Email ya registrado"}
-            )
-        if (
-            doc_norm
-            and db.query(UsuarioModel)
-            .filter(UsuarioModel.documento == doc_norm)
-            .first()
-        ):
+        duplicado = await run_in_threadpool(_usuario_duplicado, db, email, doc_norm)
+        if duplicado:
+            return JSONResponse(status_code=409, content={"message": duplicado})
+
+        try:
+            password_hash = await passwords.hash_password_async(us.password)
+        except passwords.PoolSaturado:
             return JSONResponse(
-                status_code=409, content={"message": "Documento ya registrado"}
+                status_code=503,
+                content={"message": "Servidor ocupado, reintente en unos segundos"},
+                headers={"Retry-After": "1"},
             )
 
         nuevo = UsuarioModel(
-            email=us.email.lower() if us.email else None,
+            email=email,
             documento=doc_norm,
-            password_hash=us.password,  # TODO: reemplazar por hash
+            password_hash=password_hash,
             role=us.role,
             activo=True,
         )
-        db.add(nuevo)
-        db.commit()
-        db.refresh(nuevo)
-
-        return JSONResponse(
-            status_code=201,
-            content={
-                "id": nuevo.id,
-                "email": nuevo.email,
-                "documento": nuevo.documento,
-                "role": (
-                    nuevo.role.value if hasattr(nuevo.role, "value") else nuevo.role
-                ),
-                "activo": nuevo.activo,
-            },
-        )
+        out = await run_in_threadpool(_insertar_usuario, db, nuevo)
+        return JSONResponse(status_code=201, content=out)
     except Exception as ex:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         print("Error create_user ---->> ", ex)
         return JSONResponse(
             status_code=500, content={"message": "Error al crear usuario"}
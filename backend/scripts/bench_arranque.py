@@ -0,0 +1,77 @@
+# backend/scripts/bench_arranque.py
+"""
+Tiempo de arranque de la API: import de `app` y primer request.
+
+    cd backend
+    python -m scripts.bench_arranque [repeticiones]
+
+Cada medición corre en un proceso nuevo (como un worker de uvicorn o un
+reinicio de --reload) y reporta la mediana:
+- import: `import app` completo (routers, modelos, middlewares).
+- primer request: startup + `GET /` con TestClient, sin tráfico previo.
+- jinja (diferido): costo del primer `recibos.jinja_env()`, que ya no se paga
+  al importar `routes.pago` sino al generar el primer recibo.
+Además lista los módulos propios más pesados según `python -X importtime`.
+Con DB_CREATE_ALL=1 en el entorno se incluye el `create_all` del startup
+(requiere Postgres).
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+_MEDIR = r"""
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.api_upcore) as c:
+    c.get("/")
+t2 = time.perf_counter()
+from services.recibos import jinja_env
+jinja_env()
+t3 = time.perf_counter()
+print(t1 - t0, t2 - t1, t3 - t2)
+"""
+
+_PROPIOS = ("app", "routes", "services", "auth", "models", "configs", "jinja2")
+
+
+def _correr(codigo: str, *flags: str):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", codigo],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+    )
+
+
+def _importtime(top: int = 10):
+    err = _correr("import app", "-X", "importtime").stderr
+    filas = []
+    for linea in err.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", linea)
+        if m and m.group(4).split(".")[0] in _PROPIOS:
+            filas.append((int(m.group(2)) / 1000, m.group(4)))
+    return sorted(filas, reverse=True)[:top]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    tiempos = [[float(x) for x in _correr(_MEDIR).stdout.split()] for _ in range(n)]
+    imp, primero, jinja = (statistics.median(col) * 1000 for col in zip(*tiempos))
+    print(f"Arranque ({n} procesos, mediana)")
+    print(f"  import app      : {imp:8.1f} ms")
+    print(f"  primer request  : {primero:8.1f} ms")
+    print(f"  jinja (diferido): {jinja:8.1f} ms")
+    print("Módulos propios más pesados (acumulado, una corrida):")
+    for ms, mod in _importtime():
+        print(f"  {ms:8.1f} ms  {mod}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/scripts/bench_compresion.py
+"""
+Tamaño de payload y latencia estimada con/sin compresión sobre enlaces lentos.
+
+    cd backend
+    python -m scripts.bench_compresion
+
+Arma payloads equivalentes a `/clientes/all` (10.000 clientes) y a una página
+de búsqueda de 200 filas, los comprime con la misma configuración que
+`CompressionMiddleware` y estima la latencia como:
+    RTT + tiempo de compresión + bytes * 8 / ancho de banda
+para un celular con señal pobre, 4G y Wi-Fi local (ver conexion-local-upcore.txt).
+"""
+
+import time
+
+from services.compresion import _Compresor, brotli
+from services.serializers import JSONResponse
+
+ENLACES = (  # nombre, Mbit/s, RTT ms
+    ("3G lento", 1.6, 150),
+    ("4G", 10.0, 60),
+    ("Wi-Fi LAN", 50.0, 5),
+)
+
+
+def _clientes(n):
+    return [
+        {
+            "id": i,
+            "nro_cliente": f"{i:06d}",
+            "nombre": ("Juan", "María", "Lucía", "Diego")[i % 4],
+            "apellido": ("Pérez", "García", "Fernández", "Gómez")[i % 4],
+            "documento": str(31000000000 + i),
+            "telefono": f"+54911{i:08d}",
+            "email": f"cli{i:06d}@demo.local",
+            "direccion": f"Calle {i % 200 + 1} Nº {i % 999 + 1}, Ciudad Demo",
+            "estado": "activo",
+            "creado_en": "2025-08-01T12:00:00",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def _medir(nombre, payload):
+    raw = JSONResponse(payload).body
+    variantes = [("identity", raw, 0.0)]
+    for enc in ("gzip", "br"):
+        if enc == "br" and brotli is None:
+            continue
+        t0 = time.perf_counter()
+        c = _Compresor(enc)
+        data = c.parte(raw) + c.fin()
+        variantes.append((enc, data, time.perf_counter() - t0))
+
+    print(f"\n{nombre}")
+    print(f"{'encoding':<9} {'bytes':>10} {'ratio':>6} {'comp ms':>8}", end="")
+    for enlace, _, _ in ENLACES:
+        print(f" {enlace:>11}", end="")
+    print()
+    for enc, data, t in variantes:
+        print(
+            f"{enc:<9} {len(data):>10,} {len(raw) / len(data):>6.1f} {t * 1e3:>8.1f}",
+            end="",
+        )
+        for _, mbps, rtt in ENLACES:
+            ms = rtt + t * 1e3 + len(data) * 8 / (mbps * 1e6) * 1e3
+            print(f" {ms:>9.0f}ms", end="")
+        print()
+
+
+def main():
+    _medir("/clientes/all (10.000 filas)", _clientes(10000))
+    _medir(
+        "/clientes/search (página de 200)",
+        {"items": _clientes(200), "page": 1, "limit": 200, "total_count": 10000},
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/scripts/bench_login.py
+"""
+Throughput de verificación de contraseñas a concurrencia realista (sin DB).
+
+    cd backend
+    python -m scripts.bench_login [concurrencia] [logins]
+
+Simula `concurrencia` logins simultáneos (inicio de turno) contra el executor
+acotado de auth/passwords.py y reporta logins/s y latencias p50/p95, además de
+la latencia de una tarea trivial del event loop mientras tanto (si el hash
+corriera en el loop o en el threadpool, esa latencia se dispararía).
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from auth import passwords
+
+
+async def _login(stored: str, lat: list):
+    t0 = time.perf_counter()
+    try:
+        ok, _ = await passwords.verify_password_async(stored, "secret")
+        assert ok
+        lat.append(time.perf_counter() - t0)
+    except passwords.PoolSaturado:
+        lat.append(None)
+
+
+async def _sonda(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - t0 - 0.01)
+
+
+async def main(concurrencia: int, total: int):
+    stored = passwords.hash_password("secret")
+    lat, lags = [], []
+    stop = asyncio.Event()
+    sonda = asyncio.create_task(_sonda(stop, lags))
+
+    t0 = time.perf_counter()
+    pendientes = set()
+    for _ in range(total):
+        if len(pendientes) >= concurrencia:
+            _, pendientes = await asyncio.wait(
+                pendientes, return_when=asyncio.FIRST_COMPLETED
+            )
+        pendientes.add(asyncio.create_task(_login(stored, lat)))
+    await asyncio.gather(*pendientes)
+    dur = time.perf_counter() - t0
+    stop.set()
+    await sonda
+
+    ok = sorted(x for x in lat if x is not None)
+    rechazados = sum(1 for x in lat if x is None)
+    print(
+        f"argon2id t={passwords.TIME_COST} m={passwords.MEMORY_KIB}KiB "
+        f"p={passwords.PARALLELISM} | workers={passwords.WORKERS} "
+        f"queue={passwords.QUEUE} | concurrencia={concurrencia}"
+    )
+    print(f"logins/s: {len(ok) / dur:8.1f}   rechazados (503): {rechazados}")
+    if ok:
+        p95 = ok[int(len(ok) * 0.95) - 1] if len(ok) > 1 else ok[0]
+        print(
+            f"latencia p50: {statistics.median(ok) * 1e3:7.1f} ms   p95: {p95 * 1e3:7.1f} ms"
+        )
+    if lags:
+        print(f"lag del event loop (máx): {max(lags) * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    c = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(c, n))
@@ -0,0 +1,119 @@
+# backend/scripts/bench_paquetes.py
+"""
+Recibos sueltos vs empaquetados: backup, listado y lecturas aleatorias.
+
+    cd backend
+    python -m scripts.bench_paquetes [n_recibos] [kb_por_recibo]
+
+Genera en un directorio temporal n recibos falsos repartidos en 12 meses
+(layout `recibos/<año>/<mes>/`), arma un paquete por mes con el mismo formato
+que `scripts.empaquetar_recibos` y mide, para cada layout:
+- listado: recorrer y hacer `stat` de todo (lo que hace rsync antes de copiar),
+- backup: tar sin compresión de todo el árbol,
+- lectura: 2.000 recibos al azar (suelto: open+read; paquete: seek+read).
+Con page cache caliente; en disco frío la diferencia de listado/backup crece.
+"""
+
+import os
+import random
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+from services.storage import LocalStorage
+
+
+def _medir(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _listar(root):
+    n = 0
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            os.stat(os.path.join(dirpath, f))
+            n += 1
+    return n
+
+
+def _tar(root, destino):
+    with tarfile.open(destino, "w") as tar:
+        tar.add(root, arcname="recibos")
+    os.remove(destino)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    kb = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    base = tempfile.mkdtemp(prefix="bench-paquetes-")
+    sueltos, empaquetados = os.path.join(base, "sueltos"), os.path.join(base, "packs")
+    try:
+        cuerpo = os.urandom(kb * 1024)
+        claves = []
+        for i in range(n):
+            clave = f"recibos/2024/{i % 12 + 1:02d}/REC-2024-{i:06d}.pdf"
+            ruta = os.path.join(sueltos, *clave.split("/"))
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, "wb") as f:
+                f.write(cuerpo)
+            claves.append(clave)
+
+        # un paquete por mes (mismo formato que scripts.empaquetar_recibos)
+        tramos = {}
+        for mes in range(1, 13):
+            rel = f"recibos/2024/{mes:02d}/pack.pack"
+            ruta = os.path.join(empaquetados, *rel.split("/"))
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, "wb") as out:
+                for c in claves:
+                    if c.startswith(f"recibos/2024/{mes:02d}/"):
+                        off = out.tell()
+                        with open(os.path.join(sueltos, *c.split("/")), "rb") as f:
+                            shutil.copyfileobj(f, out)
+                        tramos[c] = (rel, off, out.tell() - off)
+
+        st_sueltos, st_packs = LocalStorage(sueltos), LocalStorage(empaquetados)
+        muestra = random.Random(1).sample(claves, min(2000, n))
+
+        def leer_sueltos():
+            for c in muestra:
+                b"".join(st_sueltos.leer(c))
+
+        def leer_packs():
+            for c in muestra:
+                rel, off, largo = tramos[c]
+                b"".join(st_packs.leer(rel, off, off + largo))
+
+        tar_tmp = os.path.join(base, "backup.tar")
+        filas = [
+            ("archivos", _listar(sueltos), _listar(empaquetados)),
+            (
+                "listado+stat (ms)",
+                _medir(lambda: _listar(sueltos)) * 1000,
+                _medir(lambda: _listar(empaquetados)) * 1000,
+            ),
+            (
+                "backup tar (ms)",
+                _medir(lambda: _tar(sueltos, tar_tmp)) * 1000,
+                _medir(lambda: _tar(empaquetados, tar_tmp)) * 1000,
+            ),
+            (
+                f"{len(muestra)} lecturas (ms)",
+                _medir(leer_sueltos) * 1000,
+                _medir(leer_packs) * 1000,
+            ),
+        ]
+        print(f"{n} recibos de {kb} KB ({n * kb / 1024:.0f} MB)")
+        print(f"{'':22} {'sueltos':>10} {'paquetes':>10}")
+        for nombre, a, b in filas:
+            print(f"{nombre:22} {a:10.1f} {b:10.1f}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# backend/scripts/bench_serializacion.py
+"""
+Serialización de una página de 200 filas (Cliente y Pago), antes y después.
+
+    cd backend
+    python -m scripts.bench_serializacion [repeticiones]
+
+- antes: dict armado a mano + `jsonable_encoder` + json stdlib (lo que hacía
+  FastAPI con un dict devuelto por el handler).
+- ahora: `services.serializers` + `JSONResponse` (orjson), sin encoder.
+
+Reporta tiempo por página y pico de memoria asignada por página (tracemalloc).
+"""
+
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse as StdJSONResponse
+
+from models.modelo import (
+    Cliente,
+    EstadoClienteEnum,
+    EstadoPagoEnum,
+    MetodoPagoEnum,
+    Pago,
+)
+from services.serializers import JSONResponse, cliente_out, pago_item
+
+FILAS = 200
+
+
+def _clientes():
+    return [
+        Cliente(
+            id=i,
+            nro_cliente=f"{i:06d}",
+            nombre="María",
+            apellido="Fernández",
+            documento=str(31000000000 + i),
+            telefono=f"+54911{i:08d}",
+            email=f"cli{i:06d}@demo.local",
+            direccion=f"Calle {i} Nº {i}, Ciudad Demo",
+            estado=EstadoClienteEnum.activo,
+            creado_en=datetime(2025, 8, 1, 12, 0, 0),
+        )
+        for i in range(1, FILAS + 1)
+    ]
+
+
+def _pagos():
+    return [
+        Pago(
+            id=i,
+            cliente_id=i,
+            fecha=datetime(2025, 8, 1, 12, 0, 0),
+            monto=Decimal("15000.00"),
+            moneda="ARS",
+            metodo=MetodoPagoEnum.efectivo,
+            estado=EstadoPagoEnum.confirmado,
+            periodo_year=2025,
+            periodo_month=8,
+            es_adelantado=False,
+            concepto="Abono mensual",
+        )
+        for i in range(1, FILAS + 1)
+    ]
+
+
+def _antes(rows, fn):
+    page = {"items": [fn(r) for r in rows], "page": 1, "limit": FILAS}
+    return StdJSONResponse(jsonable_encoder(page)).body
+
+
+def _ahora(rows, fn):
+    page = {"items": [fn(r) for r in rows], "page": 1, "limit": FILAS}
+    return JSONResponse(page).body
+
+
+def main(n: int = 200):
+    for nombre, rows, fn in (
+        ("clientes", _clientes(), cliente_out),
+        ("pagos", _pagos(), pago_item),
+    ):
+        assert len(_antes(rows, fn)) > 0
+        for etapa, runner in (("antes", _antes), ("ahora", _ahora)):
+            t = timeit.timeit(lambda: runner(rows, fn), number=n) / n
+            tracemalloc.start()
+            runner(rows, fn)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{nombre:<9} {etapa:<6} {t * 1e3:7.3f} ms/página   "
+                f"pico {peak / 1024:8.1f} KiB/página"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
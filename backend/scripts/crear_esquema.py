@@ -0,0 +1,28 @@
+# backend/scripts/crear_esquema.py
+"""
+Crea las tablas/secuencias que falten según `models/modelo.py`.
+
+    cd backend
+    python -m scripts.crear_esquema
+
+Reemplaza el `create_all` que antes corría en cada arranque de la API. No
+altera tablas existentes: para columnas nuevas usar los SQL de `sql/`.
+"""
+
+import time
+
+from configs.db import Base, engine
+import models.modelo  # noqa: F401  (registra los modelos en Base.metadata)
+
+
+def main():
+    t0 = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    print(
+        f"Esquema sincronizado: {len(Base.metadata.tables)} tablas "
+        f"({time.perf_counter() - t0:.2f} s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
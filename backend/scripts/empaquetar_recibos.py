@@ -0,0 +1,160 @@
+# backend/scripts/empaquetar_recibos.py
+"""
+Empaqueta los recibos sueltos de meses cerrados (ver services/paquetes.py).
+
+    cd backend
+    python -m scripts.empaquetar_recibos [--hasta 2025-06] [--dry-run] [--conservar]
+
+- Por cada mes `recibos/<año>/<mes>/` anterior a --hasta (default: mes pasado,
+  el actual y el anterior quedan abiertos) concatena los PDFs sueltos en
+  `pack-<stamp>.pack` y escribe `<pack>.idx.json` (offset, largo y sha256 por
+  recibo_num).
+- Orden seguro: 1) paquete e índice publicados, 2) filas apuntando al tramo
+  (sólo si la fila sigue apuntando al suelto), 3) borrar los sueltos ya
+  reemplazados (salvo --conservar).
+- Reejecutable: sólo toma recibos sueltos; un mes ya empaquetado que recibió
+  recibos nuevos (p. ej. regenerados) genera otro paquete.
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, update
+
+from configs.db import SessionLocal
+from models.modelo import Pago
+from services import paquetes, storage
+
+PREFIJO = "recibos/"
+
+
+def _cerrado_hasta(valor: str) -> str:
+    if valor:
+        datetime.strptime(valor, "%Y-%m")  # valida
+        return valor
+    hoy = datetime.utcnow()
+    y, m = (hoy.year, hoy.month - 1) if hoy.month > 1 else (hoy.year - 1, 12)
+    return f"{y}-{m:02d}"
+
+
+def _meses(db, hasta: str):
+    # "recibos/2025/08/" -> 16 caracteres
+    col = func.substr(Pago.recibo_pdf_path, 1, len(PREFIJO) + 8)
+    filas = (
+        db.query(col)
+        .filter(Pago.recibo_pdf_path.like(PREFIJO + "%"))
+        .filter(~Pago.recibo_pdf_path.contains(paquetes.SEP))
+        .distinct()
+        .all()
+    )
+    for (prefijo,) in sorted(filas):
+        _, y, m, _ = prefijo.split("/")
+        if f"{y}-{m}" < hasta:
+            yield prefijo
+
+
+def _empaquetar_mes(db, st, prefijo: str, dry_run: bool, conservar: bool, stats):
+    filas = (
+        db.query(Pago.id, Pago.recibo_num, Pago.recibo_pdf_path)
+        .filter(Pago.recibo_pdf_path.like(prefijo + "%"))
+        .filter(~Pago.recibo_pdf_path.contains(paquetes.SEP))
+        .order_by(Pago.id)
+        .all()
+    )
+    if not filas:
+        return
+    if dry_run:
+        print(f"  {prefijo}: {len(filas)} recibos (simulado)")
+        stats["recibos"] += len(filas)
+        return
+
+    pack = storage.unir(prefijo, f"pack-{datetime.utcnow():%Y%m%d%H%M%S}.pack")
+    indice, cambios = {}, []
+    with st.escribir(pack) as tmp, open(tmp, "wb") as out:
+        for f in filas:
+            if st.info(f.recibo_pdf_path) is None:
+                print(f"  falta archivo ---->> pago #{f.id}: {f.recibo_pdf_path}")
+                stats["faltantes"] += 1
+                continue
+            offset, h = out.tell(), hashlib.sha256()
+            for bloque in st.leer(f.recibo_pdf_path):
+                out.write(bloque)
+                h.update(bloque)
+            largo = out.tell() - offset
+            nombre = f.recibo_pdf_path.rsplit("/", 1)[-1]
+            indice[f.recibo_num or f"pago-{f.id}"] = {
+                "pago_id": f.id,
+                "offset": offset,
+                "largo": largo,
+                "archivo": nombre,
+                "sha256": h.hexdigest(),
+            }
+            cambios.append(
+                {
+                    "b_id": f.id,
+                    "b_viejo": f.recibo_pdf_path,
+                    "b_nuevo": paquetes.ref_tramo(pack, offset, largo, nombre),
+                }
+            )
+        total = out.tell()
+    if not cambios:
+        st.borrar(pack)
+        return
+    st.guardar(
+        pack + ".idx.json",
+        json.dumps({"pack": pack, "bytes": total, "recibos": indice}).encode(),
+    )
+
+    # sólo filas que siguen apuntando al suelto (no regeneradas mientras tanto)
+    db.execute(
+        update(Pago.__table__)
+        .where(Pago.id == bindparam("b_id"))
+        .where(Pago.recibo_pdf_path == bindparam("b_viejo"))
+        .values(recibo_pdf_path=bindparam("b_nuevo")),
+        cambios,
+    )
+    db.commit()
+
+    reemplazados = {
+        id_
+        for (id_,) in db.query(Pago.id).filter(
+            Pago.recibo_pdf_path.like(pack + paquetes.SEP + "%")
+        )
+    }
+    if not conservar:
+        for c in cambios:
+            if c["b_id"] in reemplazados:
+                st.borrar(c["b_viejo"])
+    stats["recibos"] += len(reemplazados)
+    stats["paquetes"] += 1
+    stats["bytes"] += total
+    print(f"  {prefijo}: {len(reemplazados)} recibos -> {pack} ({total / 1e6:.1f} MB)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("--hasta", help="primer mes abierto YYYY-MM (no se toca)")
+    ap.add_argument("--dry-run", action="store_true", help="sólo lista los meses")
+    ap.add_argument("--conservar", action="store_true", help="no borra los sueltos")
+    args = ap.parse_args()
+
+    hasta = _cerrado_hasta(args.hasta)
+    st = storage.get_storage()
+    stats = {"paquetes": 0, "recibos": 0, "faltantes": 0, "bytes": 0}
+    db = SessionLocal()
+    try:
+        for prefijo in list(_meses(db, hasta)):
+            _empaquetar_mes(db, st, prefijo, args.dry_run, args.conservar, stats)
+    finally:
+        db.close()
+    print(
+        f"Listo (meses anteriores a {hasta}): {stats['paquetes']} paquetes, "
+        f"{stats['recibos']} recibos, {stats['bytes'] / 1e6:.1f} MB, "
+        f"{stats['faltantes']} faltantes"
+    )
+
+
+if __name__ == "__main__":
+    main()
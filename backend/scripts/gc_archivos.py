@@ -0,0 +1,232 @@
+# backend/scripts/gc_archivos.py
+"""
+GC de archivos huérfanos del storage (comprobantes, recibos, logos, temporales).
+
+    cd backend
+    python -m scripts.gc_archivos [--dry-run] [--gracia-horas 24]
+                                  [--cuarentena-dias 7] [--exports-dias 7]
+                                  [--lote 1000] [--desde CLAVE]
+
+Huérfanos típicos: PDF/comprobante escritos antes de un commit que falló, logos
+reemplazados, `.part` de escrituras interrumpidas, previews de pagos borrados.
+
+1) Recorre el storage en orden y en streaming (`storage.listar`), de a --lote
+   claves; por lote consulta en la DB cuáles están referenciadas (nunca arma la
+   lista completa de rutas en memoria).
+2) Lo no referenciado y más viejo que --gracia-horas se mueve a
+   `cuarentena/<AAAAMMDD>/<clave>` (una subida en curso todavía no tiene fila).
+3) La cuarentena con más de --cuarentena-dias se borra, salvo que la clave
+   haya vuelto a estar referenciada (p. ej. restauración de la DB): en ese
+   caso se devuelve a su lugar.
+
+Se puede cortar y volver a correr (o seguir con --desde); cada paso es idempotente.
+Referencias: pago.comprobante_path (+ su vista previa), pago.recibo_pdf_path
+(suelto o tramo de paquete + índice), config_empresa.logo_path, los logos
+citados en `recibo_snapshot_json` (necesarios para regenerar recibos) y los
+archivos de jobs (`job.resultado.clave`, p. ej. `exports/`) terminados hace
+menos de --exports-dias: hasta entonces `GET /jobs/{id}/archivo` los sirve.
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from configs.db import SessionLocal
+from models.modelo import ConfigEmpresa, Job, Pago
+from services import paquetes, storage
+
+CUARENTENA = "cuarentena"
+_PREVIEWS = (".preview.webp", ".preview.jpg")
+_IDX = ".idx.json"
+
+
+def _base(clave: str):
+    """
+    Clave cuya referencia en la DB mantiene viva a `clave`, y su tipo:
+    ("archivo", ...) para rutas guardadas tal cual, ("pack", ...) para paquetes.
+    None: nunca referenciada (temporales).
+    """
+    if clave.endswith(".part"):
+        return None
+    for suf in _PREVIEWS:
+        if clave.endswith(suf):
+            return "archivo", clave[: -len(suf)]
+    if clave.endswith(".pack" + _IDX):
+        return "pack", clave[: -len(_IDX)]
+    if clave.endswith(".pack"):
+        return "pack", clave
+    return "archivo", clave
+
+
+def _logos_fijos(db) -> set:
+    """Logo actual + logos citados por snapshots de recibos (pocos valores)."""
+    logos = {v for (v,) in db.query(ConfigEmpresa.logo_path) if v}
+    snap = Pago.recibo_snapshot_json["logo_path"].as_string()
+    logos |= {v for (v,) in db.query(snap).filter(snap.isnot(None)).distinct()}
+    if os.getenv("COMPANY_LOGO_PATH"):
+        logos.add(os.getenv("COMPANY_LOGO_PATH"))
+    return logos
+
+
+class Referencias:
+    def __init__(self, db, local: storage.LocalStorage, exports_desde: datetime):
+        self.db = db
+        self.local = local
+        self.exports_desde = exports_desde
+        self.logos = set()
+        for v in _logos_fijos(db):
+            self.logos.add(local.clave_de(v) if storage.es_legado(v) else v)
+
+    def vivas(self, claves) -> set:
+        """Subconjunto de `claves` (con su archivo base) referenciado en la DB."""
+        archivos, packs = {}, set()
+        for c in claves:
+            b = _base(c)
+            if b and b[0] == "archivo":
+                archivos.setdefault(b[1], []).append(c)
+            elif b:
+                packs.add(b[1])
+
+        # filas sin migrar guardan la ruta absoluta
+        formas = {}
+        for base in archivos:
+            formas[base] = base
+            formas[self.local.ruta(base)] = base
+        vivas_base = set()
+        if formas:
+            for col in (Pago.comprobante_path, Pago.recibo_pdf_path):
+                for (v,) in self.db.query(col).filter(col.in_(list(formas))):
+                    vivas_base.add(formas[v])
+            de_jobs = [b for b in archivos if b.startswith("exports/")]
+            if de_jobs:
+                clave_job = Job.resultado["clave"].as_string()
+                vivas_base |= {
+                    v
+                    for (v,) in self.db.query(clave_job).filter(
+                        clave_job.in_(de_jobs),
+                        Job.terminado_en >= self.exports_desde,
+                    )
+                }
+        vivas_base |= self.logos & set(archivos)
+        for pack in packs:
+            hay = (
+                self.db.query(Pago.id)
+                .filter(Pago.recibo_pdf_path.like(pack + paquetes.SEP + "%"))
+                .first()
+            )
+            if hay:
+                vivas_base.add(pack)
+
+        vivas = set()
+        for c in claves:
+            b = _base(c)
+            if b and b[1] in vivas_base:
+                vivas.add(c)
+        return vivas
+
+
+def _lotes(it, n):
+    while True:
+        lote = list(islice(it, n))
+        if not lote:
+            return
+        yield lote
+
+
+def _barrer(st, refs, args, stats):
+    limite = time.time_ns() - int(args.gracia_horas * 3600 * 1e9)
+    hoy = datetime.utcnow().strftime("%Y%m%d")
+    candidatas = (
+        (c, i)
+        for c, i in st.listar()
+        if not c.startswith(CUARENTENA + "/") and (not args.desde or c >= args.desde)
+    )
+    for lote in _lotes(candidatas, args.lote):
+        viejas = {c: i for c, i in lote if i.mtime_ns < limite}
+        stats["revisadas"] += len(lote)
+        if not viejas:
+            continue
+        vivas = refs.vivas(list(viejas))
+        for c, info in viejas.items():
+            if c in vivas:
+                continue
+            stats["a_cuarentena"] += 1
+            stats["bytes_cuarentena"] += info.size
+            print(f"  cuarentena: {c} ({info.size} B)")
+            if not args.dry_run:
+                st.mover(c, storage.unir(CUARENTENA, hoy, c))
+        print(f"  ... {stats['revisadas']} revisadas (última: {lote[-1][0]})")
+
+
+def _purgar(st, refs, args, stats):
+    corte = (datetime.utcnow() - timedelta(days=args.cuarentena_dias)).strftime(
+        "%Y%m%d"
+    )
+    for lote in _lotes(st.listar(CUARENTENA), args.lote):
+        originales = {}
+        for c, info in lote:
+            _, fecha, original = c.split("/", 2)
+            if fecha < corte:
+                originales[original] = (c, info)
+        if not originales:
+            continue
+        vivas = refs.vivas(list(originales))
+        for original, (c, info) in originales.items():
+            if original in vivas:
+                stats["restauradas"] += 1
+                print(f"  restaurada: {original}")
+                if not args.dry_run:
+                    st.mover(c, original)
+                continue
+            stats["borradas"] += 1
+            stats["bytes_liberados"] += info.size
+            if not args.dry_run:
+                st.borrar(c)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("--dry-run", action="store_true", help="sólo informa")
+    ap.add_argument("--gracia-horas", type=float, default=24)
+    ap.add_argument("--cuarentena-dias", type=int, default=7)
+    ap.add_argument(
+        "--exports-dias", type=float, default=7, help="retención de archivos de jobs"
+    )
+    ap.add_argument("--lote", type=int, default=1000, help="claves por consulta")
+    ap.add_argument("--desde", help="retomar el barrido desde esta clave")
+    args = ap.parse_args()
+
+    st = storage.get_storage()
+    stats = dict.fromkeys(
+        (
+            "revisadas",
+            "a_cuarentena",
+            "bytes_cuarentena",
+            "restauradas",
+            "borradas",
+            "bytes_liberados",
+        ),
+        0,
+    )
+    db = SessionLocal()
+    try:
+        exports_desde = datetime.utcnow() - timedelta(days=args.exports_dias)
+        refs = Referencias(db, storage.LocalStorage(), exports_desde)
+        _purgar(st, refs, args, stats)  # primero: lo que vence hoy no se re-mueve
+        _barrer(st, refs, args, stats)
+    finally:
+        db.close()
+
+    print(
+        f"GC {'(simulado) ' if args.dry_run else ''}terminado: "
+        f"{stats['revisadas']} revisadas, {stats['a_cuarentena']} a cuarentena "
+        f"({stats['bytes_cuarentena'] / 1e6:.1f} MB), {stats['restauradas']} "
+        f"restauradas, {stats['borradas']} borradas "
+        f"({stats['bytes_liberados'] / 1e6:.1f} MB liberados)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# backend/scripts/migrar_archivos.py
+"""
+Pasa filas con rutas absolutas (comprobante_path, recibo_pdf_path, logo_path) a
+claves del storage configurado.
+
+    cd backend
+    python -m scripts.migrar_archivos [--dry-run] [--lote 500]
+
+- Archivo dentro de UPLOADS_DIR: la clave es la ruta relativa
+  (`recibos/2025/08/...pdf`). Con STORAGE_BACKEND=local no se copia nada.
+- Archivo fuera de UPLOADS_DIR: se copia a `legado/<campo>/<id>/<nombre>`.
+- Con STORAGE_BACKEND=s3 cada archivo se sube por bloques antes de actualizar
+  la fila. Los originales no se borran.
+- Archivo inexistente: se informa y la fila queda como está.
+- Idempotente: las filas ya migradas (clave relativa) no se vuelven a tocar.
+"""
+
+import argparse
+import os
+
+from sqlalchemy import or_
+
+from configs.db import SessionLocal
+from models.modelo import ConfigEmpresa, Pago
+from services import storage
+
+CAMPOS_PAGO = ("comprobante_path", "recibo_pdf_path")
+
+
+def _absoluta(col):
+    # POSIX (/...) o Windows (C:\... / C:/...)
+    return or_(col.like("/%"), col.like("_:%"))
+
+
+def _migrar_valor(st, local, campo, id_, ruta, dry_run, stats):
+    if not os.path.isfile(ruta):
+        print(f"  falta archivo ---->> {campo} #{id_}: {ruta}")
+        stats["faltantes"] += 1
+        return None
+    clave = local.clave_de(ruta)
+    copiar = not st.local or clave is None
+    if clave is None:
+        clave = storage.unir("legado", campo, id_, os.path.basename(ruta))
+    if copiar and not dry_run:
+        with open(ruta, "rb") as f:
+            st.guardar(clave, f)
+    stats["copiados" if copiar else "renombrados"] += 1
+    stats["bytes"] += os.path.getsize(ruta) if copiar else 0
+    return clave
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("--dry-run", action="store_true", help="no escribe nada")
+    ap.add_argument("--lote", type=int, default=500, help="filas por commit")
+    args = ap.parse_args()
+
+    st = storage.get_storage()
+    local = storage.LocalStorage()
+    stats = {"filas": 0, "renombrados": 0, "copiados": 0, "faltantes": 0, "bytes": 0}
+
+    db = SessionLocal()
+    try:
+        ultimo = 0
+        while True:
+            # keyset por id: cada lote es una consulta corta
+            pagos = (
+                db.query(Pago)
+                .filter(Pago.id > ultimo)
+                .filter(
+                    or_(*(_absoluta(getattr(Pago, c)) for c in CAMPOS_PAGO)),
+                )
+                .order_by(Pago.id)
+                .limit(args.lote)
+                .all()
+            )
+            if not pagos:
+                break
+            for p in pagos:
+                for campo in CAMPOS_PAGO:
+                    ruta = getattr(p, campo)
+                    if ruta and storage.es_legado(ruta):
+                        clave = _migrar_valor(
+                            st, local, campo, p.id, ruta, args.dry_run, stats
+                        )
+                        if clave:
+                            setattr(p, campo, clave)
+                stats["filas"] += 1
+            ultimo = pagos[-1].id
+            if args.dry_run:
+                db.rollback()
+            else:
+                db.commit()
+            print(f"  hasta pago #{ultimo}: {stats['filas']} filas")
+
+        cfg = db.get(ConfigEmpresa, 1)
+        if cfg and cfg.logo_path and storage.es_legado(cfg.logo_path):
+            clave = _migrar_valor(
+                st, local, "logo_path", 1, cfg.logo_path, args.dry_run, stats
+            )
+            if clave and not args.dry_run:
+                cfg.logo_path = clave
+                db.commit()
+    finally:
+        db.close()
+
+    print(
+        f"Migración {'(simulada) ' if args.dry_run else ''}terminada: "
+        f"{stats['filas']} filas, {stats['renombrados']} claves sin copia, "
+        f"{stats['copiados']} copiados ({stats['bytes'] / 1e6:.1f} MB), "
+        f"{stats['faltantes']} faltantes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# backend/scripts/purgar_idempotencia.py
+"""
+Borra las claves de idempotencia vencidas (más viejas que IDEMPOTENCIA_HORAS).
+
+    cd backend
+    python -m scripts.purgar_idempotencia
+"""
+
+from configs.db import SessionLocal
+from services import idempotencia
+
+
+def main():
+    db = SessionLocal()
+    try:
+        n = idempotencia.purgar(db)
+    finally:
+        db.close()
+    print(f"Claves de idempotencia borradas: {n}")
+
+
+if __name__ == "__main__":
+    main()
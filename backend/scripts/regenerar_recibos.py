@@ -0,0 +1,108 @@
+# backend/scripts/regenerar_recibos.py
+"""
+Regenera recibos PDF desde `recibo_snapshot_json` (p. ej. tras cambiar
+recibo.html / recibo.css). Ver services/recibos.py.
+
+    cd backend
+    python -m scripts.regenerar_recibos [--periodo 2025-08] [--id-desde N] [--id-hasta N]
+        [--version HASH | --desactualizados] [--procesos 8] [--lote 200]
+        [--checkpoint regenerar.json] [--reanudar]
+
+- Pool de `--procesos` (default: CPUs; 1: sin pool); por lotes de ids crecientes.
+- Después de cada lote escribe el checkpoint (filtros + progreso). Con
+  --reanudar sigue desde ahí (los filtros tienen que coincidir). Con
+  --desactualizados, volver a correr también retoma: los ya regenerados tienen
+  la versión actual.
+- Al final informa recibos/seg y las fallas (máx. 100 con detalle).
+"""
+
+import argparse
+import json
+import os
+
+from configs.db import SessionLocal
+from services import recibos
+
+
+def _filtros(args) -> dict:
+    f = {}
+    if args.periodo:
+        y, m = args.periodo.split("-")
+        f["periodo_year"], f["periodo_month"] = int(y), int(m)
+    if args.id_desde:
+        f["id_desde"] = args.id_desde
+    if args.id_hasta:
+        f["id_hasta"] = args.id_hasta
+    if args.version:
+        f["version"] = args.version
+    if args.desactualizados:
+        f["solo_desactualizados"] = True
+    return f
+
+
+def _guardar(path: str, filtros: dict, stats: dict):
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"filtros": filtros, "stats": stats}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("--periodo", help="YYYY-MM (periodo_year/periodo_month)")
+    ap.add_argument("--id-desde", type=int)
+    ap.add_argument("--id-hasta", type=int)
+    ap.add_argument("--version", help="sólo recibos con esta recibo_version")
+    ap.add_argument(
+        "--desactualizados",
+        action="store_true",
+        help="sólo recibos con otra versión de plantilla (o sin versión)",
+    )
+    ap.add_argument("--procesos", type=int)
+    ap.add_argument("--lote", type=int, default=200)
+    ap.add_argument("--checkpoint", default="regenerar_recibos.checkpoint.json")
+    ap.add_argument("--reanudar", action="store_true")
+    args = ap.parse_args()
+
+    filtros = _filtros(args)
+    previo = None
+    if args.reanudar and os.path.exists(args.checkpoint):
+        with open(args.checkpoint, encoding="utf-8") as f:
+            cp = json.load(f)
+        if cp["filtros"] != filtros:
+            ap.error(f"el checkpoint es de otros filtros: {cp['filtros']}")
+        previo = cp["stats"]
+        print(f"Reanudando desde pago #{previo['ultimo_id']}")
+
+    def progreso(stats):
+        _guardar(args.checkpoint, filtros, stats)
+        print(
+            f"  hasta #{stats['ultimo_id']}: {stats['ok']} ok, "
+            f"{stats['fallidos']} fallidos, {stats['recibos_por_seg']} recibos/s"
+        )
+
+    print(f"Plantilla actual: {recibos.version_plantilla()}")
+    db = SessionLocal()
+    try:
+        stats = recibos.regenerar(
+            db,
+            filtros,
+            procesos=args.procesos,
+            lote=args.lote,
+            previo=previo,
+            progreso=progreso,
+        )
+    finally:
+        db.close()
+
+    for falla in stats["fallas"]:
+        print(f"  falla ---->> pago #{falla['pago_id']}: {falla['error']}")
+    print(
+        f"Listo: {stats['ok']} regenerados, {stats['fallidos']} fallidos, "
+        f"{stats['omitidos']} sin snapshot, {stats['segundos']}s "
+        f"({stats['recibos_por_seg']} recibos/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# backend/services/compresion.py
+"""
+Compresión negociada (br / gzip) como middleware ASGI.
+
+- Elige según `Accept-Encoding` (prefiere br si el paquete Brotli está instalado).
+- No comprime respuestas chicas (< COMPRESS_MIN_BYTES), ni tipos ya comprimidos
+  (PDF, imágenes, XLSX/ZIP), ni respuestas que ya traen `Content-Encoding`.
+- Respuestas en streaming (p. ej. /pagos/export) se comprimen por bloques, sin
+  juntar el cuerpo en memoria.
+"""
+
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli  # pip install Brotli
+except ImportError:  # pragma: no cover - opcional
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "4"))  # 4-5: buen balance online
+
+_EXCLUIDOS = (
+    "application/pdf",
+    "image/",
+    "application/zip",
+    "application/gzip",
+    "application/vnd.openxmlformats-officedocument",
+    "text/event-stream",
+)
+
+
+def _negociar(accept: str):
+    pedidos = set()
+    for parte in accept.split(","):
+        token, _, params = parte.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        pedidos.add(token.strip().lower())
+    if brotli is not None and "br" in pedidos:
+        return "br"
+    if "gzip" in pedidos:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BR_QUALITY)
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip
+
+    def parte(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data)
+        return self._c.compress(data)
+
+    def fin(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.finish()
+        return self._c.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = _negociar(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        inicio = None  # http.response.start retenido hasta ver el primer cuerpo
+        compresor = None
+        directo = False
+
+        async def _send(message):
+            nonlocal inicio, compresor, directo
+            tipo = message["type"]
+            if tipo == "http.response.start":
+                inicio = message
+                return
+            if tipo != "http.response.body" or directo:
+                if inicio is not None:
+                    await send(inicio)
+                    inicio = None
+                directo = True
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if compresor is None:
+                headers = MutableHeaders(raw=inicio["headers"])
+                ctype = headers.get("content-type", "").lower()
+                if (
+                    "content-encoding" in headers
+                    or inicio["status"] in (204, 304)
+                    or ctype.startswith(_EXCLUIDOS)
+                    or (not more and len(body) < self.minimum_size)
+                ):
+                    directo = True
+                    await send(inicio)
+                    inicio = None
+                    return await send(message)
+
+                compresor = _Compresor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    # otra representación: el ETag fuerte pasa a débil
+                    headers["ETag"] = "W/" + headers["etag"]
+                del headers["content-length"]
+                if not more:
+                    data = compresor.parte(body) + compresor.fin()
+                    headers["Content-Length"] = str(len(data))
+                    await send(inicio)
+                    inicio = None
+                    return await send({**message, "body": data})
+                await send(inicio)
+                inicio = None
+
+            data = compresor.parte(body)
+            if not more:
+                data += compresor.fin()
+            if data or not more:
+                await send({**message, "body": data, "more_body": more})
+
+        await self.app(scope, receive, _send)
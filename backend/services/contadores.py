@@ -0,0 +1,226 @@
+# backend/services/contadores.py
+"""
+Contadores del dashboard en una tabla chica (`contador_dashboard`).
+
+- Cada transición de estado suma su delta en la MISMA transacción que el cambio
+  (llamar antes del `db.commit()`): todos los workers leen los mismos valores,
+  sin deriva entre procesos, y un rollback descarta también el delta.
+- Los deltas toman un advisory lock compartido; `reconciliar` lo toma exclusivo,
+  recalcula con consultas exactas y reescribe la tabla. Corre al leer si pasaron
+  `DASHBOARD_RECONCILE_SEG` segundos: sólo corrige cambios hechos por fuera de
+  la API (SQL a mano, scripts).
+- "Efectivo de hoy" se acumula por día de America/Buenos_Aires
+  (`efectivo_cantidad:<AAAA-MM-DD>`): al cambiar el día se lee otra clave, que
+  arranca en cero.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import pytz
+from sqlalchemy import delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from auth.security import Security
+from models.modelo import (
+    Cliente as ClienteModel,
+    ContadorDashboard,
+    EstadoClienteEnum,
+    Pago as PagoModel,
+    EstadoPagoEnum,
+    MetodoPagoEnum,
+)
+
+RECONCILE_SEG = int(os.getenv("DASHBOARD_RECONCILE_SEG", "300"))
+
+_t = ContadorDashboard.__table__
+_LOCK = "contador_dashboard"
+_RECONCILIADO = "_reconciliado"  # su actualizado_en es la última reconciliación
+
+
+def _pg(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _dia_local(fecha: datetime) -> str:
+    """Día local (AAAA-MM-DD) de una `fecha` UTC naive (como se guarda)."""
+    return pytz.utc.localize(fecha).astimezone(Security.hoy().tzinfo).date().isoformat()
+
+
+def _rango_hoy() -> Tuple[datetime, datetime]:
+    """Inicio/fin del día local expresados en UTC naive (como se guarda `fecha`)."""
+    ahora = Security.hoy()
+    inicio = ahora.replace(hour=0, minute=0, second=0, microsecond=0)
+    desde = inicio.astimezone(pytz.utc).replace(tzinfo=None)
+    return desde, desde + timedelta(days=1)
+
+
+def _aporte_pago(metodo, estado, fecha, monto) -> dict:
+    """{clave: valor} con lo que aporta un pago a los contadores."""
+    aporte = {}
+    if estado == EstadoPagoEnum.en_revision:
+        aporte["pagos_en_revision"] = 1
+    if (
+        metodo == MetodoPagoEnum.efectivo
+        and estado == EstadoPagoEnum.confirmado
+        and fecha is not None
+    ):
+        dia = _dia_local(fecha)
+        aporte[f"efectivo_cantidad:{dia}"] = 1
+        aporte[f"efectivo_monto:{dia}"] = Decimal(str(monto))
+    return aporte
+
+
+def _sumar(db: Session, deltas: dict) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    if _pg(db):  # espera a una reconciliación en curso (no a otros deltas)
+        db.execute(
+            text("SELECT pg_advisory_xact_lock_shared(hashtext(:k))"), {"k": _LOCK}
+        )
+    now = datetime.utcnow()
+    stmt = insert(_t)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[_t.c.clave],
+            set_={
+                "valor": _t.c.valor + stmt.excluded.valor,
+                "actualizado_en": stmt.excluded.actualizado_en,
+            },
+        ),
+        # mismo orden de filas en todas las transacciones: sin deadlocks
+        [
+            {"clave": k, "valor": deltas[k], "actualizado_en": now}
+            for k in sorted(deltas)
+        ],
+    )
+
+
+def snapshot_pago(pago: PagoModel) -> tuple:
+    """Estado relevante de un pago, para tomar antes de modificarlo."""
+    return (pago.metodo, pago.estado, pago.fecha, pago.monto)
+
+
+def pago_actualizado(db: Session, antes: Optional[tuple], pago: PagoModel) -> None:
+    """
+    Suma el delta de un pago creado (`antes=None`) o modificado. Llamar antes
+    del `db.commit()` que guarda el pago (con `fecha` ya asignada).
+    """
+    viejo = _aporte_pago(*antes) if antes else {}
+    nuevo = _aporte_pago(*snapshot_pago(pago))
+    _sumar(db, {k: nuevo.get(k, 0) - viejo.get(k, 0) for k in {*viejo, *nuevo}})
+
+
+def cliente_actualizado(
+    db: Session, antes: Optional[EstadoClienteEnum], despues
+) -> None:
+    """Suma el delta de un cliente creado (`antes=None`) o con cambio de estado."""
+    if antes == despues:
+        return
+    deltas = {}
+    for estado, delta in ((antes, -1), (despues, 1)):
+        if estado == EstadoClienteEnum.activo:
+            deltas["clientes_activos"] = deltas.get("clientes_activos", 0) + delta
+        elif estado == EstadoClienteEnum.inactivo:
+            deltas["clientes_inactivos"] = deltas.get("clientes_inactivos", 0) + delta
+    _sumar(db, deltas)
+
+
+def reconciliar(db: Session) -> None:
+    """Recalcula todos los contadores con consultas exactas (y hace commit)."""
+    if _pg(db):  # sin deltas a medio confirmar mientras se cuenta
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"), {"k": _LOCK})
+
+    en_revision = (
+        db.query(func.count(PagoModel.id))
+        .filter(PagoModel.estado == EstadoPagoEnum.en_revision)
+        .scalar()
+    )
+    desde, hasta = _rango_hoy()
+    cant, monto = (
+        db.query(func.count(PagoModel.id), func.coalesce(func.sum(PagoModel.monto), 0))
+        .filter(
+            PagoModel.metodo == MetodoPagoEnum.efectivo,
+            PagoModel.estado == EstadoPagoEnum.confirmado,
+            PagoModel.fecha >= desde,
+            PagoModel.fecha < hasta,
+        )
+        .one()
+    )
+    por_estado = dict(
+        db.query(ClienteModel.estado, func.count(ClienteModel.id))
+        .group_by(ClienteModel.estado)
+        .all()
+    )
+
+    dia = Security.hoy().date().isoformat()
+    now = datetime.utcnow()
+    valores = {
+        "pagos_en_revision": en_revision or 0,
+        f"efectivo_cantidad:{dia}": cant or 0,
+        f"efectivo_monto:{dia}": Decimal(str(monto or 0)),
+        "clientes_activos": por_estado.get(EstadoClienteEnum.activo, 0),
+        "clientes_inactivos": por_estado.get(EstadoClienteEnum.inactivo, 0),
+        _RECONCILIADO: 0,
+    }
+    db.execute(delete(_t))  # también el efectivo de días anteriores
+    db.execute(
+        insert(_t),
+        [{"clave": k, "valor": v, "actualizado_en": now} for k, v in valores.items()],
+    )
+    db.commit()
+
+
+def _filas(db: Session, dia: str) -> dict:
+    claves = [
+        "pagos_en_revision",
+        f"efectivo_cantidad:{dia}",
+        f"efectivo_monto:{dia}",
+        "clientes_activos",
+        "clientes_inactivos",
+        _RECONCILIADO,
+    ]
+    return {
+        f.clave: f
+        for f in db.query(_t.c.clave, _t.c.valor, _t.c.actualizado_en).filter(
+            _t.c.clave.in_(claves)
+        )
+    }
+
+
+def leer(db: Session) -> dict:
+    """Devuelve los contadores; reconcilia si pasaron RECONCILE_SEG segundos."""
+    dia = Security.hoy().date().isoformat()
+    filas = _filas(db, dia)
+    marca = filas.get(_RECONCILIADO)
+    if marca is None or datetime.utcnow() - marca.actualizado_en >= timedelta(
+        seconds=RECONCILE_SEG
+    ):
+        reconciliar(db)
+        filas = _filas(db, dia)
+
+    def _valor(clave):
+        f = filas.get(clave)
+        return f.valor if f is not None else Decimal("0")
+
+    reconciliado = filas.get(_RECONCILIADO)
+    return {
+        "pagos_en_revision": int(_valor("pagos_en_revision")),
+        "efectivo_hoy": {
+            "cantidad": int(_valor(f"efectivo_cantidad:{dia}")),
+            "monto": float(_valor(f"efectivo_monto:{dia}")),
+        },
+        "clientes": {
+            "activos": int(_valor("clientes_activos")),
+            "inactivos": int(_valor("clientes_inactivos")),
+        },
+        "reconciliado_en": (
+            reconciliado.actualizado_en.isoformat() if reconciliado else None
+        ),
+    }
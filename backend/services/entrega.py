@@ -0,0 +1,127 @@
+# backend/services/entrega.py
+"""
+Entrega de archivos (recibos, comprobantes) delegada al proxy.
+
+La API hace auth + ownership + ETag y, según FILE_DELIVERY, no manda los bytes:
+- `app` (default): los sirve Python (`storage.respuesta`).
+- `x-accel`: header `X-Accel-Redirect: <FILE_ACCEL_PREFIX>/<clave>`; nginx sirve
+  el archivo desde una location `internal` con sendfile (ver docs/nginx/). La
+  location reenvía el ETag de esta respuesta en lugar del propio de nginx.
+- `x-sendfile`: header `X-Sendfile: <ruta absoluta>` (Apache mod_xsendfile,
+  lighttpd, Caddy).
+- `signed`: 307 a una URL firmada de vida corta (FILE_URL_TTL_SEG). Con storage
+  S3 es la URL prefirmada del bucket; en disco local es
+  `<FILE_SIGNED_PREFIX>/<clave>?exp=..&sig=..` (HMAC-SHA256), que nginx valida
+  contra `GET /archivos/verificar` (sin DB) antes de servir el archivo.
+
+x-accel / x-sendfile requieren storage local (el proxy lee el mismo disco); con
+S3, filas sin migrar o recibos empaquetados (`services/paquetes.py`: se sirve un
+rango del paquete) se cae al modo `app`.
+"""
+
+import hashlib
+import hmac
+import os
+import time
+from typing import Optional
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from fastapi import Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+from services import paquetes, storage
+
+MODO = os.getenv("FILE_DELIVERY", "app").lower()
+ACCEL_PREFIX = os.getenv("FILE_ACCEL_PREFIX", "/_protegido").rstrip("/")
+SIGNED_PREFIX = os.getenv("FILE_SIGNED_PREFIX", "/_archivos").rstrip("/")
+URL_TTL_SEG = int(os.getenv("FILE_URL_TTL_SEG", "60"))
+_SECRETO = os.getenv("FILE_URL_SECRET", "").encode()
+
+# sin default: una clave pública en el repo permitiría falsificar URLs firmadas
+if MODO == "signed" and storage.BACKEND != "s3" and not _SECRETO:
+    raise RuntimeError(
+        "FILE_DELIVERY=signed con storage local requiere FILE_URL_SECRET"
+    )
+
+
+def firma(clave: str, exp: int) -> str:
+    msg = f"{clave}\n{exp}".encode()
+    return hmac.new(_SECRETO, msg, hashlib.sha256).hexdigest()
+
+
+def url_firmada(clave: str, ttl: int = URL_TTL_SEG) -> str:
+    exp = int(time.time()) + ttl
+    return f"{SIGNED_PREFIX}/{quote(clave)}?exp={exp}&sig={firma(clave, exp)}"
+
+
+def verificar(uri: str) -> bool:
+    """Valida una URL de `url_firmada` (path + query, tal como llega a nginx)."""
+    if not _SECRETO:
+        return False
+    partes = urlsplit(uri)
+    if not partes.path.startswith(SIGNED_PREFIX + "/"):
+        return False
+    clave = partes.path[len(SIGNED_PREFIX) + 1 :]
+    q = parse_qs(partes.query)
+    try:
+        exp = int(q["exp"][0])
+        sig = q["sig"][0]
+    except (KeyError, ValueError):
+        return False
+    if exp < time.time():
+        return False
+    return hmac.compare_digest(sig, firma(unquote(clave), exp))
+
+
+def _cabeceras(media_type: str, filename: str, headers: Optional[dict]) -> dict:
+    return {
+        **(headers or {}),
+        "Content-Type": media_type,
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+
+
+def respuesta_archivo(
+    clave: str,
+    media_type: str,
+    filename: str,
+    headers: Optional[dict] = None,
+    info: Optional[storage.InfoArchivo] = None,
+):
+    if paquetes.es_tramo(clave):
+        t = paquetes.parse(clave)
+        return StreamingResponse(
+            paquetes.leer(clave),
+            headers={
+                **_cabeceras(media_type, filename, headers),
+                "Content-Length": str(t.largo),
+            },
+        )
+
+    st = storage.get_storage()
+    local = st.local and not storage.es_legado(clave)
+
+    if MODO == "x-accel" and local:
+        return Response(
+            headers={
+                **_cabeceras(media_type, filename, headers),
+                "X-Accel-Redirect": f"{ACCEL_PREFIX}/{quote(clave)}",
+            }
+        )
+    if MODO == "x-sendfile" and local:
+        return Response(
+            headers={
+                **_cabeceras(media_type, filename, headers),
+                "X-Sendfile": st.ruta(clave),
+            }
+        )
+    if MODO == "signed" and not storage.es_legado(clave):
+        if local:
+            url = url_firmada(clave)
+        else:
+            url = st.url_firmada(clave, filename, media_type, URL_TTL_SEG)
+        # la URL vence sola: que el navegador no guarde la redirección
+        return RedirectResponse(
+            url, status_code=307, headers={"Cache-Control": "no-store"}
+        )
+    return storage.respuesta(clave, media_type, filename, headers, info)
@@ -0,0 +1,47 @@
+# backend/services/etag.py
+"""
+ETags fuertes y GET condicional (If-None-Match → 304).
+
+- Filas: derivados del id + `actualizado_en` (se leen con una consulta de una
+  columna antes de cargar/serializar la fila completa).
+- Archivos: derivados de mtime + tamaño (un `stat` o HEAD en el storage, sin
+  leer el archivo).
+"""
+
+from typing import Optional
+
+from fastapi import Response
+
+from services.storage import InfoArchivo
+
+CACHE_CONTROL = "private, no-cache"  # el navegador guarda, pero revalida siempre
+
+
+def etag_fila(tipo: str, id_: int, actualizado_en) -> str:
+    marca = int(actualizado_en.timestamp() * 1_000_000) if actualizado_en else 0
+    return f'"{tipo}{id_}-{marca:x}"'
+
+
+def etag_archivo(info: Optional[InfoArchivo]) -> Optional[str]:
+    if info is None:
+        return None
+    return f'"f{info.mtime_ns:x}-{info.size:x}"'
+
+
+def coincide(headers, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2)."""
+    inm = headers.get("if-none-match")
+    if not inm or not etag:
+        return False
+    if inm.strip() == "*":
+        return True
+    propio = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == propio for t in inm.split(","))
+
+
+def cabeceras(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers=cabeceras(etag))
@@ -0,0 +1,110 @@
+# backend/services/idempotencia.py
+"""
+Header `Idempotency-Key` para las altas de pagos (reintentos de clientes móviles).
+
+- La fila (`idempotencia`) se inserta al empezar, en la MISMA transacción que el
+  pago, y se completa con la respuesta antes del commit: o quedan los dos o
+  ninguno (un commit fallido no deja la clave "usada" sin pago).
+- Duplicado concurrente: su INSERT choca con la clave única todavía sin commit y
+  Postgres lo hace esperar a la primera transacción (hasta
+  IDEMPOTENCIA_ESPERA_MS; después 409). Al terminar la primera, recibe la
+  respuesta guardada sin renderizar PDF ni tomar número de recibo.
+- Misma clave con otro cuerpo: 422. Vencidas (IDEMPOTENCIA_HORAS) se reemplazan;
+  la limpieza general es `python -m scripts.purgar_idempotencia`.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.modelo import Idempotencia
+
+HEADER = "Idempotency-Key"
+VENTANA_HORAS = int(os.getenv("IDEMPOTENCIA_HORAS", "24"))
+ESPERA_MS = int(os.getenv("IDEMPOTENCIA_ESPERA_MS", "30000"))
+MAX_CLAVE = 100
+
+_t = Idempotencia.__table__
+
+
+class ClaveEnUso(Exception):
+    """La primera solicitud con esa clave sigue en curso (espera agotada)."""
+
+
+class ClaveReusada(Exception):
+    """Misma clave con un request distinto."""
+
+
+def huella(*partes) -> str:
+    h = hashlib.sha256()
+    for p in partes:
+        h.update(p if isinstance(p, bytes) else str(p).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _pg(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _sql_lock_timeout(ms: Optional[int]):
+    return text(f"SET LOCAL lock_timeout = {int(ms) if ms else 'DEFAULT'}")
+
+
+def iniciar(
+    db: Session, alcance: str, clave: str, huella_req: str
+) -> Optional[Idempotencia]:
+    """
+    None: es la primera vez, seguir (la fila queda pendiente en la transacción).
+    Si no, la ejecución previa con la respuesta a repetir.
+    """
+    corte = datetime.utcnow() - timedelta(hours=VENTANA_HORAS)
+    filtro = (_t.c.alcance == alcance, _t.c.clave == clave)
+    try:
+        if _pg(db):
+            db.execute(_sql_lock_timeout(ESPERA_MS))
+        db.execute(delete(_t).where(*filtro).where(_t.c.creado_en < corte))
+        nueva = db.execute(
+            insert(_t)
+            .values(alcance=alcance, clave=clave, huella=huella_req)
+            .on_conflict_do_nothing()
+            .returning(_t.c.clave)
+        ).first()
+        if _pg(db):
+            db.execute(_sql_lock_timeout(None))
+    except OperationalError:  # lock_timeout esperando a la primera
+        db.rollback()
+        raise ClaveEnUso()
+    if nueva:
+        return None
+
+    previa = db.query(Idempotencia).filter(*filtro).first()
+    if previa is None or previa.respuesta is None:
+        raise ClaveEnUso()
+    if previa.huella != huella_req:
+        raise ClaveReusada()
+    return previa
+
+
+def guardar(
+    db: Session, alcance: str, clave: str, status_code: int, respuesta: dict
+) -> None:
+    """Completa la fila; llamar antes del `db.commit()` que guarda el pago."""
+    db.execute(
+        update(_t)
+        .where(_t.c.alcance == alcance, _t.c.clave == clave)
+        .values(status_code=status_code, respuesta=respuesta)
+    )
+
+
+def purgar(db: Session) -> int:
+    corte = datetime.utcnow() - timedelta(hours=VENTANA_HORAS)
+    n = db.execute(delete(_t).where(_t.c.creado_en < corte)).rowcount
+    db.commit()
+    return n
@@ -0,0 +1,281 @@
+# backend/services/jobs.py
+"""
+Cola de jobs durable en Postgres (tabla `job`) para trabajo pesado fuera del
+request (exportaciones, PDFs, regeneraciones). Los corre `worker.py`.
+
+- Registro: `@jobs.tarea("tipo", concurrencia=2, max_intentos=5)` sobre
+  `fn(db, payload, job_id) -> dict | None` (el dict queda en `job.resultado`).
+  Los routers registran sus tareas al importarse.
+- Encolar: `jobs.encolar(db, tipo, payload)` agrega la fila a la sesión; se
+  publica con el commit del llamador (junto con sus otros cambios).
+- Dequeue: `SELECT ... FOR UPDATE SKIP LOCKED` sobre los pendientes
+  disponibles; varios workers no se bloquean ni toman el mismo job.
+- Concurrencia por tipo: la toma de cada tipo se serializa con un advisory lock
+  de transacción y cuenta los que están corriendo; nunca hay más de
+  `concurrencia` en todo el cluster.
+- Reintentos: al fallar vuelve a `pendiente` con backoff exponencial con jitter
+  (JOBS_BACKOFF_BASE_SEG, tope JOBS_BACKOFF_MAX_SEG) hasta `max_intentos`; después
+  queda en `error`.
+- Worker caído: el que corre un job actualiza `latido_en`; si pasa JOBS_LEASE_SEG
+  sin latido, `rescatar` lo devuelve a la cola (cuenta como intento).
+"""
+
+import os
+import random
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import Session
+
+from configs.db import SessionLocal
+from models.modelo import EstadoJobEnum, Job
+
+LEASE_SEG = int(os.getenv("JOBS_LEASE_SEG", "120"))
+BACKOFF_BASE_SEG = int(os.getenv("JOBS_BACKOFF_BASE_SEG", "10"))
+BACKOFF_MAX_SEG = int(os.getenv("JOBS_BACKOFF_MAX_SEG", "3600"))
+
+_t = Job.__table__
+# worker que corre el job en este hilo (lo fija `ejecutar`; lo usa `progreso`)
+_worker_actual: ContextVar[Optional[str]] = ContextVar("job_worker", default=None)
+
+
+class JobPerdido(Exception):
+    """El job fue rescatado y lo tiene otro worker: este deja de trabajar."""
+
+
+class Tarea(NamedTuple):
+    tipo: str
+    fn: Callable
+    concurrencia: int
+    max_intentos: int
+
+
+class Tomado(NamedTuple):
+    """Lo que el worker necesita del job (la fila ya quedó en `corriendo`)."""
+
+    id: int
+    tipo: str
+    payload: Optional[dict]
+    intentos: int
+    max_intentos: int
+
+
+TAREAS: Dict[str, Tarea] = {}
+
+
+def tarea(tipo: str, concurrencia: int = 1, max_intentos: int = 5):
+    def deco(fn):
+        TAREAS[tipo] = Tarea(tipo, fn, concurrencia, max_intentos)
+        return fn
+
+    return deco
+
+
+def encolar(
+    db: Session, tipo: str, payload: Optional[dict], creado_por: Optional[int] = None
+) -> Job:
+    """Agrega el job a la sesión; queda visible para los workers con el commit."""
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de job desconocido: {tipo}")
+    job = Job(
+        tipo=tipo,
+        payload=payload,
+        creado_por=creado_por,
+        max_intentos=TAREAS[tipo].max_intentos,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def backoff_seg(intento: int) -> float:
+    tope = min(BACKOFF_MAX_SEG, BACKOFF_BASE_SEG * 2 ** max(0, intento - 1))
+    return tope * random.uniform(0.5, 1.0)
+
+
+def _pg(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _tomar_de_tipo(db: Session, worker: str, tarea_: Tarea) -> Optional[Tomado]:
+    if _pg(db):
+        libre = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:k))"),
+            {"k": "job:" + tarea_.tipo},
+        ).scalar()
+        if not libre:  # otro worker está tomando de este tipo
+            return None
+    now = datetime.utcnow()
+    corriendo = (
+        db.query(func.count(Job.id))
+        .filter(Job.tipo == tarea_.tipo, Job.estado == EstadoJobEnum.corriendo)
+        .scalar()
+    )
+    if corriendo >= tarea_.concurrencia:
+        return None
+    job = (
+        db.query(Job)
+        .filter(
+            Job.tipo == tarea_.tipo,
+            Job.estado == EstadoJobEnum.pendiente,
+            Job.disponible_en <= now,
+        )
+        .order_by(Job.disponible_en, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        return None
+    job.estado = EstadoJobEnum.corriendo
+    job.intentos += 1
+    job.tomado_por = worker
+    job.latido_en = now
+    return Tomado(job.id, job.tipo, job.payload, job.intentos, job.max_intentos)
+
+
+def tomar(db: Session, worker: str, tipos: List[str]) -> Optional[Tomado]:
+    """Próximo job de alguno de `tipos` con cupo, o None."""
+    for tipo in random.sample(tipos, len(tipos)):  # sin inanición entre tipos
+        try:
+            tomado = _tomar_de_tipo(db, worker, TAREAS[tipo])
+            db.commit()  # suelta el advisory lock
+        except Exception:
+            db.rollback()
+            raise
+        if tomado:
+            return tomado
+    return None
+
+
+def _del_worker(job_id: int, worker: str):
+    # si fue rescatado y lo tomó otro, este worker ya no escribe su estado
+    return (
+        _t.c.id == job_id,
+        _t.c.tomado_por == worker,
+        _t.c.estado == EstadoJobEnum.corriendo,
+    )
+
+
+def terminar(db: Session, job: Tomado, worker: str, resultado: Optional[dict]):
+    db.execute(
+        update(_t)
+        .where(*_del_worker(job.id, worker))
+        .values(
+            estado=EstadoJobEnum.ok,
+            resultado=resultado,
+            error=None,
+            latido_en=None,
+            terminado_en=datetime.utcnow(),
+        )
+    )
+    db.commit()
+
+
+def fallar(db: Session, job: Tomado, worker: str, error: str):
+    now = datetime.utcnow()
+    if job.intentos >= job.max_intentos:
+        valores = dict(estado=EstadoJobEnum.error, terminado_en=now)
+    else:
+        valores = dict(
+            estado=EstadoJobEnum.pendiente,
+            disponible_en=now + timedelta(seconds=backoff_seg(job.intentos)),
+        )
+    db.execute(
+        update(_t)
+        .where(*_del_worker(job.id, worker))
+        .values(error=error[:4000], latido_en=None, **valores)
+    )
+    db.commit()
+
+
+def ejecutar(job: Tomado, worker: str) -> bool:
+    """Corre el job con su propia sesión y registra el resultado."""
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    token = _worker_actual.set(worker)
+    try:
+        resultado = TAREAS[job.tipo].fn(db, job.payload or {}, job.id)
+        db.commit()
+        terminar(db, job, worker, resultado)
+        print(f"job #{job.id} {job.tipo} ok ({time.perf_counter() - t0:.1f}s)")
+        return True
+    except Exception as ex:
+        db.rollback()
+        print(f"Error job #{job.id} {job.tipo} ---->> ", ex)
+        try:
+            fallar(db, job, worker, f"{type(ex).__name__}: {ex}")
+        except Exception as ex2:
+            # DB caída: el job queda `corriendo` sin latido y `rescatar` lo devuelve
+            db.rollback()
+            print(f"Error registrando falla job #{job.id} ---->> ", ex2)
+        return False
+    finally:
+        _worker_actual.reset(token)
+        db.close()
+
+
+def progreso(db: Session, job_id: int, datos: dict):
+    """Progreso parcial en `job.resultado` (visible en GET /jobs/{id}; sirve
+    para reanudar si el job se reintenta). También cuenta como latido.
+    Sólo lo escribe el worker que tiene el job: si fue rescatado, levanta
+    `JobPerdido` para no pisar el checkpoint del worker que lo tomó."""
+    worker = _worker_actual.get()
+    if worker is None:
+        raise RuntimeError("jobs.progreso fuera de jobs.ejecutar")
+    res = db.execute(
+        update(_t)
+        .where(*_del_worker(job_id, worker))
+        .values(resultado=datos, latido_en=datetime.utcnow())
+    )
+    db.commit()
+    if res.rowcount == 0:
+        raise JobPerdido(f"job #{job_id} ya no es de {worker}")
+
+
+def previo(db: Session, job_id: int) -> Optional[dict]:
+    """Progreso que dejó un intento anterior del mismo job."""
+    return db.query(Job.resultado).filter(Job.id == job_id).scalar()
+
+
+def latir(db: Session, worker: str, ids: List[int]):
+    if ids:
+        db.execute(
+            update(_t)
+            .where(_t.c.id.in_(ids), _t.c.tomado_por == worker)
+            .values(latido_en=datetime.utcnow())
+        )
+    db.commit()
+
+
+def rescatar(db: Session) -> int:
+    """Devuelve a la cola los jobs de workers que dejaron de latir."""
+    now = datetime.utcnow()
+    vencido = (
+        _t.c.estado == EstadoJobEnum.corriendo,
+        _t.c.latido_en < now - timedelta(seconds=LEASE_SEG),
+    )
+    agotados = db.execute(
+        update(_t)
+        .where(*vencido, _t.c.intentos >= _t.c.max_intentos)
+        .values(
+            estado=EstadoJobEnum.error,
+            error="Worker sin latido (intentos agotados)",
+            terminado_en=now,
+        )
+    ).rowcount
+    vuelven = db.execute(
+        update(_t)
+        .where(*vencido)
+        .values(
+            estado=EstadoJobEnum.pendiente,
+            error="Worker sin latido",
+            disponible_en=now,
+            tomado_por=None,
+        )
+    ).rowcount
+    db.commit()
+    return agotados + vuelven
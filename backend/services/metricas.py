@@ -0,0 +1,240 @@
+# backend/services/metricas.py
+"""
+Métricas en proceso con exposición en formato de texto de Prometheus.
+
+- `MetricsMiddleware`: requests por ruta (plantilla, no path real)/método/status,
+  histograma de latencia, requests en curso y header `Server-Timing`.
+- `observar_pdf` / `observar_upload`: duración de render de PDF y tamaño de
+  archivos subidos.
+- Con `services.perfil_sql`: consultas y tiempo de DB por request
+  (`Server-Timing: db;dur=...;desc="N queries"` y histogramas por ruta).
+- Sin dependencias: contadores en dicts + un lock; el costo por request es
+  un par de lecturas de reloj y una búsqueda de bucket.
+- Cada worker de uvicorn expone sus propias series (Prometheus las suma).
+"""
+
+import bisect
+import hmac
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from services import perfil_sql
+
+BUCKETS_SEG = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (
+    10_000,
+    50_000,
+    100_000,
+    500_000,
+    1_000_000,
+    2_000_000,
+    5_000_000,
+    10_000_000,
+)
+BUCKETS_QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "1") == "1"
+# GET /metrics exige `Authorization: Bearer <METRICS_TOKEN>`; sin token, apagado
+TOKEN = os.getenv("METRICS_TOKEN", "")
+
+_lock = threading.Lock()
+
+
+class _Histograma:
+    __slots__ = ("buckets", "cuentas", "suma", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.cuentas = [0] * (len(buckets) + 1)  # último: +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, v: float):
+        self.cuentas[bisect.bisect_left(self.buckets, v)] += 1
+        self.suma += v
+        self.total += 1
+
+
+_requests: Dict[Tuple[str, str, str], int] = {}
+_latencia: Dict[Tuple[str, str], _Histograma] = {}
+_pdf: Dict[Tuple[str], _Histograma] = {}
+_upload: Dict[Tuple[str], _Histograma] = {}
+_db_consultas: Dict[Tuple[str, str], _Histograma] = {}
+_db_tiempo: Dict[Tuple[str, str], _Histograma] = {}
+_en_curso = 0
+
+
+def _hist(tabla, clave, buckets) -> _Histograma:
+    h = tabla.get(clave)
+    if h is None:
+        h = tabla[clave] = _Histograma(buckets)
+    return h
+
+
+def observar_request(metodo: str, ruta: str, status: int, dur: float):
+    with _lock:
+        k = (metodo, ruta, str(status))
+        _requests[k] = _requests.get(k, 0) + 1
+        _hist(_latencia, (metodo, ruta), BUCKETS_SEG).observar(dur)
+
+
+def observar_db(metodo: str, ruta: str, consultas: int, dur: float):
+    with _lock:
+        _hist(_db_consultas, (metodo, ruta), BUCKETS_QUERIES).observar(consultas)
+        _hist(_db_tiempo, (metodo, ruta), BUCKETS_SEG).observar(dur)
+
+
+def observar_pdf(motor: str, dur: float):
+    with _lock:
+        _hist(_pdf, (motor,), BUCKETS_SEG).observar(dur)
+
+
+def observar_upload(tipo: str, size: int):
+    with _lock:
+        _hist(_upload, (tipo,), BUCKETS_BYTES).observar(size)
+
+
+# --------------------------------------------------------------------
+# Exposición
+# --------------------------------------------------------------------
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(nombres, valores, extra="") -> str:
+    partes = [f'{n}="{_esc(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _exponer_hist(lineas, nombre, ayuda, unidad_labels, tabla):
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} histogram")
+    for clave, h in sorted(tabla.items()):
+        acumulado = 0
+        for le, c in zip(list(h.buckets) + ["+Inf"], h.cuentas):
+            acumulado += c
+            lbl = _labels(unidad_labels, clave, f'le="{le}"')
+            lineas.append(f"{nombre}_bucket{lbl} {acumulado}")
+        lbl = _labels(unidad_labels, clave)
+        lineas.append(f"{nombre}_sum{lbl} {h.suma}")
+        lineas.append(f"{nombre}_count{lbl} {h.total}")
+
+
+def autorizado(headers) -> bool:
+    if not TOKEN:
+        return False
+    esperado = f"Bearer {TOKEN}".encode()
+    return hmac.compare_digest((headers.get("authorization") or "").encode(), esperado)
+
+
+def exponer() -> str:
+    lineas = []
+    with _lock:
+        lineas.append(
+            "# HELP upcore_http_requests_total Requests HTTP por ruta y status."
+        )
+        lineas.append("# TYPE upcore_http_requests_total counter")
+        for (m, r, s), n in sorted(_requests.items()):
+            lbl = _labels(("method", "route", "status"), (m, r, s))
+            lineas.append(f"upcore_http_requests_total{lbl} {n}")
+        _exponer_hist(
+            lineas,
+            "upcore_http_request_duration_seconds",
+            "Latencia de requests HTTP.",
+            ("method", "route"),
+            _latencia,
+        )
+        lineas.append("# HELP upcore_http_requests_in_flight Requests en curso.")
+        lineas.append("# TYPE upcore_http_requests_in_flight gauge")
+        lineas.append(f"upcore_http_requests_in_flight {_en_curso}")
+        _exponer_hist(
+            lineas,
+            "upcore_db_queries_per_request",
+            "Consultas SQL por request.",
+            ("method", "route"),
+            _db_consultas,
+        )
+        _exponer_hist(
+            lineas,
+            "upcore_db_duration_seconds",
+            "Tiempo total en DB por request.",
+            ("method", "route"),
+            _db_tiempo,
+        )
+        _exponer_hist(
+            lineas,
+            "upcore_pdf_render_duration_seconds",
+            "Duración del render HTML -> PDF.",
+            ("engine",),
+            _pdf,
+        )
+        _exponer_hist(
+            lineas,
+            "upcore_upload_size_bytes",
+            "Tamaño de archivos subidos.",
+            ("kind",),
+            _upload,
+        )
+    return "\n".join(lineas) + "\n"
+
+
+# --------------------------------------------------------------------
+# Middleware ASGI
+# --------------------------------------------------------------------
+def _ruta(scope) -> str:
+    route = scope.get("route")
+    # plantilla (/pagos/{pago_id}); evita una serie por id
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _en_curso
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        t0 = time.perf_counter()
+        status = 500
+        _en_curso += 1  # sólo se toca desde el event loop
+        token = perfil_sql.iniciar(scope)
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                perfil = perfil_sql.actual()
+                if SERVER_TIMING:
+                    dur_ms = (time.perf_counter() - t0) * 1000
+                    headers.append("Server-Timing", f"app;dur={dur_ms:.1f}")
+                    if perfil is not None and perfil.consultas:
+                        headers.append(
+                            "Server-Timing",
+                            f"db;dur={perfil.segundos * 1000:.1f};"
+                            f'desc="{perfil.consultas} queries"',
+                        )
+                if perfil is not None and perfil_sql.DEV:
+                    n1 = perfil.n_mas_uno()
+                    if n1:
+                        headers.append(
+                            "X-DB-Warnings", f"n+1: {n1[0][0]}x misma consulta"
+                        )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _en_curso -= 1
+            perfil = perfil_sql.terminar(token)
+            metodo, ruta = scope["method"], _ruta(scope)
+            observar_request(metodo, ruta, status, time.perf_counter() - t0)
+            if perfil is not None and perfil.consultas:
+                observar_db(metodo, ruta, perfil.consultas, perfil.segundos)
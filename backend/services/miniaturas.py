@@ -0,0 +1,114 @@
+# backend/services/miniaturas.py
+"""
+Vistas previas livianas de comprobantes (para la cola de revisión).
+
+- Se guardan junto al original: `<clave del comprobante>.preview.webp` (o .jpg con
+  PREVIEW_FORMATO=jpeg). La clave del comprobante no se reescribe nunca, así que
+  la vista previa es inmutable y se puede cachear por mucho tiempo.
+- JPG/PNG: se reduce con Pillow al lado mayor PREVIEW_MAX_PX.
+- PDF: se rasteriza la primera página con pypdfium2 (si no está instalado, no
+  hay vista previa para PDFs).
+- Se generan en segundo plano al subir el comprobante; si falta (filas viejas o
+  tarea perdida), `GET /pagos/{id}/comprobante/preview` responde 404 y la agenda
+  para después de responder (`programar`): generarla lee el comprobante entero.
+- Filas sin migrar (ruta absoluta): la vista previa usa la clave relativa a
+  UPLOADS_DIR en el backend actual, así `guardar` e `info` miran el mismo lugar
+  también con S3.
+"""
+
+import io
+import os
+import threading
+from typing import Optional
+
+from services import storage
+
+FORMATO = os.getenv("PREVIEW_FORMATO", "webp").lower()
+MAX_PX = int(os.getenv("PREVIEW_MAX_PX", "800"))
+CALIDAD = int(os.getenv("PREVIEW_CALIDAD", "70"))
+MEDIA_TYPE = "image/webp" if FORMATO == "webp" else "image/jpeg"
+_EXT = ".preview.webp" if FORMATO == "webp" else ".preview.jpg"
+
+
+_en_curso = set()
+_lock = threading.Lock()
+
+
+def clave_preview(clave: str) -> Optional[str]:
+    """Clave de la vista previa de `clave` (None: no hay dónde guardarla)."""
+    if storage.es_legado(clave):
+        st = storage.get_storage()
+        relativa = (st if st.local else storage.LocalStorage()).clave_de(clave)
+        if relativa is None:
+            # fuera de UPLOADS_DIR: sólo en disco local, al lado del original
+            return clave + _EXT if st.local else None
+        clave = relativa
+    return clave + _EXT
+
+
+def _abrir_imagen(data: bytes, es_pdf: bool):
+    from PIL import Image  # pip install Pillow
+
+    if not es_pdf:
+        img = Image.open(io.BytesIO(data))
+        img.draft("RGB", (MAX_PX, MAX_PX))  # JPEG: decodifica ya reducido
+        return img
+    import pypdfium2 as pdfium  # pip install pypdfium2
+
+    pdf = pdfium.PdfDocument(data)
+    try:
+        pagina = pdf[0]
+        ancho, alto = pagina.get_size()  # puntos (1/72")
+        escala = min(4.0, MAX_PX / max(ancho, alto))
+        return pagina.render(scale=escala).to_pil()
+    finally:
+        pdf.close()
+
+
+def generar(clave: str) -> Optional[str]:
+    """Genera y guarda la vista previa de `clave`; devuelve su clave."""
+    destino = clave_preview(clave)
+    if destino is None:
+        return None
+    st = storage.get_storage()
+    data = b"".join(st.leer(clave))  # acotado por MAX_UPLOAD_MB
+    img = _abrir_imagen(data, clave.lower().endswith(".pdf"))
+    img.thumbnail((MAX_PX, MAX_PX))
+    if FORMATO == "webp":
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, "WEBP" if FORMATO == "webp" else "JPEG", quality=CALIDAD)
+    st.guardar(destino, out.getvalue())
+    return destino
+
+
+def generar_seguro(clave: str) -> Optional[str]:
+    """Para tareas en segundo plano: nunca levanta (sin preview no es un error)."""
+    try:
+        return generar(clave)
+    except Exception as ex:
+        print("Error vista previa ---->> ", clave, ex)
+        return None
+
+
+def programar(background_tasks, clave: str) -> None:
+    """
+    Agenda `generar_seguro(clave)` para después de responder; pedidos repetidos
+    mientras se genera no la agendan de nuevo (por proceso).
+    """
+    with _lock:
+        if clave in _en_curso:
+            return
+        _en_curso.add(clave)
+    background_tasks.add_task(_generar_programada, clave)
+
+
+def _generar_programada(clave: str) -> None:
+    try:
+        generar_seguro(clave)
+    finally:
+        with _lock:
+            _en_curso.discard(clave)
@@ -0,0 +1,41 @@
+# backend/services/numeracion.py
+"""
+Numeración de clientes respaldada por la secuencia `cliente_nro_seq`.
+
+`nextval` es atómico y no escanea la tabla: dos altas concurrentes nunca reciben
+el mismo número. Los números consumidos por transacciones que hacen rollback
+quedan como huecos (igual que un id serial).
+"""
+
+from typing import List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.modelo import cliente_nro_seq
+
+NRO_CLIENTE_PAD = 6
+
+
+def _fmt(n: int) -> str:
+    return f"{n:0{NRO_CLIENTE_PAD}d}"
+
+
+def siguiente_nro_cliente(db: Session) -> str:
+    """Próximo `nro_cliente` con padding (p. ej. '000123')."""
+    return _fmt(db.execute(select(cliente_nro_seq.next_value())).scalar_one())
+
+
+def reservar_nros_cliente(db: Session, cantidad: int) -> List[str]:
+    """
+    Reserva `cantidad` números en un solo round trip, para importaciones masivas.
+    Son únicos y crecientes; pueden no ser contiguos si hay altas concurrentes.
+    """
+    if cantidad < 1:
+        return []
+    rows = db.execute(
+        select(cliente_nro_seq.next_value()).select_from(
+            func.generate_series(1, cantidad)
+        )
+    ).scalars()
+    return [_fmt(n) for n in sorted(rows)]
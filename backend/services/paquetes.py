@@ -0,0 +1,65 @@
+# backend/services/paquetes.py
+"""
+Paquetes de recibos: muchos PDFs de un mes cerrado concatenados en un archivo.
+
+- Formato: `recibos/<año>/<mes>/pack-<stamp>.pack` (PDFs uno detrás de otro, sin
+  comprimir: ya vienen comprimidos) + `<pack>.idx.json` con offset/largo/sha256
+  por `recibo_num` (índice para verificar o reconstruir).
+- La fila del pago apunta al tramo: `recibo_pdf_path =
+  "recibos/2025/08/pack-...pack#<offset>:<largo>:<nombre original>"`; la descarga
+  lee sólo ese rango (seek local o Range en S3), sin extraer nada.
+- Se arman con `python -m scripts.empaquetar_recibos`.
+"""
+
+from typing import NamedTuple, Optional
+
+from services import storage
+
+SEP = "#"
+
+
+class Tramo(NamedTuple):
+    pack: str
+    offset: int
+    largo: int
+    nombre: str
+
+
+def es_tramo(ref: Optional[str]) -> bool:
+    return bool(ref) and SEP in ref and not storage.es_legado(ref)
+
+
+def ref_tramo(pack: str, offset: int, largo: int, nombre: str) -> str:
+    return f"{pack}{SEP}{offset}:{largo}:{nombre}"
+
+
+def parse(ref: str) -> Tramo:
+    pack, _, resto = ref.partition(SEP)
+    offset, largo, nombre = resto.split(":", 2)
+    return Tramo(pack, int(offset), int(largo), nombre)
+
+
+def nombre(ref: str) -> str:
+    """Nombre de descarga (el del PDF suelto original)."""
+    return parse(ref).nombre if es_tramo(ref) else ref.rsplit("/", 1)[-1]
+
+
+def info(ref: str) -> Optional[storage.InfoArchivo]:
+    """Como `storage.info`, pero para un tramo usa el mtime del paquete."""
+    st = storage.get_storage()
+    if not es_tramo(ref):
+        return st.info(ref)
+    t = parse(ref)
+    pack = st.info(t.pack)
+    if pack is None or pack.size < t.offset + t.largo:
+        return None
+    return storage.InfoArchivo(t.largo, pack.mtime_ns)
+
+
+def leer(ref: str):
+    """Bloques del archivo (un rango del paquete si es un tramo)."""
+    st = storage.get_storage()
+    if not es_tramo(ref):
+        return st.leer(ref)
+    t = parse(ref)
+    return st.leer(t.pack, t.offset, t.offset + t.largo)
@@ -0,0 +1,167 @@
+# backend/services/perfil_sql.py
+"""
+Perfil de SQL por request, con hooks de eventos del engine de SQLAlchemy.
+
+- Cada sentencia lleva un comentario `/* route=GET /pagos/{pago_id} */` (visible
+  en pg_stat_activity / logs de Postgres). Se apaga con SQL_TAG_ROUTE=0.
+- Por request: cantidad de consultas y tiempo total en DB. `MetricsMiddleware`
+  los agrega al header `Server-Timing` (db;dur=...) y a /metrics.
+- Consultas lentas (>= SQL_SLOW_MS) se loguean y, si es un SELECT, con su plan
+  (EXPLAIN, dentro de un SAVEPOINT para no abortar la transacción). Los valores
+  (DNI, hashes, tokens) no van al log: parámetros y literales del plan salen
+  ocultos salvo SQL_LOG_PARAMS=1 (sólo para desarrollo).
+- Modo desarrollo (SQL_PROFILE_DEV=1): avisa N+1 cuando la misma sentencia se
+  repite SQL_N1_UMBRAL veces o más en un request (log + header X-DB-Warnings).
+- Fuera de un request (scripts, startup) sólo aplica el log de lentas.
+"""
+
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))
+EXPLAIN = os.getenv("SQL_EXPLAIN", "1") == "1"
+TAG_ROUTE = os.getenv("SQL_TAG_ROUTE", "1") == "1"
+DEV = os.getenv("SQL_PROFILE_DEV", "0") == "1"
+N1_UMBRAL = int(os.getenv("SQL_N1_UMBRAL", "5"))
+LOG_PARAMS = os.getenv("SQL_LOG_PARAMS", "0") == "1"
+_PARAMS_MAX = 500  # caracteres de parámetros en el log
+
+
+class PerfilRequest:
+    __slots__ = ("scope", "consultas", "segundos", "sentencias")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.consultas = 0
+        self.segundos = 0.0
+        self.sentencias: Optional[Counter] = Counter() if DEV else None
+
+    @property
+    def ruta(self) -> str:
+        # la plantilla recién se conoce después del ruteo (scope["route"])
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path", "?")
+        return f"{self.scope.get('method', '')} {path}"
+
+    def n_mas_uno(self):
+        """Sentencias repetidas (candidatas a N+1) como [(veces, sql)]."""
+        if not self.sentencias:
+            return []
+        return [
+            (n, sql)
+            for sql, n in self.sentencias.most_common()
+            if n >= N1_UMBRAL and sql.lstrip()[:6].upper() == "SELECT"
+        ]
+
+
+_actual: ContextVar[Optional[PerfilRequest]] = ContextVar("perfil_sql", default=None)
+
+
+def iniciar(scope):
+    """Abre el perfil del request; devuelve el token para `terminar`."""
+    return _actual.set(PerfilRequest(scope))
+
+
+def terminar(token) -> Optional[PerfilRequest]:
+    perfil = _actual.get()
+    _actual.reset(token)
+    if perfil is not None and DEV:
+        for n, sql in perfil.n_mas_uno():
+            print(f"Aviso N+1 ---->> {perfil.ruta}: {n}x {_corto(sql)}")
+    return perfil
+
+
+def actual() -> Optional[PerfilRequest]:
+    return _actual.get()
+
+
+def _corto(sql: str, n: int = 200) -> str:
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= n else sql[:n] + "..."
+
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def _params_log(parameters) -> str:
+    if LOG_PARAMS:
+        return repr(parameters)[:_PARAMS_MAX]
+    if isinstance(parameters, dict):  # sólo los nombres
+        nombres = ", ".join(sorted(parameters))
+        return f"{len(parameters)} ocultos ({nombres})"[:_PARAMS_MAX]
+    return f"{len(parameters or ())} ocultos"
+
+
+def _sin_literales(texto: str) -> str:
+    """El plan repite los valores como literales ('30123456'::text)."""
+    return texto if LOG_PARAMS else _LITERAL.sub("'?'", texto)
+
+
+def _explain(conn, statement, parameters) -> str:
+    # cursor aparte: el del caller todavía tiene filas por leer
+    cur = conn.connection.dbapi_connection.cursor()
+    try:
+        cur.execute("SAVEPOINT perfil_explain")
+        try:
+            cur.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(str(r[0]) for r in cur.fetchall())
+            cur.execute("RELEASE SAVEPOINT perfil_explain")
+            return plan
+        except Exception as ex:
+            cur.execute("ROLLBACK TO SAVEPOINT perfil_explain")
+            return f"(sin plan: {ex})"
+    finally:
+        cur.close()
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perfil_t0", []).append(time.perf_counter())
+    perfil = _actual.get()
+    if perfil is not None:
+        if perfil.sentencias is not None:
+            perfil.sentencias[statement] += 1
+        if TAG_ROUTE:
+            # sin "*/" (cerraría el comentario) ni "%" (placeholder de psycopg2)
+            ruta = perfil.ruta.replace("*/", "*_/").replace("%", "")
+            statement = f"/* route={ruta} */ {statement}"
+    return statement, parameters
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    dur = time.perf_counter() - conn.info["perfil_t0"].pop()
+    perfil = _actual.get()
+    if perfil is not None:
+        perfil.consultas += 1
+        perfil.segundos += dur
+
+    if dur * 1000 < SLOW_MS:
+        return
+    print(f"Consulta lenta ---->> {dur * 1000:.1f} ms {_corto(statement, 1000)}")
+    print("  params ---->> ", _params_log(parameters))
+    sql = statement.split("*/", 1)[-1] if statement.startswith("/*") else statement
+    if EXPLAIN and not executemany and sql.lstrip()[:6].upper() == "SELECT":
+        try:
+            plan = _explain(conn, sql, parameters)
+            print("  plan ---->>\n" + _sin_literales(plan))
+        except Exception as ex:
+            print("Error explain ---->> ", ex)
+
+
+def _error(context):
+    # la sentencia falló: after_cursor_execute no corre, descartar su t0
+    conn = context.connection
+    if conn is not None and conn.info.get("perfil_t0"):
+        conn.info["perfil_t0"].pop()
+
+
+def instalar(engine):
+    """Registra los hooks en el engine (una vez, al crearlo)."""
+    event.listen(engine, "before_cursor_execute", _antes, retval=True)
+    event.listen(engine, "after_cursor_execute", _despues)
+    event.listen(engine, "handle_error", _error)
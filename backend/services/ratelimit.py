@@ -0,0 +1,199 @@
+# backend/services/ratelimit.py
+"""
+Rate limiting por token bucket, como middleware ASGI.
+
+- Corre antes del ruteo: un 429 no abre sesión de DB ni lee el body.
+- Claves por IP y por usuario (user_id del JWT, usando el cache de tokens).
+- Backend en memoria por defecto (por proceso). Con RATE_LIMIT_BACKEND=redis y
+  RATE_LIMIT_REDIS_URL, todos los workers comparten el mismo bucket.
+- Reglas por ruta en `REGLAS`; cada una se puede pisar por .env con
+  RATE_LIMIT_<NOMBRE>_<IP|USER>="capacidad/segundos" (p. ej. "10/60").
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+
+from auth.security import Security
+
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+MEMORY_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+@dataclass(frozen=True)
+class Regla:
+    capacidad: int  # ráfaga máxima
+    segundos: float  # tiempo para recargar la capacidad completa
+
+    @property
+    def tasa(self) -> float:
+        return self.capacidad / self.segundos
+
+
+def _regla(nombre: str, tipo: str, default: str) -> Optional[Regla]:
+    raw = os.getenv(f"RATE_LIMIT_{nombre}_{tipo}", default).strip()
+    if not raw or raw == "0":
+        return None  # deshabilitada
+    cap, seg = raw.split("/")
+    return Regla(int(cap), float(seg))
+
+
+# (método, path) -> (nombre, {"ip": Regla, "user": Regla})
+REGLAS: Dict[Tuple[str, str], Tuple[str, Dict[str, Optional[Regla]]]] = {
+    ("POST", "/users/login"): (
+        "login",
+        {"ip": _regla("LOGIN", "IP", "10/60")},  # sin token: sólo por IP
+    ),
+    ("POST", "/pagos/transferencia"): (
+        "transferencia",
+        {
+            "ip": _regla("TRANSFERENCIA", "IP", "60/60"),
+            "user": _regla("TRANSFERENCIA", "USER", "30/60"),
+        },
+    ),
+    ("POST", "/config/empresa/logo"): (
+        "logo",
+        {
+            "ip": _regla("LOGO", "IP", "10/60"),
+            "user": _regla("LOGO", "USER", "5/60"),
+        },
+    ),
+}
+
+
+# --------------------------------------------------------------------
+# Backends
+# --------------------------------------------------------------------
+class MemoryBackend:
+    """Buckets en un dict LRU acotado; válido dentro de un proceso."""
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max = max_keys
+
+    async def consumir(self, clave: str, regla: Regla) -> Tuple[bool, float]:
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(clave, (regla.capacidad, ahora))
+            tokens = min(regla.capacidad, tokens + (ahora - ts) * regla.tasa)
+            ok = tokens >= 1
+            if ok:
+                tokens -= 1
+            self._buckets[clave] = (tokens, ahora)
+            self._buckets.move_to_end(clave)
+            while len(self._buckets) > self._max:
+                self._buckets.popitem(last=False)
+        return ok, 0.0 if ok else (1 - tokens) / regla.tasa
+
+
+_LUA = """
+local cap = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local t = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or ahora
+t = math.min(cap, t + math.max(0, ahora - ts) * tasa)
+local ok = 0
+if t >= 1 then t = t - 1; ok = 1 end
+redis.call('HSET', KEYS[1], 't', t, 'ts', ahora)
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / tasa) + 1)
+return {ok, tostring(t)}
+"""
+
+
+class RedisBackend:
+    """Bucket atómico en Redis (script Lua); compartido entre workers."""
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis.asyncio as aioredis  # pip install redis
+
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(_LUA)
+
+    async def consumir(self, clave: str, regla: Regla) -> Tuple[bool, float]:
+        try:
+            ok, tokens = await self._script(
+                keys=[f"rl:{clave}"], args=[regla.capacidad, regla.tasa, time.time()]
+            )
+        except Exception as ex:
+            # Redis caído: no bloquear el servicio (fail-open)
+            print("Error rate limit redis ---->> ", ex)
+            return True, 0.0
+        tokens = float(tokens)
+        return bool(ok), 0.0 if ok else (1 - tokens) / regla.tasa
+
+
+def _crear_backend():
+    return RedisBackend() if BACKEND == "redis" else MemoryBackend()
+
+
+# --------------------------------------------------------------------
+# Middleware ASGI
+# --------------------------------------------------------------------
+def _ip(scope, headers: Headers) -> str:
+    if TRUST_PROXY:
+        xff = headers.get("x-forwarded-for")
+        if xff:
+            return xff.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "-"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, backend=None):
+        self.app = app
+        self.backend = backend or _crear_backend()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        entrada = REGLAS.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if not entrada:
+            return await self.app(scope, receive, send)
+
+        nombre, reglas = entrada
+        headers = Headers(scope=scope)
+        claves = []
+        if reglas.get("ip"):
+            claves.append((f"{nombre}:ip:{_ip(scope, headers)}", reglas["ip"]))
+        if reglas.get("user") and headers.get("authorization"):
+            payload = Security.verify_token(headers)
+            if isinstance(payload, dict) and payload.get("user_id"):
+                claves.append((f"{nombre}:user:{payload['user_id']}", reglas["user"]))
+
+        for clave, regla in claves:
+            ok, espera = await self.backend.consumir(clave, regla)
+            if not ok:
+                return await self._rechazar(send, espera)
+        return await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _rechazar(send, espera: float):
+        body = json.dumps(
+            {"message": "Demasiadas solicitudes, reintente más tarde"}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(espera))).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,350 @@
+# backend/services/recibos.py
+"""
+Render de recibos (plantilla Jinja -> HTML -> PDF) y regeneración masiva.
+
+- Motor: wkhtmltopdf (pdfkit) y, si falla, WeasyPrint. Jinja y los motores se
+  importan en el primer uso (no pesan en el arranque de la API).
+- Plantillas: `recibo.html` (un recibo) y `recibos_lote.html` (varios, una hoja
+  cada uno) comparten el cuerpo `_recibo_cuerpo.html` y `recibo.css`.
+- `version_plantilla()`: hash corto de `recibo.html` + cuerpo + `recibo.css`. Se
+  guarda en `pago.recibo_version` al generar, para encontrar los recibos
+  renderizados con una plantilla vieja.
+- `render_html_lote(ctxs)`: documento único para imprimir muchos recibos de una
+  vez (`POST /pagos/recibos/imprimir`).
+- `regenerar(...)`: vuelve a renderizar desde `recibo_snapshot_json` (los datos
+  del momento de emisión, no los actuales) en un pool de procesos, por lotes de
+  ids crecientes. Después de cada lote informa el progreso (`ultimo_id`): es el
+  punto de reanudación. Cada PDF se publica de forma atómica (temporal +
+  replace local; PUT en S3), así que una descarga ve el PDF viejo o el nuevo,
+  nunca uno a medias. Un recibo empaquetado se regenera como PDF suelto en el
+  mismo mes (ver services/paquetes.py).
+"""
+
+import hashlib
+import importlib
+import multiprocessing
+import os
+import time as _time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from models.modelo import Pago
+from services import metricas, paquetes, storage
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
+RECIBO_TEMPLATE = "recibo.html"
+CUERPO_TEMPLATE = "_recibo_cuerpo.html"  # compartido por recibo.html y el lote
+LOTE_TEMPLATE = "recibos_lote.html"
+RECIBO_CSS = os.path.join(TEMPLATE_DIR, "recibo.css")
+MAX_FALLAS_INFORMADAS = 100
+
+
+# Jinja y los motores de PDF se importan en el primer uso: no pesan en el
+# arranque de cada worker ni en cada reinicio de --reload.
+@lru_cache(maxsize=1)
+def jinja_env():
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(["html", "xml"]),
+    )
+
+
+@lru_cache(maxsize=None)
+def modulo_opcional(nombre: str):
+    """Importa una dependencia opcional una sola vez (None si no está)."""
+    try:
+        return importlib.import_module(nombre)
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=1)
+def version_plantilla() -> str:
+    """Cambia al editar la plantilla o recibo.css (se lee una vez por proceso)."""
+    h = hashlib.sha256()
+    for path in (
+        os.path.join(TEMPLATE_DIR, RECIBO_TEMPLATE),
+        os.path.join(TEMPLATE_DIR, CUERPO_TEMPLATE),
+        RECIBO_CSS,
+    ):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def logo_local(valor: Optional[str]) -> Optional[str]:
+    """El motor de PDF necesita un archivo local: resuelve clave de storage."""
+    if not valor:
+        return None
+    try:
+        return storage.get_storage().ruta_local(valor)
+    except Exception as ex:
+        print("Error logo recibo ---->> ", ex)
+        return None
+
+
+def render_html(ctx: dict) -> str:
+    tpl = jinja_env().get_template(RECIBO_TEMPLATE)
+    return tpl.render(**{**ctx, "logo_path": logo_local(ctx.get("logo_path"))})
+
+
+def render_html_lote(ctxs) -> str:
+    """
+    Varios recibos en un solo documento HTML (una hoja cada uno). El motor de
+    PDF lo procesa en una pasada: CSS, fuentes y cada logo distinto se cargan e
+    incrustan una vez, no una por recibo.
+    """
+    from markupsafe import Markup
+
+    env = jinja_env()
+    cuerpo = env.get_template(CUERPO_TEMPLATE)
+    logos = {}
+    paginas = []
+    for ctx in ctxs:
+        valor = ctx.get("logo_path")
+        if valor not in logos:
+            logos[valor] = logo_local(valor)
+        paginas.append(Markup(cuerpo.render(**{**ctx, "logo_path": logos[valor]})))
+    return env.get_template(LOTE_TEMPLATE).render(recibos=paginas)
+
+
+def render_pdf(path_pdf: str, html_str: str):
+    """
+    Intenta generar PDF con wkhtmltopdf (pdfkit). Si falla, usa WeasyPrint.
+    Si nada está disponible, levanta 500 con mensaje claro.
+    """
+    os.makedirs(os.path.dirname(path_pdf), exist_ok=True)
+
+    # 1) pdfkit (wkhtmltopdf)
+    pdfkit = modulo_opcional("pdfkit")  # pip install pdfkit
+    if pdfkit is not None:
+        try:
+            wkhtml_bin = os.getenv("WKHTMLTOPDF_BIN")  # opcional: ruta absoluta
+            config = (
+                pdfkit.configuration(wkhtmltopdf=wkhtml_bin) if wkhtml_bin else None
+            )
+            options = {
+                "encoding": "UTF-8",
+                "enable-local-file-access": None,  # permitir CSS/IMG locales
+                "print-media-type": None,
+                "margin-top": "10mm",
+                "margin-right": "10mm",
+                "margin-bottom": "10mm",
+                "margin-left": "10mm",
+            }
+            t0 = _time.perf_counter()
+            pdfkit.from_string(
+                html_str,
+                path_pdf,
+                css=RECIBO_CSS,
+                options=options,
+                configuration=config,
+            )
+            metricas.observar_pdf("wkhtmltopdf", _time.perf_counter() - t0)
+            return
+        except Exception:
+            pass  # intentar fallback
+
+    # 2) WeasyPrint
+    weasyprint = modulo_opcional("weasyprint")  # pip install WeasyPrint
+    try:
+        t0 = _time.perf_counter()
+        weasyprint.HTML(string=html_str, base_url=TEMPLATE_DIR).write_pdf(
+            path_pdf, stylesheets=[weasyprint.CSS(filename=RECIBO_CSS)]
+        )
+        metricas.observar_pdf("weasyprint", _time.perf_counter() - t0)
+        return
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail=(
+                "No se pudo generar el PDF. Instalar uno de: "
+                "`pip install pdfkit` + wkhtmltopdf (binario del sistema), "
+                "o `pip install WeasyPrint`."
+            ),
+        )
+
+
+def escribir_pdf(clave: str, ctx: dict) -> None:
+    """Renderiza `ctx` y lo publica en `clave` (atómico)."""
+    html = render_html(ctx)
+    with storage.get_storage().escribir(clave) as path_pdf:
+        render_pdf(path_pdf, html)
+
+
+# --------------------------------------------------------------------
+# Regeneración masiva
+# --------------------------------------------------------------------
+def _clave_regenerada(ref: str) -> str:
+    """Suelto: la misma clave. Tramo de paquete: PDF suelto en el mes del paquete."""
+    if paquetes.es_tramo(ref):
+        t = paquetes.parse(ref)
+        return storage.unir(t.pack.rsplit("/", 1)[0], t.nombre)
+    return ref
+
+
+def _renderizar(tarea: tuple) -> tuple:
+    """Corre en el pool (top-level para poder serializarla)."""
+    pago_id, clave, ctx = tarea
+    try:
+        escribir_pdf(clave, ctx)
+        return pago_id, None
+    except HTTPException as ex:
+        return pago_id, str(ex.detail)
+    except Exception as ex:
+        return pago_id, f"{type(ex).__name__}: {ex}"
+
+
+def filtrar(
+    q,
+    periodo_year: Optional[int] = None,
+    periodo_month: Optional[int] = None,
+    id_desde: Optional[int] = None,
+    id_hasta: Optional[int] = None,
+    version: Optional[str] = None,
+    solo_desactualizados: bool = False,
+    **_,
+):
+    if periodo_year:
+        q = q.filter(Pago.periodo_year == periodo_year)
+    if periodo_month:
+        q = q.filter(Pago.periodo_month == periodo_month)
+    if id_desde:
+        q = q.filter(Pago.id >= id_desde)
+    if id_hasta:
+        q = q.filter(Pago.id <= id_hasta)
+    if version:
+        q = q.filter(Pago.recibo_version == version)
+    if solo_desactualizados:
+        q = q.filter(
+            (Pago.recibo_version.is_(None))
+            | (Pago.recibo_version != version_plantilla())
+        )
+    return q
+
+
+def regenerar(
+    db: Session,
+    filtros: dict,
+    procesos: Optional[int] = None,
+    lote: int = 200,
+    previo: Optional[dict] = None,
+    progreso: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Regenera los recibos que cumplen `filtros`. `previo`: stats de una corrida
+    cortada (checkpoint); sigue desde su `ultimo_id` y acumula los totales.
+    `progreso(stats)` se llama después de cada lote confirmado en la DB.
+    `procesos=1` renderiza en este proceso (sin pool).
+    """
+    version = version_plantilla()
+    procesos = procesos or os.cpu_count() or 1
+    stats = {
+        "procesados": 0,
+        "ok": 0,
+        "fallidos": 0,
+        "omitidos": 0,
+        "ultimo_id": 0,
+        "segundos": 0.0,
+        "recibos_por_seg": 0.0,
+        "fallas": [],
+        **(previo or {}),
+        "version": version,
+    }
+    seg_previos = stats["segundos"]
+    base = filtrar(
+        db.query(Pago.id, Pago.recibo_pdf_path, Pago.recibo_snapshot_json).filter(
+            Pago.recibo_pdf_path.isnot(None)
+        ),
+        **filtros,
+    )
+    cambios_sql = (
+        update(Pago.__table__)
+        .where(Pago.id == bindparam("b_id"))
+        .where(Pago.recibo_pdf_path == bindparam("b_viejo"))
+        .values(recibo_pdf_path=bindparam("b_nuevo"), recibo_version=version)
+    )
+
+    def _falla(pago_id, error):
+        stats["fallidos"] += 1
+        if len(stats["fallas"]) < MAX_FALLAS_INFORMADAS:
+            stats["fallas"].append({"pago_id": pago_id, "error": error})
+
+    t0 = _time.perf_counter()
+    # spawn: el worker de jobs tiene hilos y conexiones abiertas (fork no es seguro)
+    ctx_mp = multiprocessing.get_context("spawn")
+    pool_ctx = (
+        ProcessPoolExecutor(max_workers=procesos, mp_context=ctx_mp)
+        if procesos > 1
+        else nullcontext()
+    )
+    with pool_ctx as pool:
+        while True:
+            filas = (
+                base.filter(Pago.id > stats["ultimo_id"])
+                .order_by(Pago.id)
+                .limit(lote)
+                .all()
+            )
+            if not filas:
+                break
+            tareas, viejas = [], {}
+            for f in filas:
+                if not f.recibo_snapshot_json:
+                    stats["omitidos"] += 1  # emitido antes de guardar snapshots
+                elif storage.es_legado(f.recibo_pdf_path):
+                    _falla(f.id, "Ruta absoluta: correr scripts.migrar_archivos")
+                else:
+                    clave = _clave_regenerada(f.recibo_pdf_path)
+                    tareas.append((f.id, clave, f.recibo_snapshot_json))
+                    viejas[f.id] = (f.recibo_pdf_path, clave)
+
+            cambios = []
+            if pool:
+                chunk = max(1, len(tareas) // (procesos * 4))
+                resultados = pool.map(_renderizar, tareas, chunksize=chunk)
+            else:
+                resultados = map(_renderizar, tareas)
+            for pago_id, error in resultados:
+                if error:
+                    _falla(pago_id, error)
+                    continue
+                viejo, nuevo = viejas[pago_id]
+                cambios.append({"b_id": pago_id, "b_viejo": viejo, "b_nuevo": nuevo})
+            ok = 0
+            if cambios:
+                # sólo filas que no cambiaron mientras tanto (p. ej. empaquetadas)
+                db.execute(cambios_sql, cambios)
+                # rowcount de un executemany no es confiable en todos los
+                # drivers: se relee qué filas quedaron apuntando al PDF nuevo
+                actuales = dict(
+                    db.query(Pago.id, Pago.recibo_pdf_path).filter(
+                        Pago.id.in_([c["b_id"] for c in cambios])
+                    )
+                )
+                for c in cambios:
+                    if actuales.get(c["b_id"]) == c["b_nuevo"]:
+                        ok += 1
+                    else:  # el PDF nuevo queda huérfano (lo levanta gc_archivos)
+                        _falla(c["b_id"], "Cambió durante la regeneración")
+            db.commit()
+
+            stats["ok"] += ok
+            stats["procesados"] += len(filas)
+            stats["ultimo_id"] = filas[-1].id
+            stats["segundos"] = round(seg_previos + _time.perf_counter() - t0, 1)
+            stats["recibos_por_seg"] = round(
+                stats["ok"] / max(stats["segundos"], 0.001), 1
+            )
+            if progreso:
+                progreso(stats)
+    return stats
@@ -0,0 +1,111 @@
+# backend/services/revision.py
+"""
+Cola de revisión de transferencias (`en_revision`) para varios operadores.
+
+- `reclamar` entrega a cada revisor los próximos N pagos libres con
+  `SELECT ... FOR UPDATE SKIP LOCKED`: dos revisores que reclaman a la vez no
+  se esperan ni reciben los mismos pagos.
+- El reclamo es un lease (`pago.revision_por` / `revision_hasta`,
+  REVISION_LEASE_SEG): si el revisor desaparece, el pago vuelve a la cola
+  solo al vencer. Reclamar de nuevo renueva los propios.
+- Confirmar/anular toman la fila con FOR UPDATE y rechazan (409) si otro
+  revisor la tiene reclamada (`ocupado_por_otro`).
+- Reclamar/liberar no tocan `actualizado_en`: el lease no cambia el pago
+  (ETags de detalle siguen válidos).
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from models.modelo import EstadoPagoEnum, Pago
+
+LEASE_SEG = int(os.getenv("REVISION_LEASE_SEG", "900"))
+MAX_RECLAMO = 50
+
+_t = Pago.__table__
+
+
+def _sin_tocar_version():
+    # UPDATE core: sin esto el onupdate de actualizado_en cambiaría el ETag
+    return {"actualizado_en": _t.c.actualizado_en}
+
+
+def reclamar(db: Session, user_id: int, cantidad: int) -> Tuple[List[Pago], datetime]:
+    """
+    Reclama (o renueva) hasta `cantidad` pagos en revisión para `user_id`.
+    Los que ya tenía reclamados cuentan dentro de `cantidad` (reintentos idempotentes).
+    """
+    now = datetime.utcnow()
+    hasta = now + timedelta(seconds=LEASE_SEG)
+    en_cola = db.query(Pago.id).filter(Pago.estado == EstadoPagoEnum.en_revision)
+
+    propios = [
+        i
+        for (i,) in en_cola.filter(Pago.revision_por == user_id)
+        .order_by(Pago.fecha, Pago.id)
+        .limit(cantidad)
+        .with_for_update(skip_locked=True)
+    ]
+    nuevos = []
+    if len(propios) < cantidad:
+        nuevos = [
+            i
+            for (i,) in en_cola.filter(
+                or_(Pago.revision_hasta.is_(None), Pago.revision_hasta < now),
+                # los propios vencidos ya están en `propios` (y bloqueados por
+                # esta misma transacción: SKIP LOCKED no los saltearía)
+                Pago.revision_por.is_distinct_from(user_id),
+            )
+            .order_by(Pago.fecha, Pago.id)
+            .limit(cantidad - len(propios))
+            .with_for_update(skip_locked=True)
+        ]
+    ids = propios + nuevos
+    if ids:
+        db.execute(
+            update(_t)
+            .where(_t.c.id.in_(ids))
+            .values(revision_por=user_id, revision_hasta=hasta, **_sin_tocar_version())
+        )
+    db.commit()  # libera los locks: el lease ya protege los pagos
+
+    if not ids:
+        return [], hasta
+    pagos = db.query(Pago).filter(Pago.id.in_(ids)).order_by(Pago.fecha, Pago.id)
+    return pagos.all(), hasta
+
+
+def liberar(db: Session, user_id: int, ids: List[int]) -> int:
+    """Devuelve a la cola los pagos de `ids` reclamados por `user_id`."""
+    res = db.execute(
+        update(_t)
+        .where(_t.c.id.in_(ids))
+        .where(_t.c.revision_por == user_id)
+        .values(revision_por=None, revision_hasta=None, **_sin_tocar_version())
+    )
+    db.commit()
+    return res.rowcount
+
+
+def tomar(db: Session, pago_id: int) -> Optional[Pago]:
+    """Pago con lock de fila (hasta el commit) para confirmar/anular sin carreras."""
+    return db.query(Pago).filter(Pago.id == pago_id).with_for_update().first()
+
+
+def ocupado_por_otro(pago: Pago, user_id: Optional[int]) -> bool:
+    return (
+        pago.revision_por is not None
+        and pago.revision_por != user_id
+        and pago.revision_hasta is not None
+        and pago.revision_hasta >= datetime.utcnow()
+    )
+
+
+def soltar(pago: Pago) -> None:
+    """Limpia el reclamo al resolver el pago (va en el mismo commit)."""
+    pago.revision_por = None
+    pago.revision_hasta = None
@@ -0,0 +1,81 @@
+# backend/services/serializers.py
+"""
+Serializadores compartidos de filas (Cliente, Usuario, Pago) y respuesta JSON
+rápida.
+
+- Los serializadores devuelven dicts con tipos nativos de JSON (str/int/float/
+  bool/None), listos para `JSONResponse` sin pasar por `jsonable_encoder`.
+- `JSONResponse` usa orjson: devolver una instancia desde el handler evita la
+  pasada de `jsonable_encoder` que FastAPI aplica a los dicts planos.
+"""
+
+from fastapi.responses import ORJSONResponse
+
+from models.modelo import Cliente, Pago, Usuario
+
+# orjson (OPT_NON_STR_KEYS: admite mapas {id_int: ...})
+JSONResponse = ORJSONResponse
+
+
+def _val(e):
+    return e.value if hasattr(e, "value") else e
+
+
+def _iso(d):
+    return d.isoformat() if d else None
+
+
+def cliente_out(c: Cliente) -> dict:
+    return {
+        "id": c.id,
+        "nro_cliente": c.nro_cliente,
+        "nombre": c.nombre,
+        "apellido": c.apellido,
+        "documento": c.documento,
+        "telefono": c.telefono,
+        "email": c.email,
+        "direccion": c.direccion,
+        "estado": _val(c.estado),
+        "creado_en": _iso(c.creado_en),
+    }
+
+
+def usuario_out(u: Usuario) -> dict:
+    return {
+        "id": u.id,
+        "email": u.email,
+        "documento": u.documento,
+        "role": _val(u.role),
+        "activo": u.activo,
+        "creado_en": _iso(u.creado_en),
+    }
+
+
+def pago_item(p: Pago) -> dict:
+    """Fila de listados/búsquedas de pagos."""
+    return {
+        "id": p.id,
+        "cliente_id": p.cliente_id,
+        "fecha": p.fecha.isoformat(),
+        "monto": float(p.monto),
+        "moneda": p.moneda,
+        "metodo": p.metodo.value,
+        "estado": p.estado.value,
+        "periodo_year": p.periodo_year,
+        "periodo_month": p.periodo_month,
+        "es_adelantado": p.es_adelantado,
+        "concepto": p.concepto,
+    }
+
+
+def pago_detalle(p: Pago) -> dict:
+    """Detalle de un pago (links autenticados a comprobante/recibo)."""
+    return {
+        **pago_item(p),
+        "descripcion": p.descripcion,
+        "comprobante": f"/pagos/{p.id}/comprobante" if p.comprobante_path else None,
+        "recibo_num": p.recibo_num,
+        "recibo_pdf": (
+            f"/pagos/{p.id}/recibo.pdf" if p.recibo_pdf_path or p.recibo_num else None
+        ),
+    }
@@ -0,0 +1,328 @@
+# backend/services/storage.py
+"""
+Almacenamiento de archivos (comprobantes, recibos, logo) detrás de una interfaz.
+
+- En la DB se guardan claves relativas (`recibos/2025/08/REC-...pdf`), no rutas
+  absolutas: cualquier nodo de la API resuelve la misma clave.
+- Backends: `LocalStorage` (carpeta UPLOADS_DIR) y `S3Storage` (S3 o compatible,
+  p. ej. MinIO; requiere boto3). Se elige con STORAGE_BACKEND=local|s3.
+- Lecturas y escrituras por bloques: ni uploads ni descargas se cargan enteros
+  en memoria.
+- Filas previas a la migración (ruta absoluta) se siguen leyendo del disco local
+  hasta correr `python -m scripts.migrar_archivos`.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import BinaryIO, Iterator, Optional, Union
+
+from fastapi.responses import FileResponse, StreamingResponse
+
+BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+UPLOAD_ROOT = os.getenv("UPLOADS_DIR", os.path.join("backend", "uploads"))
+# mkstemp crea 0600; lo publicado queda con el modo de la umask (el proxy que
+# sirve los archivos puede correr con otro usuario). Se lee una vez: os.umask
+# sólo se consulta cambiándola y no es seguro hacerlo con hilos corriendo.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+MODO_ARCHIVO = 0o666 & ~_UMASK
+S3_BUCKET = os.getenv("S3_BUCKET", "upcore")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None  # MinIO: http://host:9000
+S3_REGION = os.getenv("S3_REGION") or None
+CACHE_DIR = os.getenv(
+    "STORAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "upcore-storage")
+)
+CHUNK = 64 * 1024
+# códigos de ClientError de head_object/get_object para una clave inexistente
+NO_EXISTE = {"404", "NoSuchKey", "NotFound"}
+
+Origen = Union[bytes, BinaryIO]
+
+
+@dataclass(frozen=True)
+class InfoArchivo:
+    size: int
+    mtime_ns: int
+
+
+def es_legado(clave: str) -> bool:
+    """Ruta absoluta guardada antes de pasar a claves."""
+    return os.path.isabs(clave)
+
+
+def unir(*partes) -> str:
+    """Arma una clave con '/' (independiente del SO)."""
+    return "/".join(str(p).strip("/") for p in partes if str(p))
+
+
+# --------------------------------------------------------------------
+# Disco local
+# --------------------------------------------------------------------
+class LocalStorage:
+    local = True
+
+    def __init__(self, root: str = UPLOAD_ROOT):
+        self.root = os.path.abspath(root)
+
+    def ruta(self, clave: str) -> str:
+        if es_legado(clave):
+            return clave
+        ruta = os.path.normpath(os.path.join(self.root, *clave.split("/")))
+        if not ruta.startswith(self.root + os.sep):
+            raise ValueError(f"Clave fuera del almacenamiento: {clave}")
+        return ruta
+
+    def clave_de(self, ruta: str) -> Optional[str]:
+        """Clave de una ruta absoluta dentro de `root` (None si está afuera)."""
+        ruta = os.path.abspath(ruta)
+        if not ruta.startswith(self.root + os.sep):
+            return None
+        return os.path.relpath(ruta, self.root).replace(os.sep, "/")
+
+    @contextmanager
+    def escribir(self, clave: str) -> Iterator[str]:
+        """
+        Ruta temporal para que un tercero (p. ej. el motor de PDF) escriba el
+        archivo; al salir sin error se publica en `clave` con un rename atómico.
+        """
+        destino = self.ruta(clave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".part")
+        os.close(fd)
+        try:
+            yield tmp
+            os.chmod(tmp, MODO_ARCHIVO)
+            os.replace(tmp, destino)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def guardar(self, clave: str, origen: Origen) -> int:
+        with self.escribir(clave) as tmp, open(tmp, "wb") as f:
+            if isinstance(origen, (bytes, bytearray)):
+                f.write(origen)
+            else:
+                shutil.copyfileobj(origen, f, CHUNK)
+            return f.tell()
+
+    def leer(self, clave: str, inicio: int = 0, fin: Optional[int] = None):
+        """Bloques de `clave` en [inicio, fin) (fin=None: hasta el final)."""
+        with open(self.ruta(clave), "rb") as f:
+            f.seek(inicio)
+            restante = None if fin is None else fin - inicio
+            while restante is None or restante > 0:
+                bloque = f.read(CHUNK if restante is None else min(CHUNK, restante))
+                if not bloque:
+                    break
+                if restante is not None:
+                    restante -= len(bloque)
+                yield bloque
+
+    def info(self, clave: str) -> Optional[InfoArchivo]:
+        try:
+            st = os.stat(self.ruta(clave))
+        except (OSError, ValueError):
+            return None
+        return InfoArchivo(st.st_size, st.st_mtime_ns)
+
+    def borrar(self, clave: str):
+        try:
+            os.remove(self.ruta(clave))
+        except FileNotFoundError:
+            pass
+
+    def ruta_local(self, clave: str) -> str:
+        return self.ruta(clave)
+
+    def listar(self, prefijo: str = ""):
+        """(clave, InfoArchivo) en orden, recorriendo de a un directorio."""
+        base = self.ruta(prefijo) if prefijo else self.root
+
+        def _recorrer(ruta):
+            try:
+                entradas = sorted(os.scandir(ruta), key=lambda e: e.name)
+            except FileNotFoundError:
+                return
+            for e in entradas:
+                if e.is_dir(follow_symlinks=False):
+                    yield from _recorrer(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    st = e.stat()
+                    clave = os.path.relpath(e.path, self.root).replace(os.sep, "/")
+                    yield clave, InfoArchivo(st.st_size, st.st_mtime_ns)
+
+        yield from _recorrer(base)
+
+    def mover(self, origen: str, destino: str):
+        ruta = self.ruta(destino)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        os.replace(self.ruta(origen), ruta)
+
+
+# --------------------------------------------------------------------
+# S3 / compatible (MinIO, etc.)
+# --------------------------------------------------------------------
+class S3Storage:
+    local = False
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        prefijo: str = S3_PREFIX,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: Optional[str] = S3_REGION,
+    ):
+        import boto3  # pip install boto3 (credenciales: variables AWS_* estándar)
+        from botocore.config import Config
+
+        self._s3 = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            # URLs prefirmadas con SigV4 (boto3 usa SigV2 en algunas regiones)
+            config=Config(signature_version="s3v4"),
+        )
+        self.bucket = bucket
+        self.prefijo = prefijo.strip("/")
+        self._legado = LocalStorage()  # filas con ruta absoluta aún sin migrar
+
+    def _k(self, clave: str) -> str:
+        return unir(self.prefijo, clave) if self.prefijo else clave
+
+    @contextmanager
+    def escribir(self, clave: str) -> Iterator[str]:
+        fd, tmp = tempfile.mkstemp(suffix=".part")
+        os.close(fd)
+        try:
+            yield tmp
+            self._s3.upload_file(tmp, self.bucket, self._k(clave))
+        finally:
+            os.remove(tmp)
+
+    def guardar(self, clave: str, origen: Origen) -> int:
+        if isinstance(origen, (bytes, bytearray)):
+            self._s3.put_object(Bucket=self.bucket, Key=self._k(clave), Body=origen)
+            return len(origen)
+        inicio = origen.tell()
+        size = origen.seek(0, os.SEEK_END) - inicio
+        origen.seek(inicio)
+        # upload_fileobj parte en multipart si el archivo es grande
+        self._s3.upload_fileobj(origen, self.bucket, self._k(clave))
+        return size
+
+    def leer(self, clave: str, inicio: int = 0, fin: Optional[int] = None):
+        if es_legado(clave):
+            yield from self._legado.leer(clave, inicio, fin)
+            return
+        if fin is not None and fin <= inicio:
+            return  # "bytes=5-4" no es un Range válido (S3 devuelve el objeto entero)
+        kwargs = {}
+        if inicio or fin is not None:
+            kwargs["Range"] = f"bytes={inicio}-{'' if fin is None else fin - 1}"
+        obj = self._s3.get_object(Bucket=self.bucket, Key=self._k(clave), **kwargs)
+        try:
+            yield from obj["Body"].iter_chunks(CHUNK)
+        finally:
+            obj["Body"].close()
+
+    def info(self, clave: str) -> Optional[InfoArchivo]:
+        if es_legado(clave):
+            return self._legado.info(clave)
+        try:
+            h = self._s3.head_object(Bucket=self.bucket, Key=self._k(clave))
+        except self._s3.exceptions.ClientError as ex:
+            # sólo "no existe" es None; permisos, bucket inexistente o S3 caído
+            # no deben verse como un archivo faltante (se regeneraría)
+            if ex.response.get("Error", {}).get("Code") in NO_EXISTE:
+                return None
+            raise
+        return InfoArchivo(
+            h["ContentLength"], int(h["LastModified"].timestamp() * 1_000_000_000)
+        )
+
+    def borrar(self, clave: str):
+        if es_legado(clave):
+            return self._legado.borrar(clave)
+        self._s3.delete_object(Bucket=self.bucket, Key=self._k(clave))
+
+    def listar(self, prefijo: str = ""):
+        pag = self._s3.get_paginator("list_objects_v2")
+        base = self._k(prefijo) if prefijo else (self.prefijo + "/").lstrip("/")
+        quitar = len(self.prefijo) + 1 if self.prefijo else 0
+        for pagina in pag.paginate(Bucket=self.bucket, Prefix=base):
+            for o in pagina.get("Contents", []):
+                yield o["Key"][quitar:], InfoArchivo(
+                    o["Size"], int(o["LastModified"].timestamp() * 1_000_000_000)
+                )
+
+    def mover(self, origen: str, destino: str):
+        self._s3.copy(
+            {"Bucket": self.bucket, "Key": self._k(origen)},
+            self.bucket,
+            self._k(destino),
+        )
+        self._s3.delete_object(Bucket=self.bucket, Key=self._k(origen))
+
+    def url_firmada(self, clave: str, filename: str, media_type: str, ttl: int) -> str:
+        """URL prefirmada (SigV4) para que el cliente baje directo del bucket."""
+        return self._s3.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._k(clave),
+                "ResponseContentType": media_type,
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=ttl,
+        )
+
+    def ruta_local(self, clave: str) -> str:
+        """
+        Copia local cacheada (para el logo que lee el motor de PDF). Sólo para
+        archivos que no se reescriben bajo la misma clave.
+        """
+        if es_legado(clave):
+            return clave
+        destino = os.path.join(CACHE_DIR, *self._k(clave).split("/"))
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            tmp = destino + ".part"
+            self._s3.download_file(self.bucket, self._k(clave), tmp)
+            os.replace(tmp, destino)
+        return destino
+
+
+@lru_cache(maxsize=1)
+def get_storage():
+    return S3Storage() if BACKEND == "s3" else LocalStorage()
+
+
+def respuesta(
+    clave: str,
+    media_type: str,
+    filename: str,
+    headers: Optional[dict] = None,
+    info: Optional[InfoArchivo] = None,
+):
+    """Descarga de `clave`: FileResponse en disco local, streaming en S3."""
+    st = get_storage()
+    if st.local or es_legado(clave):
+        return FileResponse(
+            clave if es_legado(clave) else st.ruta(clave),
+            media_type=media_type,
+            filename=filename,
+            headers=headers,
+        )
+    headers = dict(headers or {})
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    info = info or st.info(clave)
+    if info:
+        headers["Content-Length"] = str(info.size)
+    return StreamingResponse(st.leer(clave), media_type=media_type, headers=headers)
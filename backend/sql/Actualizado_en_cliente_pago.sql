@@ -0,0 +1,20 @@
+BEGIN;
+
+-- Migración: columna `actualizado_en` en cliente y pago (base de los ETags).
+-- La app la actualiza en cada UPDATE vía ORM (onupdate). Idempotente.
+
+ALTER TABLE cliente ADD COLUMN IF NOT EXISTS actualizado_en TIMESTAMP;
+UPDATE cliente SET actualizado_en = creado_en WHERE actualizado_en IS NULL;
+ALTER TABLE cliente ALTER COLUMN actualizado_en SET DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE cliente ALTER COLUMN actualizado_en SET NOT NULL;
+
+ALTER TABLE pago ADD COLUMN IF NOT EXISTS actualizado_en TIMESTAMP;
+UPDATE pago SET actualizado_en = creado_en WHERE actualizado_en IS NULL;
+ALTER TABLE pago ALTER COLUMN actualizado_en SET DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE pago ALTER COLUMN actualizado_en SET NOT NULL;
+
+-- Checks:
+-- SELECT COUNT(*) FROM cliente WHERE actualizado_en IS NULL;
+-- SELECT COUNT(*) FROM pago WHERE actualizado_en IS NULL;
+
+COMMIT;
@@ -23,6 +23,16 @@ SELECT
 FROM generate_series(1, 10000) AS g
 ON CONFLICT DO NOTHING;  -- idempotente
 
+-- Avanzar la secuencia de nro_cliente por encima de los números insertados
+SELECT setval(
+  'cliente_nro_seq',
+  COALESCE(
+    (SELECT MAX(nro_cliente::bigint) FROM cliente WHERE nro_cliente ~ '^[0-9]+$'),
+    0
+  ) + 1,
+  false
+);
+
 -- Checks:
 -- SELECT COUNT(*) FROM cliente;
 -- SELECT estado, COUNT(*) FROM cliente GROUP BY estado;
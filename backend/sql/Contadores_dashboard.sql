@@ -0,0 +1,14 @@
+BEGIN;
+
+-- Migración: contadores del dashboard en tabla (services/contadores.py). Cada
+-- transición de pago/cliente suma su delta en la misma transacción. Idempotente.
+
+CREATE TABLE IF NOT EXISTS contador_dashboard (
+    clave          VARCHAR(40)    PRIMARY KEY,  -- "pagos_en_revision", "efectivo_monto:2025-09-01", ...
+    valor          NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP      NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+-- Sin filas: la primera lectura de /dashboard/counters reconcilia con la base.
+
+COMMIT;
@@ -0,0 +1,19 @@
+BEGIN;
+
+-- Migración: tabla de Idempotency-Key para POST /pagos/efectivo y
+-- /pagos/transferencia (ver services/idempotencia.py). Idempotente.
+
+CREATE TABLE IF NOT EXISTS idempotencia (
+    alcance     VARCHAR(80)  NOT NULL,  -- "<user_id>:<endpoint>"
+    clave       VARCHAR(100) NOT NULL,
+    huella      VARCHAR(64)  NOT NULL,  -- sha256 del request
+    status_code INTEGER,
+    respuesta   JSON,
+    creado_en   TIMESTAMP    NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    PRIMARY KEY (alcance, clave)
+);
+CREATE INDEX IF NOT EXISTS ix_idempotencia_creado_en ON idempotencia (creado_en);
+
+-- Limpieza periódica: python -m scripts.purgar_idempotencia
+
+COMMIT;
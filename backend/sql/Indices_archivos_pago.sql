@@ -0,0 +1,16 @@
+BEGIN;
+
+-- Migración: índices sobre las claves de archivo de pago (usados por
+-- `python -m scripts.gc_archivos`: igualdad por lote y prefijo `pack#%`).
+-- text_pattern_ops sirve a `=` y a LIKE 'prefijo%'. Idempotente.
+-- En tablas grandes preferir CREATE INDEX CONCURRENTLY fuera de la transacción.
+
+CREATE INDEX IF NOT EXISTS ix_pago_comprobante_path
+    ON pago (comprobante_path text_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_pago_recibo_pdf_path
+    ON pago (recibo_pdf_path text_pattern_ops);
+
+-- Checks:
+-- EXPLAIN SELECT id FROM pago WHERE recibo_pdf_path LIKE 'recibos/2025/01/pack-%';
+
+COMMIT;
@@ -0,0 +1,36 @@
+BEGIN;
+
+-- Migración: cola de jobs en segundo plano (services/jobs.py, worker.py). Idempotente.
+
+DO $$ BEGIN
+    CREATE TYPE estado_job_enum AS ENUM ('pendiente', 'corriendo', 'ok', 'error');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS job (
+    id            SERIAL PRIMARY KEY,
+    tipo          VARCHAR(60)     NOT NULL,
+    estado        estado_job_enum NOT NULL DEFAULT 'pendiente',
+    payload       JSON,
+    resultado     JSON,
+    error         TEXT,
+    intentos      INTEGER   NOT NULL DEFAULT 0,
+    max_intentos  INTEGER   NOT NULL DEFAULT 5,
+    disponible_en TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    tomado_por    VARCHAR(120),
+    latido_en     TIMESTAMP,
+    creado_por    INTEGER REFERENCES usuario(id) ON DELETE SET NULL,
+    creado_en     TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    actualizado_en TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    terminado_en  TIMESTAMP
+);
+
+-- dequeue (sólo pendientes) y conteo de corriendo por tipo
+CREATE INDEX IF NOT EXISTS ix_job_pendiente
+    ON job (disponible_en, id) WHERE estado = 'pendiente';
+CREATE INDEX IF NOT EXISTS ix_job_tipo_estado ON job (tipo, estado);
+
+-- Checks:
+-- SELECT tipo, estado, COUNT(*) FROM job GROUP BY 1, 2 ORDER BY 1, 2;
+
+COMMIT;
@@ -0,0 +1,13 @@
+BEGIN;
+
+-- Migración: versión de plantilla con que se renderizó cada recibo
+-- (hash de recibo.html + recibo.css, ver services/recibos.py). Idempotente.
+-- Los recibos existentes quedan en NULL: `--desactualizados` los incluye.
+
+ALTER TABLE pago ADD COLUMN IF NOT EXISTS recibo_version VARCHAR(16);
+
+-- Checks:
+-- SELECT recibo_version, COUNT(*) FROM pago
+--   WHERE recibo_pdf_path IS NOT NULL GROUP BY 1 ORDER BY 2 DESC;
+
+COMMIT;
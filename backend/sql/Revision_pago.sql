@@ -0,0 +1,18 @@
+BEGIN;
+
+-- Migración: reclamo (lease) de la cola de revisión de transferencias
+-- (`POST /pagos/revision/claim`, ver services/revision.py). Idempotente.
+
+ALTER TABLE pago ADD COLUMN IF NOT EXISTS revision_por INTEGER
+    REFERENCES usuario(id) ON DELETE SET NULL;
+ALTER TABLE pago ADD COLUMN IF NOT EXISTS revision_hasta TIMESTAMP;
+
+-- índice parcial: la cola son pocas filas dentro de una tabla grande
+CREATE INDEX IF NOT EXISTS ix_pago_en_revision
+    ON pago (fecha, id) WHERE estado = 'en_revision';
+
+-- Checks:
+-- EXPLAIN SELECT id FROM pago WHERE estado = 'en_revision'
+--   ORDER BY fecha, id LIMIT 5 FOR UPDATE SKIP LOCKED;
+
+COMMIT;
@@ -0,0 +1,23 @@
+BEGIN;
+
+-- Migración: secuencia para `cliente.nro_cliente`.
+-- Reemplaza el cálculo MAX(cliente.id)+1 por nextval('cliente_nro_seq').
+-- Idempotente: se puede correr de nuevo (p. ej. después de poblar con Clientes.sql).
+
+CREATE SEQUENCE IF NOT EXISTS cliente_nro_seq;
+
+-- Próximo valor = mayor nro_cliente numérico existente + 1
+SELECT setval(
+  'cliente_nro_seq',
+  COALESCE(
+    (SELECT MAX(nro_cliente::bigint) FROM cliente WHERE nro_cliente ~ '^[0-9]+$'),
+    0
+  ) + 1,
+  false
+);
+
+-- Checks:
+-- SELECT last_value, is_called FROM cliente_nro_seq;
+-- SELECT MAX(nro_cliente) FROM cliente;
+
+COMMIT;
@@ -7,6 +7,9 @@ BEGIN;
 -- WHERE t.typname = 'role_enum'
 -- ORDER BY e.enumsortorder;
 
+-- NOTA: password_hash en texto plano a propósito (seed); el primer login exitoso
+--       lo reemplaza por un hash Argon2id.
+
 -- 1) Gerente y Operador (password: 'secret')
 INSERT INTO usuario (documento, email, password_hash, role, activo, creado_en)
 VALUES
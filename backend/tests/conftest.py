@@ -0,0 +1,130 @@
+# backend/tests/conftest.py
+import os
+import sys
+import time
+
+import pytest
+
+# los módulos se importan como en `uvicorn app:api_upcore` (desde backend/)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Locks de fila, SKIP LOCKED, advisory locks y `= ANY(:ids)` sólo existen en
+# Postgres: los tests marcados `pg` corren contra TEST_DATABASE_URL (una base
+# descartable) y se saltean si no está.
+PG_URL = os.getenv("TEST_DATABASE_URL", "")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "pg: necesita Postgres (TEST_DATABASE_URL)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if PG_URL.startswith("postgresql"):
+        return
+    saltear = pytest.mark.skip(reason="TEST_DATABASE_URL (Postgres) no configurada")
+    for item in items:
+        if "pg" in item.keywords:
+            item.add_marker(saltear)
+
+
+@pytest.fixture(scope="module")
+def pg():
+    """sessionmaker sobre un esquema recién creado (se borra al terminar)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from configs.db import Base
+    import models.modelo  # noqa: F401  (registra las tablas)
+
+    engine = create_engine(PG_URL, pool_size=10)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def sqlite(tmp_path):
+    """sessionmaker sobre un SQLite temporal (para código sin nada de Postgres)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from configs.db import Base
+    import models.modelo  # noqa: F401  (registra las tablas)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    """Storage local en un directorio temporal."""
+    from services import storage
+
+    st = storage.LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(storage, "get_storage", lambda: st)
+    return st
+
+
+@pytest.fixture
+def pdf_falso(monkeypatch, almacen):
+    """
+    Motor de PDF de prueba (no hace falta wkhtmltopdf ni WeasyPrint): escribe
+    el HTML tal cual detrás de una cabecera PDF. Un recibo con "FALLA" en el
+    HTML falla como lo haría el motor. `demora` simula un render lento.
+    """
+    from fastapi import HTTPException
+
+    from services import recibos
+
+    estado = {"demora": 0.0, "renders": 0}
+
+    def render_pdf(path_pdf, html_str):
+        time.sleep(estado["demora"])
+        if "FALLA" in html_str:
+            raise HTTPException(status_code=500, detail="render roto")
+        with open(path_pdf, "wb") as f:
+            f.write(b"%PDF-1.4 prueba\n" + html_str.encode())
+        estado["renders"] += 1
+
+    monkeypatch.setattr(recibos, "render_pdf", render_pdf)
+    return estado
+
+
+@pytest.fixture
+def api(pg):
+    """
+    TestClient sobre la app con la sesión de `pg` y el usuario que se elija
+    con `api.como(role, user_id, cliente_id)` (sin emitir tokens).
+    """
+    from fastapi.testclient import TestClient
+
+    import app as app_mod
+    from auth.roles import Principal, get_principal
+    from configs.db import get_db
+
+    actual = {"p": Principal(1, "operador", "operador", None)}
+
+    def _get_db():
+        s = pg()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    class _Api:
+        def cliente(self):  # uno por hilo en los tests concurrentes
+            return TestClient(app_mod.api_upcore)
+
+        def como(self, role, user_id=1, cliente_id=None):
+            actual["p"] = Principal(user_id, role, role, cliente_id)
+
+    overrides = app_mod.api_upcore.dependency_overrides
+    overrides[get_db] = _get_db
+    overrides[get_principal] = lambda: actual["p"]
+    yield _Api()
+    overrides.pop(get_db, None)
+    overrides.pop(get_principal, None)
@@ -0,0 +1,124 @@
+# backend/tests/test_contadores.py
+"""
+Contadores del dashboard en tabla: los deltas viajan en la transacción del
+cambio (un rollback los descarta, otra sesión los ve al confirmar) y la
+reconciliación corrige lo hecho por fuera de la API.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models.modelo import (
+    Cliente,
+    EstadoClienteEnum,
+    EstadoPagoEnum,
+    MetodoPagoEnum,
+    Pago,
+)
+from services import contadores
+
+
+@pytest.fixture
+def db(sqlite):
+    s = sqlite()
+    s.add(
+        Cliente(
+            id=1,
+            nro_cliente="CT-1",
+            nombre="Ana",
+            apellido="Paz",
+            documento="30111666",
+            direccion="Calle 1",
+            estado=EstadoClienteEnum.activo,
+        )
+    )
+    s.commit()
+    yield s
+    s.close()
+
+
+def _pago(db, metodo, estado, monto=1000):
+    p = Pago(
+        cliente_id=1,
+        fecha=datetime.utcnow(),
+        monto=monto,
+        metodo=metodo,
+        estado=estado,
+        periodo_year=2025,
+        periodo_month=9,
+        concepto="Abono",
+    )
+    db.add(p)
+    db.flush()
+    contadores.pago_actualizado(db, None, p)
+    return p
+
+
+def test_primera_lectura_reconcilia(db):
+    db.add(
+        Pago(
+            cliente_id=1,
+            fecha=datetime.utcnow(),
+            monto=500,
+            metodo=MetodoPagoEnum.efectivo,
+            estado=EstadoPagoEnum.confirmado,
+            periodo_year=2025,
+            periodo_month=9,
+            concepto="Abono",
+        )
+    )
+    db.commit()
+
+    c = contadores.leer(db)
+
+    assert c["efectivo_hoy"] == {"cantidad": 1, "monto": 500.0}
+    assert c["clientes"] == {"activos": 1, "inactivos": 0}
+    assert c["pagos_en_revision"] == 0
+    assert c["reconciliado_en"] is not None
+
+
+def test_deltas_en_la_misma_transaccion(db, sqlite):
+    contadores.leer(db)  # reconcilia la tabla vacía
+
+    _pago(db, MetodoPagoEnum.transferencia, EstadoPagoEnum.en_revision)
+    db.rollback()  # el delta se descarta con el pago
+    assert contadores.leer(db)["pagos_en_revision"] == 0
+
+    p = _pago(db, MetodoPagoEnum.transferencia, EstadoPagoEnum.en_revision)
+    _pago(db, MetodoPagoEnum.efectivo, EstadoPagoEnum.confirmado, monto=1500)
+    db.commit()
+
+    otro_worker = sqlite()  # sin estado en memoria: lee lo mismo
+    c = contadores.leer(otro_worker)
+    assert c["pagos_en_revision"] == 1
+    assert c["efectivo_hoy"] == {"cantidad": 1, "monto": 1500.0}
+
+    antes = contadores.snapshot_pago(p)
+    p.estado = EstadoPagoEnum.anulado
+    contadores.pago_actualizado(db, antes, p)
+    db.commit()
+    otro_worker.rollback()
+    assert contadores.leer(otro_worker)["pagos_en_revision"] == 0
+    otro_worker.close()
+
+
+def test_cliente_actualizado(db):
+    contadores.leer(db)
+    contadores.cliente_actualizado(
+        db, EstadoClienteEnum.activo, EstadoClienteEnum.inactivo
+    )
+    contadores.cliente_actualizado(db, None, EstadoClienteEnum.activo)
+    db.commit()
+
+    assert contadores.leer(db)["clientes"] == {"activos": 1, "inactivos": 1}
+
+
+def test_reconciliacion_corrige_cambios_por_fuera(db, monkeypatch):
+    contadores.leer(db)
+    db.query(Cliente).update({"estado": EstadoClienteEnum.inactivo})  # SQL a mano
+    db.commit()
+    assert contadores.leer(db)["clientes"]["activos"] == 1  # hasta reconciliar
+
+    monkeypatch.setattr(contadores, "RECONCILE_SEG", 0)
+    assert contadores.leer(db)["clientes"] == {"activos": 0, "inactivos": 1}
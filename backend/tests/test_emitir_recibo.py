@@ -0,0 +1,72 @@
+# backend/tests/test_emitir_recibo.py
+"""
+Recibo de un pago en efectivo renderizado por el worker (job
+`recibos.emitir`): el link responde 404 + Retry-After hasta que el job corre,
+y un reintento del job no vuelve a renderizar.
+"""
+
+import pytest
+
+from models.modelo import Cliente, Job
+from services import jobs
+
+pytestmark = pytest.mark.pg
+
+
+@pytest.fixture(scope="module")
+def cliente_id(pg):
+    db = pg()
+    c = Cliente(
+        nro_cliente="EMI-1",
+        nombre="Luis",
+        apellido="Sosa",
+        documento="30111777",
+        direccion="Calle 2",
+    )
+    db.add(c)
+    db.commit()
+    cid = c.id
+    db.close()
+    return cid
+
+
+def _correr(pg, job_id, worker="w1"):
+    db = pg()
+    job = db.get(Job, job_id)
+    tomado = jobs.Tomado(job.id, job.tipo, job.payload, 1, job.max_intentos)
+    db.close()
+    return jobs.ejecutar(tomado, worker)
+
+
+def test_recibo_diferido(api, pdf_falso, pg, cliente_id, monkeypatch):
+    monkeypatch.setattr(jobs, "SessionLocal", pg)
+    c = api.cliente()
+    r = c.post(
+        "/pagos/efectivo",
+        json={
+            "cliente_id": cliente_id,
+            "monto": 2500,
+            "periodo_year": 2025,
+            "periodo_month": 10,
+            "concepto": "Abono",
+        },
+    )
+    assert r.status_code == 200, r.text
+    cuerpo = r.json()
+    assert pdf_falso["renders"] == 0
+
+    r = c.get(cuerpo["recibo_pdf_url"])
+    assert r.status_code == 404
+    assert r.headers["Retry-After"] == "2"
+    assert c.get(f"/pagos/{cuerpo['id']}").json()["recibo_pdf"] == (
+        cuerpo["recibo_pdf_url"]
+    )
+
+    assert _correr(pg, cuerpo["recibo_job_id"])
+    r = c.get(cuerpo["recibo_pdf_url"])
+    assert r.status_code == 200
+    assert r.content.startswith(b"%PDF-1.4 prueba")
+    assert cuerpo["recibo_num"].encode() in r.content
+
+    assert _correr(pg, cuerpo["recibo_job_id"], "w2")  # reintento: no-op
+    assert pdf_falso["renders"] == 1
@@ -0,0 +1,145 @@
+# backend/tests/test_idempotencia.py
+"""
+Idempotency-Key en `POST /pagos/efectivo` contra Postgres: reintento,
+clave reusada con otro cuerpo, duplicado concurrente (espera a la primera
+transacción) y espera agotada (lock_timeout → 409).
+"""
+
+import threading
+import uuid
+
+import pytest
+
+from models.modelo import Cliente, Job, Pago
+from routes import pago as rutas_pago
+from routes.pago import PagoCreateEfectivo
+from services import idempotencia
+
+pytestmark = pytest.mark.pg
+
+
+@pytest.fixture(scope="module")
+def cliente_id(pg):
+    db = pg()
+    c = Cliente(
+        nro_cliente="IDEM-1",
+        nombre="Ana",
+        apellido="Paz",
+        documento="30111222",
+        direccion="Calle 1",
+    )
+    db.add(c)
+    db.commit()
+    cid = c.id
+    db.close()
+    return cid
+
+
+def _cuerpo(cliente_id, monto=1500):
+    return {
+        "cliente_id": cliente_id,
+        "monto": monto,
+        "periodo_year": 2025,
+        "periodo_month": 9,
+        "concepto": "Abono",
+    }
+
+
+def _pagos(pg, cliente_id):
+    db = pg()
+    try:
+        return db.query(Pago).filter(Pago.cliente_id == cliente_id).count()
+    finally:
+        db.close()
+
+
+def _jobs_recibo(pg, pago_id):
+    db = pg()
+    try:
+        jobs = db.query(Job).filter(Job.tipo == "recibos.emitir").all()
+        return [j for j in jobs if j.payload["pago_id"] == pago_id]
+    finally:
+        db.close()
+
+
+def test_reintento_devuelve_la_respuesta_original(api, pdf_falso, pg, cliente_id):
+    c = api.cliente()
+    h = {idempotencia.HEADER: str(uuid.uuid4())}
+    antes = _pagos(pg, cliente_id)
+
+    r1 = c.post("/pagos/efectivo", json=_cuerpo(cliente_id), headers=h)
+    r2 = c.post("/pagos/efectivo", json=_cuerpo(cliente_id), headers=h)
+
+    assert r1.status_code == r2.status_code == 200
+    assert r2.json() == r1.json()
+    assert "Idempotent-Replayed" not in r1.headers
+    assert r2.headers["Idempotent-Replayed"] == "true"
+    assert _pagos(pg, cliente_id) == antes + 1
+    # un solo recibo: el render queda encolado una vez y no corre en el request
+    assert [j.id for j in _jobs_recibo(pg, r1.json()["id"])] == [
+        r1.json()["recibo_job_id"]
+    ]
+    assert pdf_falso["renders"] == 0
+
+
+def test_misma_clave_otro_cuerpo_422(api, pdf_falso, pg, cliente_id):
+    c = api.cliente()
+    h = {idempotencia.HEADER: str(uuid.uuid4())}
+    assert c.post("/pagos/efectivo", json=_cuerpo(cliente_id), headers=h).is_success
+    antes = _pagos(pg, cliente_id)
+
+    r = c.post("/pagos/efectivo", json=_cuerpo(cliente_id, monto=9999), headers=h)
+
+    assert r.status_code == 422
+    assert _pagos(pg, cliente_id) == antes
+
+
+def test_duplicados_concurrentes_crean_un_pago(
+    api, pdf_falso, pg, cliente_id, monkeypatch
+):
+    # render en el request y lento: la primera sigue abierta cuando llega la segunda
+    monkeypatch.setattr(rutas_pago, "RECIBOS_EN_SEGUNDO_PLANO", False)
+    pdf_falso["demora"] = 0.5
+    h = {idempotencia.HEADER: str(uuid.uuid4())}
+    antes = _pagos(pg, cliente_id)
+    respuestas = []
+    largada = threading.Barrier(2)
+
+    def enviar():
+        c = api.cliente()
+        largada.wait()
+        respuestas.append(
+            c.post("/pagos/efectivo", json=_cuerpo(cliente_id), headers=h)
+        )
+
+    hilos = [threading.Thread(target=enviar) for _ in range(2)]
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join(timeout=30)
+
+    assert [r.status_code for r in respuestas] == [200, 200]
+    assert respuestas[0].json() == respuestas[1].json()
+    repetidas = [r.headers.get("Idempotent-Replayed") for r in respuestas]
+    assert repetidas.count("true") == 1  # la segunda esperó y repitió la primera
+    assert _pagos(pg, cliente_id) == antes + 1
+    assert pdf_falso["renders"] == 1
+
+
+def test_espera_agotada_409(api, pdf_falso, pg, cliente_id, monkeypatch):
+    monkeypatch.setattr(idempotencia, "ESPERA_MS", 300)
+    clave = str(uuid.uuid4())
+    cuerpo = _cuerpo(cliente_id)
+
+    # otra transacción tiene la clave tomada y no termina
+    retiene = pg()
+    huella = idempotencia.huella(PagoCreateEfectivo(**cuerpo).model_dump_json())
+    assert idempotencia.iniciar(retiene, "1:efectivo", clave, huella) is None
+    try:
+        r = api.cliente().post(
+            "/pagos/efectivo", json=cuerpo, headers={idempotencia.HEADER: clave}
+        )
+        assert r.status_code == 409
+    finally:
+        retiene.rollback()
+        retiene.close()
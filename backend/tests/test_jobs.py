@@ -0,0 +1,123 @@
+# backend/tests/test_jobs.py
+"""
+Cola de jobs contra Postgres: tope de concurrencia por tipo (advisory lock +
+conteo) con varios workers tomando a la vez, y rescate de un job sin latido.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from models.modelo import EstadoJobEnum, Job
+from services import jobs
+
+pytestmark = pytest.mark.pg
+
+CONCURRENCIA = 2
+_corriendo = {"ahora": 0, "max": 0}
+_lock = threading.Lock()
+
+
+@jobs.tarea("test.lento", concurrencia=CONCURRENCIA, max_intentos=1)
+def _lento(db, payload, job_id):
+    with _lock:
+        _corriendo["ahora"] += 1
+        _corriendo["max"] = max(_corriendo["max"], _corriendo["ahora"])
+    time.sleep(0.2)
+    with _lock:
+        _corriendo["ahora"] -= 1
+
+
+@jobs.tarea("test.rescate", max_intentos=3)
+def _rescate(db, payload, job_id):
+    return None
+
+
+@pytest.fixture
+def cola(pg, monkeypatch):
+    monkeypatch.setattr(jobs, "SessionLocal", pg)  # `ejecutar` abre la suya
+    db = pg()
+    db.execute(delete(Job))
+    db.commit()
+    db.close()
+    return pg
+
+
+def _encolar(Sesion, tipo, n):
+    db = Sesion()
+    ids = [jobs.encolar(db, tipo, {"n": i}).id for i in range(n)]
+    db.commit()
+    db.close()
+    return ids
+
+
+def test_concurrencia_por_tipo(cola):
+    total = 8
+    _encolar(cola, "test.lento", total)
+    hechos = []
+
+    def worker(nombre):
+        while len(hechos) < total:
+            db = cola()
+            try:
+                job = jobs.tomar(db, nombre, ["test.lento"])
+            finally:
+                db.close()
+            if job is None:
+                time.sleep(0.02)
+                continue
+            if jobs.ejecutar(job, nombre):
+                hechos.append(job.id)
+
+    hilos = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(6)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join(timeout=30)
+
+    assert sorted(hechos) == sorted(set(hechos)) and len(hechos) == total
+    assert _corriendo["max"] == CONCURRENCIA  # en paralelo, pero nunca más
+
+    db = cola()
+    estados = {e for (e,) in db.query(Job.estado).filter(Job.tipo == "test.lento")}
+    db.close()
+    assert estados == {EstadoJobEnum.ok}
+
+
+def test_rescate_sin_latido(cola):
+    (job_id,) = _encolar(cola, "test.rescate", 1)
+    db = cola()
+    tomado = jobs.tomar(db, "w1", ["test.rescate"])
+    assert tomado.id == job_id
+
+    # w1 deja de latir más allá del lease
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(latido_en=datetime.utcnow() - timedelta(seconds=jobs.LEASE_SEG + 5))
+    )
+    db.commit()
+    assert jobs.rescatar(db) == 1
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job.estado == EstadoJobEnum.pendiente and job.tomado_por is None
+
+    # w1 "despierta": ni su checkpoint ni su resultado pisan el job
+    token = jobs._worker_actual.set("w1")
+    try:
+        with pytest.raises(jobs.JobPerdido):
+            jobs.progreso(db, job_id, {"ultimo_id": 999})
+    finally:
+        jobs._worker_actual.reset(token)
+
+    otro = jobs.tomar(db, "w2", ["test.rescate"])
+    assert otro.id == job_id and otro.intentos == 2
+    jobs.terminar(db, tomado, "w1", {"de": "w1"})
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job.estado == EstadoJobEnum.corriendo and job.tomado_por == "w2"
+    assert job.resultado is None
+    db.close()
@@ -0,0 +1,82 @@
+# backend/tests/test_miniaturas.py
+"""
+Vistas previas: clave de filas sin migrar (ruta absoluta) en disco local y en
+S3, y generación agendada una sola vez por comprobante.
+"""
+
+import io
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image  # noqa: E402
+
+from services import miniaturas, storage  # noqa: E402
+
+
+def _png():
+    out = io.BytesIO()
+    Image.new("RGB", (1600, 900), "red").save(out, "PNG")
+    return out.getvalue()
+
+
+def test_legado_local_queda_junto_al_original(almacen):
+    almacen.guardar("comprobantes/1/2024/a.png", _png())
+    legado = almacen.ruta("comprobantes/1/2024/a.png")
+
+    clave = miniaturas.clave_preview(legado)
+    assert clave == "comprobantes/1/2024/a.png" + miniaturas._EXT
+    assert miniaturas.generar(legado) == clave
+    assert almacen.info(clave).size > 0
+
+
+def test_legado_en_s3_se_guarda_con_clave_relativa(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(var, "test")
+
+    raiz = tmp_path / "uploads"
+    original = storage.LocalStorage
+    monkeypatch.setattr(storage, "LocalStorage", lambda: original(str(raiz)))
+    legado = str(raiz / "comprobantes" / "a.png")
+    os.makedirs(os.path.dirname(legado))
+    with open(legado, "wb") as f:
+        f.write(_png())
+
+    with moto.mock_aws():
+        st = storage.S3Storage(bucket="upcore-test", prefijo="", region="us-east-1")
+        st._s3.create_bucket(Bucket="upcore-test")
+        monkeypatch.setattr(storage, "get_storage", lambda: st)
+
+        clave = miniaturas.clave_preview(legado)
+        assert clave == "comprobantes/a.png" + miniaturas._EXT
+        miniaturas.generar(legado)
+        # `info` mira el mismo lugar donde `guardar` escribió: no se regenera
+        assert st.info(clave) is not None
+
+        afuera = str(tmp_path / "otro" / "b.png")
+        assert miniaturas.clave_preview(afuera) is None
+        assert miniaturas.generar(afuera) is None
+
+
+def test_programar_una_vez_por_comprobante(almacen):
+    almacen.guardar("c/a.png", _png())
+    tareas = []
+
+    class Tareas:
+        def add_task(self, fn, *args):
+            tareas.append((fn, args))
+
+    miniaturas.programar(Tareas(), "c/a.png")
+    miniaturas.programar(Tareas(), "c/a.png")
+    assert len(tareas) == 1
+
+    fn, args = tareas[0]
+    fn(*args)
+    assert almacen.info(miniaturas.clave_preview("c/a.png")) is not None
+
+    miniaturas.programar(Tareas(), "c/a.png")  # terminada: se puede volver a agendar
+    assert len(tareas) == 2
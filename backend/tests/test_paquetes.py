@@ -0,0 +1,156 @@
+# backend/tests/test_paquetes.py
+"""
+Paquetes de recibos sobre disco local (directorio temporal): referencias a
+tramos, lectura exacta, paquete truncado y la reescritura condicionada de
+`scripts.empaquetar_recibos` (una fila regenerada mientras se arma el paquete
+no se pisa).
+"""
+
+import pytest
+
+from models.modelo import Cliente, MetodoPagoEnum, Pago
+from scripts import empaquetar_recibos
+from services import paquetes
+
+PDF_A = b"%PDF-1.4 recibo A\n" + bytes(range(256)) * 300
+PDF_B = b"%PDF-1.4 recibo B\n%%EOF\n"
+
+
+def _pack(almacen, *pdfs):
+    """Guarda los PDFs concatenados; devuelve las referencias a cada tramo."""
+    pack, refs, offset = "recibos/2025/01/pack-1.pack", [], 0
+    for i, pdf in enumerate(pdfs):
+        refs.append(paquetes.ref_tramo(pack, offset, len(pdf), f"REC-{i}.pdf"))
+        offset += len(pdf)
+    almacen.guardar(pack, b"".join(pdfs))
+    return pack, refs
+
+
+def test_parse_y_nombre():
+    ref = paquetes.ref_tramo("recibos/2025/01/p.pack", 10, 20, "REC:1.pdf")
+
+    assert paquetes.es_tramo(ref)
+    assert paquetes.parse(ref) == ("recibos/2025/01/p.pack", 10, 20, "REC:1.pdf")
+    assert paquetes.nombre(ref) == "REC:1.pdf"
+    assert paquetes.nombre("recibos/2025/01/REC-2.pdf") == "REC-2.pdf"
+    assert not paquetes.es_tramo("recibos/2025/01/REC-2.pdf")
+    assert not paquetes.es_tramo("/var/uploads/recibos/a#b.pdf")  # ruta legada
+
+
+def test_leer_e_info_de_tramos(almacen):
+    pack, (ref_a, ref_b) = _pack(almacen, PDF_A, PDF_B)
+
+    assert b"".join(paquetes.leer(ref_a)) == PDF_A
+    assert b"".join(paquetes.leer(ref_b)) == PDF_B
+    info = paquetes.info(ref_b)
+    assert info.size == len(PDF_B)
+    assert info.mtime_ns == almacen.info(pack).mtime_ns
+
+
+def test_tramo_vacio(almacen):
+    pack, (ref,) = _pack(almacen, b"")
+    assert paquetes.info(ref).size == 0
+    assert b"".join(paquetes.leer(ref)) == b""
+
+
+def test_info_rechaza_paquete_truncado(almacen):
+    pack, (ref_a, ref_b) = _pack(almacen, PDF_A, PDF_B)
+    with open(almacen.ruta(pack), "r+b") as f:
+        f.truncate(len(PDF_A) + len(PDF_B) - 1)
+
+    assert paquetes.info(ref_a) is not None
+    assert paquetes.info(ref_b) is None
+    assert paquetes.info(paquetes.ref_tramo("no/existe.pack", 0, 1, "x.pdf")) is None
+
+
+@pytest.fixture
+def db(sqlite):
+    # el script no usa nada propio de Postgres
+    s = sqlite()
+    s.add(
+        Cliente(
+            id=1,
+            nro_cliente="PK-1",
+            nombre="Ana",
+            apellido="Paz",
+            documento="30111444",
+            direccion="Calle 1",
+        )
+    )
+    s.commit()
+    yield s, sqlite
+    s.close()
+
+
+def _pago(db, recibo_num, ruta):
+    p = Pago(
+        cliente_id=1,
+        monto=1000,
+        metodo=MetodoPagoEnum.efectivo,
+        periodo_year=2025,
+        periodo_month=1,
+        concepto="Abono",
+        recibo_num=recibo_num,
+        recibo_pdf_path=ruta,
+    )
+    db.add(p)
+    db.commit()
+    return p.id
+
+
+def _stats():
+    return {"paquetes": 0, "recibos": 0, "faltantes": 0, "bytes": 0}
+
+
+def test_empaquetar_mes(almacen, db):
+    s, _ = db
+    sueltos = {"R-1": PDF_A, "R-2": PDF_B}
+    ids = {}
+    for num, pdf in sueltos.items():
+        almacen.guardar(f"recibos/2025/01/{num}.pdf", pdf)
+        ids[num] = _pago(s, num, f"recibos/2025/01/{num}.pdf")
+
+    stats = _stats()
+    empaquetar_recibos._empaquetar_mes(
+        s, almacen, "recibos/2025/01/", False, False, stats
+    )
+
+    assert stats["recibos"] == 2 and stats["paquetes"] == 1
+    for num, pdf in sueltos.items():
+        ref = s.get(Pago, ids[num]).recibo_pdf_path
+        assert paquetes.es_tramo(ref)
+        assert b"".join(paquetes.leer(ref)) == pdf
+        assert almacen.info(f"recibos/2025/01/{num}.pdf") is None  # borrado
+
+
+def test_fila_regenerada_durante_el_empaquetado_no_se_pisa(almacen, db, monkeypatch):
+    s, Sesion = db
+    almacen.guardar("recibos/2025/01/R-1.pdf", PDF_A)
+    almacen.guardar("recibos/2025/01/R-2.pdf", PDF_B)
+    id_1 = _pago(s, "R-1", "recibos/2025/01/R-1.pdf")
+    id_2 = _pago(s, "R-2", "recibos/2025/01/R-2.pdf")
+    nuevo = "recibos/2025/01/R-2__v2.pdf"
+
+    leer = almacen.leer
+
+    def leer_y_regenerar(clave, *rango):
+        if clave.endswith("R-2.pdf"):  # otro proceso regenera R-2 a mitad del lote
+            otra = Sesion()
+            otra.get(Pago, id_2).recibo_pdf_path = nuevo
+            otra.commit()
+            otra.close()
+        return leer(clave, *rango)
+
+    monkeypatch.setattr(almacen, "leer", leer_y_regenerar)
+    stats = _stats()
+    empaquetar_recibos._empaquetar_mes(
+        s, almacen, "recibos/2025/01/", False, False, stats
+    )
+    s.expire_all()
+
+    assert stats["recibos"] == 1
+    assert paquetes.es_tramo(s.get(Pago, id_1).recibo_pdf_path)
+    assert s.get(Pago, id_2).recibo_pdf_path == nuevo
+    assert almacen.info("recibos/2025/01/R-1.pdf") is None
+    # el suelto viejo de R-2 no se borra aquí (queda para scripts.gc_archivos)
+    assert almacen.info("recibos/2025/01/R-2.pdf") is not None
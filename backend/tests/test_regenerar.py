@@ -0,0 +1,148 @@
+# backend/tests/test_regenerar.py
+"""
+Regeneración masiva de recibos (`recibos.regenerar`, en proceso con
+`procesos=1`) con el motor de PDF de prueba: reanudación desde `ultimo_id`,
+fallas de render y filas que cambian (p. ej. se empaquetan) a mitad del lote.
+"""
+
+import pytest
+
+from models.modelo import Cliente, MetodoPagoEnum, Pago
+from services import paquetes, recibos
+
+
+@pytest.fixture
+def db(sqlite):
+    s = sqlite()
+    s.add(
+        Cliente(
+            id=1,
+            nro_cliente="RG-1",
+            nombre="Ana",
+            apellido="Paz",
+            documento="30111555",
+            direccion="Calle 1",
+        )
+    )
+    s.commit()
+    yield s
+    s.close()
+
+
+def _snapshot(num, cliente="Paz, Ana"):
+    return {
+        "company_name": "UP-Link",
+        "receipt_number": num,
+        "payment_date": "2025-01-10 10:00",
+        "item_description": "Abono",
+        "base_amount": 1000.0,
+        "late_fee": 0.0,
+        "total_paid": 1000.0,
+        "payment_method": "Efectivo",
+        "currency_symbol": "$",
+        "client_name": cliente,
+    }
+
+
+def _recibos(db, almacen, n):
+    """`n` pagos con recibo suelto y snapshot; devuelve sus ids."""
+    ids = []
+    for i in range(n):
+        clave = f"recibos/2025/01/REC-{i}.pdf"
+        almacen.guardar(clave, b"%PDF-1.4 viejo\n")
+        p = Pago(
+            cliente_id=1,
+            monto=1000,
+            metodo=MetodoPagoEnum.efectivo,
+            periodo_year=2025,
+            periodo_month=1,
+            concepto="Abono",
+            recibo_num=f"REC-{i}",
+            recibo_pdf_path=clave,
+            recibo_snapshot_json=_snapshot(f"REC-{i}"),
+        )
+        db.add(p)
+        db.commit()
+        ids.append(p.id)
+    return ids
+
+
+def _version(db, pago_id):
+    db.expire_all()
+    return db.get(Pago, pago_id).recibo_version
+
+
+def test_reanuda_despues_de_ultimo_id(db, almacen, pdf_falso):
+    ids = _recibos(db, almacen, 5)
+    previo = {"procesados": 3, "ok": 3, "ultimo_id": ids[2], "segundos": 2.0}
+    avances = []
+
+    stats = recibos.regenerar(
+        db,
+        {},
+        procesos=1,
+        lote=1,
+        previo=previo,
+        progreso=lambda s: avances.append(s["ultimo_id"]),
+    )
+
+    assert pdf_falso["renders"] == 2
+    assert avances == ids[3:]
+    assert [_version(db, i) for i in ids] == [None] * 3 + [
+        recibos.version_plantilla()
+    ] * 2
+    assert (stats["procesados"], stats["ok"], stats["ultimo_id"]) == (5, 5, ids[-1])
+    assert stats["segundos"] >= 2.0
+    nuevo = b"".join(almacen.leer(f"recibos/2025/01/REC-{len(ids) - 1}.pdf"))
+    assert nuevo.startswith(b"%PDF-1.4 prueba")
+
+
+def test_falla_de_render_se_informa(db, almacen, pdf_falso):
+    (bien,) = _recibos(db, almacen, 1)
+    db.add(
+        Pago(
+            cliente_id=1,
+            monto=1,
+            metodo=MetodoPagoEnum.efectivo,
+            periodo_year=2025,
+            periodo_month=1,
+            concepto="Abono",
+            recibo_num="REC-X",
+            recibo_pdf_path="recibos/2025/01/REC-X.pdf",
+            recibo_snapshot_json=_snapshot("REC-X", cliente="FALLA"),
+        )
+    )
+    db.commit()
+
+    stats = recibos.regenerar(db, {}, procesos=1)
+
+    assert (stats["ok"], stats["fallidos"]) == (1, 1)
+    assert stats["fallas"][0]["error"] == "render roto"
+    assert _version(db, bien) == recibos.version_plantilla()
+
+
+def test_fila_empaquetada_a_mitad_del_lote_es_falla(
+    db, almacen, pdf_falso, sqlite, monkeypatch
+):
+    ids = _recibos(db, almacen, 3)
+    tramo = paquetes.ref_tramo("recibos/2025/01/pack-1.pack", 0, 15, "REC-1.pdf")
+    render = recibos.render_pdf
+
+    def render_y_empaquetar(path_pdf, html):
+        render(path_pdf, html)
+        if pdf_falso["renders"] == 2:  # scripts.empaquetar_recibos toma REC-1
+            otra = sqlite()
+            otra.get(Pago, ids[1]).recibo_pdf_path = tramo
+            otra.commit()
+            otra.close()
+
+    monkeypatch.setattr(recibos, "render_pdf", render_y_empaquetar)
+    stats = recibos.regenerar(db, {}, procesos=1, lote=10)
+
+    assert (stats["procesados"], stats["ok"], stats["fallidos"]) == (3, 2, 1)
+    assert stats["fallas"] == [
+        {"pago_id": ids[1], "error": "Cambió durante la regeneración"}
+    ]
+    db.expire_all()
+    assert db.get(Pago, ids[1]).recibo_pdf_path == tramo
+    assert _version(db, ids[1]) is None
@@ -0,0 +1,177 @@
+# backend/tests/test_revision.py
+"""
+Cola de revisión contra Postgres (SKIP LOCKED y locks de fila): reclamos
+simultáneos sin solaparse, lease vencido que vuelve a la cola y 409 al
+confirmar un pago con lease vigente de otro revisor.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.modelo import (
+    Cliente,
+    EstadoPagoEnum,
+    MetodoPagoEnum,
+    Pago,
+    RoleEnum,
+    Usuario,
+)
+from services import revision
+
+pytestmark = pytest.mark.pg
+
+REVISORES = 4
+
+
+@pytest.fixture(scope="module")
+def base(pg):
+    db = pg()
+    for i in range(1, REVISORES + 1):
+        db.add(
+            Usuario(
+                id=i, email=f"op{i}@test", password_hash="x", role=RoleEnum.operador
+            )
+        )
+    c = Cliente(
+        nro_cliente="REV-1",
+        nombre="Ana",
+        apellido="Paz",
+        documento="30111333",
+        direccion="Calle 1",
+    )
+    db.add(c)
+    db.commit()
+    cid = c.id
+    db.close()
+    return cid
+
+
+@pytest.fixture
+def en_cola(pg, base):
+    """Vacía la cola y carga `n` transferencias en revisión; devuelve sus ids."""
+
+    def cargar(n):
+        db = pg()
+        db.query(Pago).delete()
+        inicio = datetime.utcnow() - timedelta(hours=1)
+        pagos = [
+            Pago(
+                cliente_id=base,
+                fecha=inicio + timedelta(seconds=i),
+                monto=1000,
+                metodo=MetodoPagoEnum.transferencia,
+                estado=EstadoPagoEnum.en_revision,
+                periodo_year=2025,
+                periodo_month=9,
+                concepto="Abono",
+            )
+            for i in range(n)
+        ]
+        db.add_all(pagos)
+        db.commit()
+        ids = [p.id for p in pagos]
+        db.close()
+        return ids
+
+    return cargar
+
+
+def test_reclamos_simultaneos_no_se_solapan(pg, en_cola):
+    por_revisor = 3
+    ids = en_cola(REVISORES * por_revisor)
+    reclamados = {}
+    largada = threading.Barrier(REVISORES)
+
+    def revisor(user_id):
+        db = pg()
+        try:
+            largada.wait()
+            pagos, _ = revision.reclamar(db, user_id, por_revisor)
+            reclamados[user_id] = [p.id for p in pagos]
+        finally:
+            db.close()
+
+    hilos = [
+        threading.Thread(target=revisor, args=(u,)) for u in range(1, REVISORES + 1)
+    ]
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join(timeout=30)
+
+    todos = [i for lote in reclamados.values() for i in lote]
+    assert len(todos) == len(set(todos))  # ningún pago a dos revisores
+    assert sorted(todos) == sorted(ids)
+    assert all(len(lote) == por_revisor for lote in reclamados.values())
+
+    db = pg()
+    for user_id, lote in reclamados.items():
+        duenos = {p.revision_por for p in db.query(Pago).filter(Pago.id.in_(lote))}
+        assert duenos == {user_id}
+    db.close()
+
+
+def test_reclamo_con_lote_bloqueado_toma_los_siguientes(pg, en_cola):
+    ids = en_cola(4)
+    retiene = pg()
+    bloqueados = [
+        i
+        for (i,) in retiene.query(Pago.id)
+        .filter(Pago.id.in_(ids[:2]))
+        .with_for_update()
+    ]
+    try:
+        db = pg()
+        pagos, _ = revision.reclamar(db, 2, 4)  # no espera a `retiene`
+        assert [p.id for p in pagos] == ids[2:]
+        db.close()
+    finally:
+        retiene.rollback()
+        retiene.close()
+    assert bloqueados == ids[:2]
+
+
+def test_lease_vencido_vuelve_a_la_cola(pg, en_cola):
+    (pago_id,) = en_cola(1)
+    db = pg()
+
+    pagos, _ = revision.reclamar(db, 1, 1)
+    assert [p.id for p in pagos] == [pago_id]
+    assert revision.reclamar(db, 2, 1)[0] == []  # lease vigente de 1
+
+    db.query(Pago).filter(Pago.id == pago_id).update(
+        {"revision_hasta": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+    pagos, _ = revision.reclamar(db, 2, 1)
+    assert [p.id for p in pagos] == [pago_id]
+    assert pagos[0].revision_por == 2
+    db.close()
+
+
+def test_confirmar_con_lease_de_otro_409(api, pdf_falso, pg, en_cola):
+    (pago_id,) = en_cola(1)
+    c = api.cliente()
+
+    api.como("operador", user_id=1)
+    r = c.post("/pagos/revision/claim", json={"cantidad": 1})
+    assert [it["id"] for it in r.json()["items"]] == [pago_id]
+
+    api.como("operador", user_id=2)
+    r = c.put(f"/pagos/{pago_id}/confirmar")
+    assert r.status_code == 409
+    db = pg()
+    assert db.get(Pago, pago_id).estado == EstadoPagoEnum.en_revision
+    db.close()
+
+    api.como("operador", user_id=1)
+    r = c.put(f"/pagos/{pago_id}/confirmar")
+    assert r.status_code == 200, r.text
+    db = pg()
+    pago = db.get(Pago, pago_id)
+    assert pago.estado == EstadoPagoEnum.confirmado
+    assert pago.revision_por is None
+    db.close()
@@ -0,0 +1,122 @@
+# backend/tests/test_storage_s3.py
+"""
+S3Storage contra un S3 simulado (moto `mock_aws`, sin red ni credenciales).
+"""
+
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from services.storage import S3Storage  # noqa: E402
+
+BUCKET = "upcore-test"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for var, valor in {
+        "AWS_ACCESS_KEY_ID": "test",
+        "AWS_SECRET_ACCESS_KEY": "test",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }.items():
+        monkeypatch.setenv(var, valor)
+    with moto.mock_aws():
+        st = S3Storage(bucket=BUCKET, prefijo="pref", region="us-east-1")
+        st._s3.create_bucket(Bucket=BUCKET)
+        yield st
+
+
+def _leer(st, clave, *rango):
+    return b"".join(st.leer(clave, *rango))
+
+
+def test_guardar_y_leer(s3, tmp_path):
+    datos = bytes(range(256)) * 1000
+    assert s3.guardar("recibos/2025/09/a.pdf", datos) == len(datos)
+
+    archivo = tmp_path / "b.bin"
+    archivo.write_bytes(datos)
+    with open(archivo, "rb") as f:
+        f.read(10)  # guarda desde la posición actual
+        assert s3.guardar("recibos/2025/09/b.bin", f) == len(datos) - 10
+
+    assert _leer(s3, "recibos/2025/09/a.pdf") == datos
+    assert _leer(s3, "recibos/2025/09/b.bin") == datos[10:]
+    # el prefijo se agrega a la clave en el bucket
+    s3._s3.head_object(Bucket=BUCKET, Key="pref/recibos/2025/09/a.pdf")
+
+
+def test_leer_con_rango(s3):
+    datos = b"0123456789" * 10
+    s3.guardar("x.bin", datos)
+
+    assert _leer(s3, "x.bin", 5, 15) == datos[5:15]
+    assert _leer(s3, "x.bin", 90) == datos[90:]
+    assert _leer(s3, "x.bin", 0, 1) == datos[:1]
+    assert _leer(s3, "x.bin", 5, 5) == b""  # tramo vacío
+
+
+def test_escribir_publica_al_salir(s3):
+    with s3.escribir("recibos/c.pdf") as tmp:
+        with open(tmp, "wb") as f:
+            f.write(b"%PDF-1.4")
+        assert s3.info("recibos/c.pdf") is None
+    assert _leer(s3, "recibos/c.pdf") == b"%PDF-1.4"
+
+
+def test_info(s3):
+    s3.guardar("a/b.txt", b"hola")
+    info = s3.info("a/b.txt")
+    assert info.size == 4
+    assert info.mtime_ns > 0
+    assert s3.info("a/no-existe.txt") is None
+
+
+def test_info_propaga_otros_errores(s3, monkeypatch):
+    def prohibido(**kw):
+        raise ClientError(
+            {"Error": {"Code": "403", "Message": "Forbidden"}}, "HeadObject"
+        )
+
+    monkeypatch.setattr(s3._s3, "head_object", prohibido)
+    with pytest.raises(ClientError):
+        s3.info("a/b.txt")
+
+
+def test_listar(s3):
+    for clave in ("r/2025/02/b.pdf", "r/2025/01/a.pdf", "otros/c.txt"):
+        s3.guardar(clave, b"x" * len(clave))
+    s3._s3.put_object(Bucket=BUCKET, Key="fuera-del-prefijo.txt", Body=b"x")
+
+    todo = dict(s3.listar())
+    assert sorted(todo) == ["otros/c.txt", "r/2025/01/a.pdf", "r/2025/02/b.pdf"]
+    assert todo["otros/c.txt"].size == len("otros/c.txt")
+    assert [c for c, _ in s3.listar("r/")] == ["r/2025/01/a.pdf", "r/2025/02/b.pdf"]
+
+
+def test_mover(s3):
+    s3.guardar("a.pdf", b"contenido")
+    s3.mover("a.pdf", "archivo/a.pdf")
+
+    assert s3.info("a.pdf") is None
+    assert _leer(s3, "archivo/a.pdf") == b"contenido"
+
+
+def test_url_firmada(s3):
+    s3.guardar("recibos/r.pdf", b"%PDF")
+    url = s3.url_firmada("recibos/r.pdf", "REC-1.pdf", "application/pdf", 60)
+
+    partes = urlparse(url)
+    q = parse_qs(partes.query)
+    assert partes.path.endswith(f"{BUCKET}/pref/recibos/r.pdf") or (
+        partes.netloc.startswith(BUCKET) and partes.path == "/pref/recibos/r.pdf"
+    )
+    assert q["X-Amz-Expires"] == ["60"]
+    assert "X-Amz-Signature" in q
+    assert q["response-content-type"] == ["application/pdf"]
+    assert q["response-content-disposition"] == ['attachment; filename="REC-1.pdf"']
@@ -0,0 +1,106 @@
+# backend/worker.py
+"""
+Worker de la cola de jobs (services/jobs.py). Proceso aparte de `app:api_upcore`:
+
+    cd backend
+    python worker.py [--hilos 2] [--tipos pagos.export,...]
+
+- Cada hilo toma un job por vez (SKIP LOCKED) y lo corre con su propia sesión.
+- Se escala sumando procesos (en esta u otras máquinas): los límites de
+  concurrencia por tipo valen para todo el cluster.
+- SIGTERM/SIGINT: deja de tomar jobs y termina los que están corriendo.
+- Un hilo aparte actualiza el latido de los jobs en curso y rescata los de
+  workers caídos.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+
+from configs.db import SessionLocal
+from services import jobs
+import routes.pago  # noqa: F401  (registra sus tareas)
+
+POLL_SEG = float(os.getenv("JOBS_POLL_SEG", "1"))
+
+
+class Worker:
+    def __init__(self, hilos: int, tipos):
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.hilos = hilos
+        self.tipos = tipos
+        self.parar = threading.Event()
+        self._en_curso = set()
+        self._lock = threading.Lock()
+
+    def _bucle(self):
+        while not self.parar.is_set():
+            db = SessionLocal()
+            try:
+                job = jobs.tomar(db, self.id, self.tipos)
+            except Exception as ex:
+                print("Error tomando job ---->> ", ex)
+                job = None
+            finally:
+                db.close()
+            if job is None:
+                self.parar.wait(POLL_SEG)
+                continue
+            with self._lock:
+                self._en_curso.add(job.id)
+            try:
+                jobs.ejecutar(job, self.id)
+            except Exception as ex:  # que un corte de la DB no mate el hilo
+                print("Error ejecutando job ---->> ", ex)
+                self.parar.wait(POLL_SEG)
+            finally:
+                with self._lock:
+                    self._en_curso.discard(job.id)
+
+    def _latidos(self):
+        while not self.parar.wait(jobs.LEASE_SEG / 3):
+            with self._lock:
+                ids = list(self._en_curso)
+            db = SessionLocal()
+            try:
+                jobs.latir(db, self.id, ids)
+                n = jobs.rescatar(db)
+                if n:
+                    print(f"{n} jobs de workers sin latido vuelven a la cola")
+            except Exception as ex:
+                print("Error latido ---->> ", ex)
+            finally:
+                db.close()
+
+    def correr(self):
+        print(f"worker {self.id}: {self.hilos} hilos, tipos {', '.join(self.tipos)}")
+        threading.Thread(target=self._latidos, daemon=True).start()
+        hilos = [threading.Thread(target=self._bucle) for _ in range(self.hilos)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        print(f"worker {self.id}: detenido")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Worker de la cola de jobs")
+    ap.add_argument("--hilos", type=int, default=int(os.getenv("JOBS_HILOS", "2")))
+    ap.add_argument("--tipos", help="tipos separados por coma (default: todos)")
+    args = ap.parse_args()
+
+    tipos = args.tipos.split(",") if args.tipos else sorted(jobs.TAREAS)
+    desconocidos = set(tipos) - set(jobs.TAREAS)
+    if desconocidos:
+        ap.error(f"tipos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    worker = Worker(args.hilos, tipos)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: worker.parar.set())
+    worker.correr()
+
+
+if __name__ == "__main__":
+    main()